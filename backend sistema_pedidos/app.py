@@ -1,5 +1,5 @@
-from flask import Flask, jsonify, request
-from config import Config
+from flask import Flask, jsonify
+from config import Config, verificar_secuencia_ids
 
 # Importar Blueprints
 from routes.clientes import clientes_bp
@@ -7,9 +7,17 @@ from routes.productos import productos_bp
 from routes.pedidos import pedidos_bp
 from routes.replicacion import replicacion_bp
 from routes.health import health_bp
+from routes.estadisticas import estadisticas_bp
+from routes.metricas import metricas_bp
+from routes.proxy import proxy_bp
 
 # Importar helpers
 from utils.helpers import generar_reporte_nodo
+from utils import metricas, perfilador
+from utils.monitor_salud import monitor
+
+# Sin una secuencia de ids propia por nodo la replicación pisaría registros ajenos
+verificar_secuencia_ids()
 
 app = Flask(__name__)
 
@@ -17,19 +25,30 @@ app = Flask(__name__)
 from flask_cors import CORS
 app.url_map.strict_slashes = False
 
-app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
 # Configuración
 app.config['SECRET_KEY'] = Config.SECRET_KEY
 app.config['JSON_SORT_KEYS'] = False
 
+# Latencia por ruta y tiempos de queries para /api/metrics
+metricas.instalar(app)
+# Log de queries por petición, detección de n+1 / lentas y /api/debug (PERFILADOR_HABILITADO)
+perfilador.instalar(app)
+# Heartbeat en segundo plano contra NODOS_REPLICAS (utils/monitor_salud.py);
+# con varios workers solo uno hace los pings y los demás leen su vista
+monitor.iniciar()
+
 # Registrar Blueprints
 app.register_blueprint(clientes_bp, url_prefix='/api/clientes')
 app.register_blueprint(productos_bp, url_prefix='/api/productos')
 app.register_blueprint(pedidos_bp, url_prefix='/api/pedidos')
 app.register_blueprint(replicacion_bp, url_prefix='/api/replicacion')
 app.register_blueprint(health_bp, url_prefix='/api/health')
+app.register_blueprint(estadisticas_bp, url_prefix='/api/estadisticas')
+app.register_blueprint(metricas_bp, url_prefix='/api/metrics')
+if Config.PROXY_HABILITADO:
+    app.register_blueprint(proxy_bp, url_prefix='/api/proxy')
 
 @app.route('/')
 def index():
@@ -50,10 +69,8 @@ def info():
 @app.route('/api/status')
 def status():
     """Estado del sistema"""
-    from models import HealthCheck
-    
     try:
-        nodos = HealthCheck.obtener_nodos_activos()
+        nodos = monitor.nodos_activos()
         
         return jsonify({
             'success': True,
@@ -93,8 +110,9 @@ if __name__ == '__main__':
     Replicación: {'Habilitada' if Config.REPLICA_ENABLED else 'Deshabilitada':<33}
     """)
     
+    # Servidor de desarrollo; en producción: gunicorn -c gunicorn.conf.py wsgi:app
     app.run(
-        debug=True, 
+        debug=Config.DEBUG, 
         host='0.0.0.0', 
         port=Config.NODO_PORT
     )
\ No newline at end of file
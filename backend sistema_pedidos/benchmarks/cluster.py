@@ -0,0 +1,529 @@
+"""
+Simulador de un cluster local para medir la replicación.
+
+Levanta N nodos (python app.py) en puertos distintos, cada uno con su propia
+base temporal y su NODO_ID. Cada nodo ve a los demás a través de un proxy TCP
+por enlace dirigido, en el que se puede inyectar latencia, cortes de
+conexión aleatorios y cortes totales del enlace; también se pueden matar y
+reiniciar nodos.
+
+Mientras dura la carga se muestrea el rezago de cada enlace: logs del
+origen que el destino aún no aplicó y antigüedad del más viejo. La carga
+reparte entre los nodos altas de clientes y productos, cambios de precio y
+stock (PUT) y pedidos; los cambios y los pedidos usan también productos
+creados en otros nodos, y si uno aún no llegó al nodo elegido la escritura
+cuenta como error. Al terminar se restablecen enlaces y nodos y se mide el
+tiempo hasta ponerse al día y si clientes, productos y pedidos quedaron
+iguales en todos los nodos.
+
+Uso (desde la carpeta del backend, con MySQL accesible según .env):
+    python -m benchmarks.cluster
+    python -m benchmarks.cluster --nodos 3 --duracion 60 --tasa 30 --latencia 0.05 --perdida 0.01
+    python -m benchmarks.cluster --matar nodo2:10:25 --cortar nodo1:nodo3:5:40 --salida cluster.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from benchmarks import entorno
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Columnas que se comparan para decidir si los nodos convergieron
+TABLAS_CONVERGENCIA = {
+    'clientes': ('id_cliente', 'nombre', 'email', 'telefono', 'direccion'),
+    'productos': ('id_producto', 'nombre', 'precio', 'stock'),
+    'pedidos': ('id_pedido', 'id_cliente', 'total', 'estado', 'nodo_procesado'),
+}
+
+
+class ProxyEnlace:
+    """
+    Proxy TCP de un enlace dirigido (origen -> destino).
+    latencia: segundos añadidos a cada tramo reenviado, en cada sentido.
+    perdida: probabilidad de cortar la conexión al reenviar un tramo de la petición.
+    cortado: rechaza conexiones nuevas y cierra las abiertas.
+    """
+
+    def __init__(self, puerto, puerto_destino, latencia=0.0, perdida=0.0):
+        self.puerto = puerto
+        self.puerto_destino = puerto_destino
+        self.latencia = latencia
+        self.perdida = perdida
+        self.cortado = False
+        self.conexiones_cortadas = 0
+        self._activas = set()
+        self._lock = threading.Lock()
+        self._servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._servidor.bind(('127.0.0.1', puerto))
+        self._servidor.listen(64)
+        threading.Thread(target=self._aceptar, name=f'proxy-{puerto}', daemon=True).start()
+
+    def _aceptar(self):
+        while True:
+            try:
+                cliente, _ = self._servidor.accept()
+            except OSError:
+                return
+            if self.cortado:
+                cliente.close()
+                continue
+            try:
+                destino = socket.create_connection(('127.0.0.1', self.puerto_destino), timeout=5)
+            except OSError:
+                cliente.close()
+                continue
+            with self._lock:
+                self._activas.update((cliente, destino))
+            threading.Thread(target=self._copiar, args=(cliente, destino, True), daemon=True).start()
+            threading.Thread(target=self._copiar, args=(destino, cliente, False), daemon=True).start()
+
+    def _copiar(self, origen, destino, es_peticion):
+        try:
+            while True:
+                datos = origen.recv(65536)
+                if not datos:
+                    break
+                if self.cortado or (es_peticion and self.perdida and random.random() < self.perdida):
+                    with self._lock:
+                        self.conexiones_cortadas += 1
+                    break
+                if self.latencia:
+                    time.sleep(self.latencia)
+                destino.sendall(datos)
+        except OSError:
+            pass
+        finally:
+            self._cerrar(origen, destino)
+
+    def _cerrar(self, *sockets):
+        for s in sockets:
+            with self._lock:
+                self._activas.discard(s)
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            s.close()
+
+    def cortar(self):
+        self.cortado = True
+        with self._lock:
+            activas = list(self._activas)
+        self._cerrar(*activas)
+
+    def restablecer(self):
+        self.cortado = False
+
+    def cerrar(self):
+        self.cortar()
+        self._servidor.close()
+
+
+class Nodo:
+    """Un proceso python app.py con su propia base de datos"""
+
+    def __init__(self, indice, total, puerto, base, replicas, directorio_logs):
+        self.indice = indice
+        self.nodo_id = f'nodo{indice}'
+        self.puerto = puerto
+        self.base = base
+        self.url = f'http://127.0.0.1:{puerto}'
+        self.entorno = dict(
+            os.environ,
+            NODO_ID=self.nodo_id,
+            NODO_PORT=str(puerto),
+            DB_NAME=base,
+            NODOS_REPLICAS=','.join(replicas),
+            REPLICA_ENABLED='true',
+            DB_AUTO_INCREMENT_INCREMENT=str(total),
+            DB_AUTO_INCREMENT_OFFSET=str(indice),
+            DEBUG='false',
+            PERFILADOR_HABILITADO='false'
+        )
+        self.ruta_log = os.path.join(directorio_logs, f'{self.nodo_id}.log')
+        self.proceso = None
+
+    def iniciar(self, espera=30):
+        with open(self.ruta_log, 'a') as log:
+            self.proceso = subprocess.Popen(
+                [sys.executable, 'app.py'], cwd=BACKEND, env=self.entorno, stdout=log, stderr=subprocess.STDOUT
+            )
+        limite = time.monotonic() + espera
+        while time.monotonic() < limite:
+            if self.proceso.poll() is not None:
+                raise RuntimeError(f'{self.nodo_id} terminó al iniciar; ver {self.ruta_log}')
+            try:
+                if requests.get(f'{self.url}/api/health/ping', timeout=1).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f'{self.nodo_id} no respondió en {espera}s; ver {self.ruta_log}')
+
+    def detener(self, forzado=False):
+        """forzado=True simula una caída (SIGKILL): no se vacía nada en memoria"""
+        if self.proceso is not None and self.proceso.poll() is None:
+            if forzado:
+                self.proceso.kill()
+            else:
+                self.proceso.terminate()
+            try:
+                self.proceso.wait(10)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+                self.proceso.wait()
+        self.proceso = None
+
+    def activo(self):
+        return self.proceso is not None and self.proceso.poll() is None
+
+
+class Carga:
+    """Escrituras continuas repartidas entre los nodos activos a una tasa total fija"""
+
+    def __init__(self, nodos, tasa, hilos=4):
+        self.nodos = nodos
+        self.tasa = tasa
+        self.hilos = hilos
+        self.detenida = threading.Event()
+        self._lock = threading.Lock()
+        # Cada nodo hace pedidos con los clientes que él mismo creó y con productos
+        # de cualquier nodo: así compiten por el mismo stock pedidos de nodos
+        # distintos, que es lo que la replicación tiene que hacer converger
+        self.clientes = {n.nodo_id: [] for n in nodos}
+        self.productos = {n.nodo_id: [] for n in nodos}
+        self.precios = {}  # id_producto -> último precio enviado
+        self.ok = {n.nodo_id: 0 for n in nodos}
+        self.errores = {n.nodo_id: 0 for n in nodos}
+
+    def _productos_de(self, nodo, azar):
+        """Mitad de las veces los del nodo, mitad los de todos (incluidos los de otros nodos)"""
+        with self._lock:
+            if azar.random() < 0.5:
+                return list(self.productos[nodo.nodo_id])
+            return [p for productos in self.productos.values() for p in productos]
+
+    def _operacion(self, sesion, nodo, azar, n):
+        clientes = self.clientes[nodo.nodo_id]
+        eleccion = azar.random()
+        if not clientes or eleccion < 0.15:
+            respuesta = sesion.post(f'{nodo.url}/api/clientes/', json={
+                'nombre': f'Cliente {nodo.nodo_id}-{n}',
+                'email': f'{nodo.nodo_id}.{n}.{azar.random()}@cluster.local',
+                'telefono': '555', 'direccion': 'Calle 1'
+            }, timeout=10)
+            if respuesta.status_code == 201:
+                with self._lock:
+                    clientes.append(respuesta.json()['cliente_id'])
+            return respuesta.status_code < 400
+
+        productos = self._productos_de(nodo, azar)
+        if len(productos) < 3 or eleccion < 0.25:
+            precio = round(azar.uniform(1, 100), 2)
+            respuesta = sesion.post(f'{nodo.url}/api/productos/', json={
+                'nombre': f'Producto {nodo.nodo_id}-{n}', 'descripcion': '', 'precio': precio, 'stock': 10 ** 6
+            }, timeout=10)
+            if respuesta.status_code == 201:
+                with self._lock:
+                    self.productos[nodo.nodo_id].append(respuesta.json()['producto_id'])
+                    self.precios[respuesta.json()['producto_id']] = precio
+            return respuesta.status_code < 400
+
+        if eleccion < 0.35:
+            # Cambio de precio y reposición de stock, quizá de un producto de otro nodo
+            id_producto = azar.choice(productos)
+            respuesta = sesion.get(f'{nodo.url}/api/productos/{id_producto}', timeout=10)
+            if respuesta.status_code != 200:
+                return False
+            producto = respuesta.json()['producto']
+            precio = round(azar.uniform(1, 100), 2)
+            respuesta = sesion.put(f'{nodo.url}/api/productos/{id_producto}', json={
+                'nombre': producto['nombre'], 'descripcion': producto['descripcion'],
+                'precio': precio, 'stock': producto['stock'] + azar.randint(1, 100)
+            }, timeout=10)
+            if respuesta.status_code < 400:
+                with self._lock:
+                    self.precios[id_producto] = precio
+            return respuesta.status_code < 400
+
+        elegidos = azar.sample(productos, min(3, len(productos)))
+        with self._lock:
+            precios = [self.precios[p] for p in elegidos]
+        respuesta = sesion.post(f'{nodo.url}/api/pedidos/', json={
+            'cliente_id': azar.choice(clientes),
+            'direccion_envio': 'Calle 1',
+            'detalles': [
+                {'id_producto': p, 'cantidad': 1, 'precio_unitario': precio}
+                for p, precio in zip(elegidos, precios)
+            ]
+        }, timeout=10)
+        return respuesta.status_code < 400
+
+    def _trabajador(self, numero):
+        azar = random.Random(numero)
+        sesion = requests.Session()
+        intervalo = self.hilos / self.tasa
+        siguiente = time.monotonic()
+        n = 0
+        while not self.detenida.is_set():
+            activos = [nodo for nodo in self.nodos if nodo.activo()]
+            if activos:
+                nodo = azar.choice(activos)
+                n += 1
+                try:
+                    correcta = self._operacion(sesion, nodo, azar, f'{numero}-{n}')
+                except requests.RequestException:
+                    correcta = False
+                with self._lock:
+                    if correcta:
+                        self.ok[nodo.nodo_id] += 1
+                    else:
+                        self.errores[nodo.nodo_id] += 1
+            siguiente += intervalo
+            self.detenida.wait(max(0, siguiente - time.monotonic()))
+
+    def iniciar(self):
+        self._hilos = [
+            threading.Thread(target=self._trabajador, args=(i,), daemon=True) for i in range(self.hilos)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def detener(self):
+        self.detenida.set()
+        for hilo in self._hilos:
+            hilo.join()
+
+
+def _disparar_replicacion(nodos, intervalo, detenido):
+    """Pide a cada nodo activo que replique sus pendientes cada intervalo segundos"""
+    sesion = requests.Session()
+    while not detenido.wait(intervalo):
+        for nodo in nodos:
+            if nodo.activo():
+                try:
+                    sesion.post(f'{nodo.url}/api/replicacion/replicar?esperar=0', timeout=5)
+                except requests.RequestException:
+                    pass
+
+
+def rezago(conexiones, nodos):
+    """{'origen->destino': (logs sin aplicar, segundos del más antiguo)} leído de las bases"""
+    aplicados = {}
+    for destino in nodos:
+        with conexiones[destino.nodo_id].cursor() as cursor:
+            cursor.execute("SELECT nodo_origen, ultimo_id_log FROM replicacion_aplicada")
+            aplicados[destino.nodo_id] = {f['nodo_origen']: f['ultimo_id_log'] for f in cursor.fetchall()}
+
+    resultado = {}
+    for origen in nodos:
+        with conexiones[origen.nodo_id].cursor() as cursor:
+            for destino in nodos:
+                if destino is origen:
+                    continue
+                cursor.execute("""
+                    SELECT COUNT(*) AS pendientes, MIN(fecha_operacion) AS mas_antiguo
+                    FROM log_replicacion
+                    WHERE nodo_origen = %s AND id_log > %s
+                """, (origen.nodo_id, aplicados[destino.nodo_id].get(origen.nodo_id, 0)))
+                fila = cursor.fetchone()
+                segundos = 0.0
+                if fila['mas_antiguo'] is not None:
+                    segundos = max(0.0, (datetime.now() - fila['mas_antiguo']).total_seconds())
+                resultado[f'{origen.nodo_id}->{destino.nodo_id}'] = (fila['pendientes'], segundos)
+    return resultado
+
+
+def huellas(conexiones, nodos):
+    """{tabla: {nodo_id: (filas, checksum)}} para comparar el contenido entre nodos"""
+    resultado = {}
+    for tabla, columnas in TABLAS_CONVERGENCIA.items():
+        resultado[tabla] = {}
+        for nodo in nodos:
+            with conexiones[nodo.nodo_id].cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT COUNT(*) AS filas,
+                           COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', {', '.join(columnas)}))), 0) AS suma
+                    FROM {tabla}
+                """)
+                fila = cursor.fetchone()
+                resultado[tabla][nodo.nodo_id] = (fila['filas'], int(fila['suma']))
+    return resultado
+
+
+def _leer_eventos(argumentos):
+    """[(segundo, accion, objetivo)] a partir de --matar y --cortar"""
+    eventos = []
+    for valor in argumentos.matar or []:
+        nodo, desde, hasta = valor.split(':')
+        eventos += [(float(desde), 'matar', nodo), (float(hasta), 'reiniciar', nodo)]
+    for valor in argumentos.cortar or []:
+        origen, destino, desde, hasta = valor.split(':')
+        # Se cortan los dos sentidos del enlace
+        eventos += [(float(desde), 'cortar', (origen, destino)), (float(hasta), 'restablecer', (origen, destino))]
+    return sorted(eventos, key=lambda e: e[0])
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description='Cluster local para medir la replicación')
+    parser.add_argument('--nodos', type=int, default=3)
+    parser.add_argument('--puerto', type=int, default=6100, help='puerto del primer nodo')
+    parser.add_argument('--duracion', type=float, default=30, help='segundos de carga')
+    parser.add_argument('--tasa', type=float, default=20, help='escrituras por segundo en total')
+    parser.add_argument('--hilos', type=int, default=4, help='hilos de carga')
+    parser.add_argument('--latencia', type=float, default=0.0, help='segundos por tramo en cada enlace')
+    parser.add_argument('--perdida', type=float, default=0.0, help='probabilidad de cortar una conexión')
+    parser.add_argument('--intervalo', type=float, default=1.0, help='segundos entre disparos de replicación')
+    parser.add_argument('--matar', action='append', metavar='NODO:DESDE:HASTA', help='p. ej. nodo2:10:25')
+    parser.add_argument('--cortar', action='append', metavar='ORIGEN:DESTINO:DESDE:HASTA', help='p. ej. nodo1:nodo3:5:40')
+    parser.add_argument('--espera', type=float, default=120, help='segundos máximos para ponerse al día')
+    parser.add_argument('--muestreo', type=float, default=0.5, help='segundos entre muestras de rezago')
+    parser.add_argument('--salida', metavar='ARCHIVO', help='guardar el resumen en JSON')
+    parser.add_argument('--conservar', action='store_true', help='no borrar las bases al terminar')
+    return parser.parse_args()
+
+
+def main():
+    argumentos = _argumentos()
+    n = argumentos.nodos
+    prefijo = f'cluster_{os.getpid()}'
+    directorio_logs = os.path.join(BACKEND, 'logs', prefijo)
+    os.makedirs(directorio_logs, exist_ok=True)
+
+    # Puertos: nodo i en puerto + i; enlace i->j en puerto + 100 + i * n + j
+    puerto_nodo = {i: argumentos.puerto + i for i in range(1, n + 1)}
+    proxies = {}
+    nodos = []
+    for i in range(1, n + 1):
+        replicas = []
+        for j in range(1, n + 1):
+            if i == j:
+                continue
+            puerto = argumentos.puerto + 100 + i * n + j
+            proxies[(f'nodo{i}', f'nodo{j}')] = ProxyEnlace(
+                puerto, puerto_nodo[j], argumentos.latencia, argumentos.perdida
+            )
+            replicas.append(f'http://127.0.0.1:{puerto}')
+        nodos.append(Nodo(i, n, puerto_nodo[i], f'{prefijo}_nodo{i}', replicas, directorio_logs))
+    por_id = {nodo.nodo_id: nodo for nodo in nodos}
+
+    conexiones = {}
+    detenido = threading.Event()
+    try:
+        for nodo in nodos:
+            entorno.crear_base(nodo.base)
+            conexiones[nodo.nodo_id] = entorno.conectar(nodo.base)
+        for nodo in nodos:
+            nodo.iniciar()
+        print(f'{n} nodos activos; logs en {directorio_logs}')
+
+        threading.Thread(
+            target=_disparar_replicacion, args=(nodos, argumentos.intervalo, detenido), daemon=True
+        ).start()
+        carga = Carga(nodos, argumentos.tasa, argumentos.hilos)
+        carga.iniciar()
+
+        eventos = _leer_eventos(argumentos)
+        muestras = []
+        inicio = time.monotonic()
+        while True:
+            transcurrido = time.monotonic() - inicio
+            if transcurrido >= argumentos.duracion:
+                break
+            while eventos and eventos[0][0] <= transcurrido:
+                _, accion, objetivo = eventos.pop(0)
+                print(f'[{transcurrido:6.1f}s] {accion} {objetivo}')
+                if accion == 'matar':
+                    por_id[objetivo].detener(forzado=True)
+                elif accion == 'reiniciar':
+                    por_id[objetivo].iniciar()
+                else:
+                    for enlace in (objetivo, objetivo[::-1]):
+                        getattr(proxies[enlace], 'cortar' if accion == 'cortar' else 'restablecer')()
+            muestras.append((round(transcurrido, 2), rezago(conexiones, nodos)))
+            time.sleep(argumentos.muestreo)
+
+        carga.detener()
+        print('Carga detenida; restableciendo enlaces y nodos...')
+        for proxy in proxies.values():
+            proxy.restablecer()
+        for nodo in nodos:
+            if not nodo.activo():
+                nodo.iniciar()
+
+        # Ponerse al día: hasta que ningún enlace tenga logs sin aplicar
+        inicio_catchup = time.monotonic()
+        tiempo_catchup = None
+        while time.monotonic() - inicio_catchup < argumentos.espera:
+            actual = rezago(conexiones, nodos)
+            if all(pendientes == 0 for pendientes, _ in actual.values()):
+                tiempo_catchup = round(time.monotonic() - inicio_catchup, 2)
+                break
+            time.sleep(argumentos.muestreo)
+
+        convergencia = huellas(conexiones, nodos)
+        convergidas = {
+            tabla: len(set(valores.values())) == 1 for tabla, valores in convergencia.items()
+        }
+    finally:
+        detenido.set()
+        for nodo in nodos:
+            nodo.detener()
+        for proxy in proxies.values():
+            proxy.cerrar()
+        for conexion in conexiones.values():
+            conexion.close()
+        if not argumentos.conservar:
+            for nodo in nodos:
+                entorno.eliminar_base(nodo.base)
+
+    enlaces = sorted({enlace for _, valores in muestras for enlace in valores})
+    resumen = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'parametros': {k: v for k, v in vars(argumentos).items() if k not in ('salida', 'conservar')},
+        'escrituras_ok': carga.ok,
+        'escrituras_error': carga.errores,
+        'conexiones_cortadas': sum(p.conexiones_cortadas for p in proxies.values()),
+        'rezago_maximo': {
+            enlace: {
+                'logs': max(v[enlace][0] for _, v in muestras if enlace in v),
+                'segundos': round(max(v[enlace][1] for _, v in muestras if enlace in v), 2)
+            }
+            for enlace in enlaces
+        },
+        'catchup_segundos': tiempo_catchup,
+        'convergencia': convergidas,
+        'huellas': {tabla: {nodo: list(v) for nodo, v in valores.items()} for tabla, valores in convergencia.items()},
+        'muestras': [
+            {'t': t, 'rezago': {enlace: list(v) for enlace, v in valores.items()}} for t, valores in muestras
+        ]
+    }
+
+    print(f"\nEscrituras: {sum(carga.ok.values())} correctas, {sum(carga.errores.values())} con error")
+    print('Rezago máximo por enlace:')
+    for enlace, valor in resumen['rezago_maximo'].items():
+        print(f"  {enlace:<14}{valor['logs']:>7} logs {valor['segundos']:>8.2f} s")
+    print(f"Puesta al día: {tiempo_catchup if tiempo_catchup is not None else 'no terminó'} s")
+    for tabla, igual in convergidas.items():
+        print(f"  {tabla:<10}{'converge' if igual else 'DIFIERE'}")
+
+    if argumentos.salida:
+        with open(argumentos.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resumen, archivo, indent=2, ensure_ascii=False)
+        print(f'Resumen guardado en {argumentos.salida}')
+    return 0 if tiempo_catchup is not None and all(convergidas.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
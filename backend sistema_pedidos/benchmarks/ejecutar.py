@@ -0,0 +1,236 @@
+"""
+Benchmarks del backend contra una base MySQL/MariaDB local desechable.
+
+Crea una base temporal (bench_<pid>) con el esquema y las migraciones, la
+puebla con datos sintéticos, corre los escenarios contra la app Flask real y
+borra la base al terminar. Reporta operaciones por segundo y latencias
+p50/p95/p99; con --guardar deja una línea base en JSON y con --comparar
+termina con código 1 si algún escenario empeora más que --tolerancia.
+
+Uso (desde la carpeta del backend, con MySQL accesible según .env):
+    python -m benchmarks.ejecutar
+    python -m benchmarks.ejecutar --guardar benchmarks/linea_base.json
+    python -m benchmarks.ejecutar --comparar benchmarks/linea_base.json
+    python -m benchmarks.ejecutar -e crear_pedido --lineas 20 -n 500 -c 8
+    python -m benchmarks.ejecutar --url http://localhost:5000 --base sistema_pedidos_bench
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description='Benchmarks del sistema de pedidos')
+    parser.add_argument('-e', '--escenarios', nargs='+', help='escenarios a correr (por defecto todos)')
+    parser.add_argument('-n', '--iteraciones', type=int, default=300, help='peticiones por escenario')
+    parser.add_argument('-c', '--concurrencia', type=int, default=4, help='hilos que hacen peticiones')
+    parser.add_argument('--calentamiento', type=int, default=20, help='peticiones previas no medidas')
+    parser.add_argument('--lineas', type=int, default=5, help='líneas por pedido en crear_pedido')
+    parser.add_argument('--logs', type=int, default=500, help='logs por lote en replicacion')
+    parser.add_argument('--clientes', type=int, default=200)
+    parser.add_argument('--productos', type=int, default=1000)
+    parser.add_argument('--pedidos', type=int, default=5000, help='pedidos precargados')
+    parser.add_argument('--base', help='usar esta base en lugar de una temporal (no se borra)')
+    parser.add_argument('--url', help='medir por HTTP contra un nodo ya levantado sobre --base')
+    parser.add_argument('--guardar', metavar='ARCHIVO', help='guardar los resultados como línea base')
+    parser.add_argument('--comparar', metavar='ARCHIVO', help='comparar con una línea base')
+    parser.add_argument('--tolerancia', type=float, default=10, help='empeoramiento admitido en %%')
+    argumentos = parser.parse_args()
+    if argumentos.url and not argumentos.base:
+        parser.error('--url requiere --base: la base que usa ese nodo, para poblarla')
+    return argumentos
+
+
+class ClienteHTTP:
+    """Misma interfaz que el test client de Flask, sobre una requests.Session"""
+
+    def __init__(self, url):
+        import requests
+        self.url = url.rstrip('/')
+        self.sesion = requests.Session()
+
+    def get(self, ruta):
+        return self.sesion.get(self.url + ruta, timeout=60)
+
+    def post(self, ruta, json=None, data=None, headers=None):
+        return self.sesion.post(self.url + ruta, json=json, data=data, headers=headers, timeout=60)
+
+
+def percentil(ordenados, p):
+    """Percentil p (0-100) por rango más cercano sobre una lista ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def medir(nuevo_cliente, peticion, iteraciones, concurrencia, calentamiento):
+    """Corre iteraciones peticiones repartidas entre concurrencia hilos"""
+    cliente = nuevo_cliente()
+    for i in range(calentamiento):
+        peticion(cliente, -1 - i)
+
+    latencias = []
+    errores = []
+
+    def trabajador(indices):
+        cliente = nuevo_cliente()
+        for i in indices:
+            inicio = time.perf_counter()
+            try:
+                respuesta = peticion(cliente, i)
+                correcta = respuesta.status_code < 400
+            except Exception:
+                correcta = False
+            latencias.append(time.perf_counter() - inicio)
+            if not correcta:
+                errores.append(i)
+
+    hilos = [
+        threading.Thread(target=trabajador, args=(range(h, iteraciones, concurrencia),))
+        for h in range(concurrencia)
+    ]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.perf_counter() - inicio
+
+    ordenadas = sorted(latencias)
+    return {
+        'operaciones': len(latencias),
+        'errores': len(errores),
+        'segundos': round(segundos, 3),
+        'ops_por_segundo': round(len(latencias) / segundos, 2) if segundos else 0,
+        'media_ms': round(sum(ordenadas) / len(ordenadas) * 1000, 3) if ordenadas else 0,
+        'p50_ms': round(percentil(ordenadas, 50) * 1000, 3),
+        'p95_ms': round(percentil(ordenadas, 95) * 1000, 3),
+        'p99_ms': round(percentil(ordenadas, 99) * 1000, 3),
+        'max_ms': round(ordenadas[-1] * 1000, 3) if ordenadas else 0
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def imprimir(resultados):
+    print(f"{'escenario':<16}{'ops':>7}{'err':>5}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for nombre, r in resultados.items():
+        print(
+            f"{nombre:<16}{r['operaciones']:>7}{r['errores']:>5}{r['ops_por_segundo']:>10}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+            + (f"   ({r['unidades_por_segundo']} {r['unidad']}/s)" if 'unidad' in r else '')
+        )
+
+
+def comparar(resultados, linea_base, tolerancia):
+    """Imprime las diferencias; retorna los escenarios que empeoraron más que tolerancia (%)"""
+    print(f"\nComparación con {linea_base.get('commit') or '?'} ({linea_base.get('fecha')})")
+    if linea_base.get('parametros') != resultados['parametros']:
+        print('  Aviso: la línea base se midió con otros parámetros')
+
+    empeorados = []
+    for nombre, actual in resultados['escenarios'].items():
+        base = linea_base['escenarios'].get(nombre)
+        if not base:
+            print(f'  {nombre:<16}sin línea base')
+            continue
+        delta_ops = (actual['ops_por_segundo'] - base['ops_por_segundo']) / base['ops_por_segundo'] * 100 \
+            if base['ops_por_segundo'] else 0
+        delta_p95 = (actual['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0
+        empeoro = delta_ops < -tolerancia or delta_p95 > tolerancia
+        if empeoro:
+            empeorados.append(nombre)
+        print(f"  {nombre:<16}ops/s {delta_ops:+7.1f}%   p95 {delta_p95:+7.1f}%{'   EMPEORA' if empeoro else ''}")
+    return empeorados
+
+
+def main():
+    argumentos = _argumentos()
+
+    # La base se fija antes de importar la app: Config la lee al importarse
+    temporal = not argumentos.base
+    nombre_base = argumentos.base or f'bench_{os.getpid()}'
+    os.environ['DB_NAME'] = nombre_base
+    os.environ['NODOS_REPLICAS'] = ''
+    os.environ['PERFILADOR_HABILITADO'] = 'false'
+
+    from benchmarks import entorno
+    from benchmarks.escenarios import ESCENARIOS
+
+    nombres = argumentos.escenarios or list(ESCENARIOS)
+    desconocidos = [n for n in nombres if n not in ESCENARIOS]
+    if desconocidos:
+        print(f"Escenarios desconocidos: {', '.join(desconocidos)}; opciones: {', '.join(ESCENARIOS)}")
+        return 2
+
+    if temporal:
+        print(f'Creando base temporal {nombre_base}...')
+        entorno.crear_base(nombre_base)
+    try:
+        print('Poblando datos...')
+        ids = entorno.poblar(argumentos.clientes, argumentos.productos, argumentos.pedidos, argumentos.lineas)
+
+        if argumentos.url:
+            nuevo_cliente = lambda: ClienteHTTP(argumentos.url)
+        else:
+            from app import app
+            nuevo_cliente = app.test_client
+
+        contexto = dict(ids, lineas=argumentos.lineas, logs=argumentos.logs)
+        resultados = {}
+        for nombre in nombres:
+            constructor, unidad = ESCENARIOS[nombre]
+            print(f'Midiendo {nombre}...')
+            resultado = medir(
+                nuevo_cliente, constructor(contexto), argumentos.iteraciones,
+                argumentos.concurrencia, argumentos.calentamiento
+            )
+            if unidad:
+                resultado['unidad'] = unidad
+                resultado['unidades_por_segundo'] = round(resultado['ops_por_segundo'] * contexto[unidad], 2)
+            resultados[nombre] = resultado
+    finally:
+        if temporal:
+            entorno.eliminar_base(nombre_base)
+
+    print()
+    imprimir(resultados)
+
+    salida = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_actual(),
+        'parametros': {
+            clave: getattr(argumentos, clave)
+            for clave in ('iteraciones', 'concurrencia', 'lineas', 'logs', 'clientes', 'productos', 'pedidos')
+        },
+        'modo': 'http' if argumentos.url else 'test_client',
+        'escenarios': resultados
+    }
+    if argumentos.guardar:
+        with open(argumentos.guardar, 'w', encoding='utf-8') as archivo:
+            json.dump(salida, archivo, indent=2, ensure_ascii=False)
+        print(f'\nLínea base guardada en {argumentos.guardar}')
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding='utf-8') as archivo:
+            linea_base = json.load(archivo)
+        if comparar(salida, linea_base, argumentos.tolerancia):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
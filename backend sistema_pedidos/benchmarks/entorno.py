@@ -0,0 +1,139 @@
+"""
+Base de datos desechable para los benchmarks.
+
+crear_base() crea una base vacía con el esquema de sistema_pedidos.sql y las
+migraciones; eliminar_base() la borra. poblar() llena con datos sintéticos la
+base de Config.DB_NAME, que debe apuntar ya a la temporal (ver benchmarks/ejecutar.py).
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+import pymysql
+from config import Config
+
+ESQUEMA = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'sistema_pedidos.sql'
+)
+
+
+def conectar(base=None):
+    return pymysql.connect(
+        host=Config.DB_HOST,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        port=Config.DB_PORT,
+        database=base,
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=True
+    )
+
+
+def crear_base(nombre):
+    """Crea la base nombre con el esquema inicial y todas las migraciones"""
+    from migrar import _sentencias, aplicar_pendientes
+
+    connection = conectar()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE `{nombre}`")
+    finally:
+        connection.close()
+
+    connection = conectar(nombre)
+    try:
+        with connection.cursor() as cursor:
+            for sentencia in _sentencias(ESQUEMA):
+                # El script crea y usa la base sistema_pedidos: aquí ya estamos en la temporal
+                if sentencia.upper().startswith(('CREATE DATABASE', 'USE ')):
+                    continue
+                cursor.execute(sentencia)
+        aplicar_pendientes(salida=lambda mensaje: None, connection=connection)
+    finally:
+        connection.close()
+
+
+def eliminar_base(nombre):
+    from database import cerrar_pool
+
+    if nombre == Config.DB_NAME:
+        cerrar_pool()
+    connection = conectar()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{nombre}`")
+    finally:
+        connection.close()
+
+
+def poblar(clientes=200, productos=1000, pedidos=5000, lineas=3, semilla=1):
+    """
+    Inserta datos sintéticos: pedidos repartidos en el último año y stock de
+    sobra para que los benchmarks de creación no se queden sin él.
+    Retorna {'clientes': [ids], 'productos': [ids], 'precios': {id_producto: precio}}.
+    """
+    from database import transaccion
+    from utils import estadisticas, ventas
+
+    azar = random.Random(semilla)
+    ahora = datetime.now().replace(microsecond=0)
+    # Sobre una base reutilizada (--base) los emails no deben repetir los de otra corrida
+    corrida = ahora.strftime('%Y%m%d%H%M%S')
+
+    with transaccion() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(id_cliente), 0) AS ultimo FROM clientes")
+        ultimo_cliente = cursor.fetchone()['ultimo']
+        cursor.execute("SELECT COALESCE(MAX(id_producto), 0) AS ultimo FROM productos")
+        ultimo_producto = cursor.fetchone()['ultimo']
+
+        cursor.executemany(
+            "INSERT INTO clientes (nombre, email, telefono, direccion) VALUES (%s, %s, %s, %s)",
+            [(f'Cliente {i}', f'cliente{i}.{corrida}@bench.local', f'555-{i:04d}', f'Calle {i}') for i in range(clientes)]
+        )
+        cursor.executemany(
+            "INSERT INTO productos (nombre, descripcion, precio, stock) VALUES (%s, %s, %s, %s)",
+            [(f'Producto {i:05d}', f'Descripción {i}', round(azar.uniform(1, 500), 2), 10 ** 7) for i in range(productos)]
+        )
+        cursor.execute("SELECT id_cliente FROM clientes WHERE id_cliente > %s ORDER BY id_cliente", (ultimo_cliente,))
+        ids_clientes = [f['id_cliente'] for f in cursor.fetchall()]
+        cursor.execute(
+            "SELECT id_producto, precio FROM productos WHERE id_producto > %s ORDER BY id_producto",
+            (ultimo_producto,)
+        )
+        precios = {f['id_producto']: f['precio'] for f in cursor.fetchall()}
+        ids_productos = sorted(precios)
+
+        for inicio in range(0, pedidos, 1000):
+            cantidad = min(1000, pedidos - inicio)
+            filas_pedidos = []
+            detalles = []
+            for _ in range(cantidad):
+                elegidos = azar.sample(ids_productos, min(lineas, len(ids_productos)))
+                lineas_pedido = [(p, azar.randint(1, 5), precios[p]) for p in elegidos]
+                fecha = ahora - timedelta(seconds=azar.randint(0, 365 * 24 * 3600))
+                total = sum(c * precio for _, c, precio in lineas_pedido)
+                filas_pedidos.append((azar.choice(ids_clientes), fecha, total, 'Dirección de prueba', Config.NODO_ID))
+                detalles.append(lineas_pedido)
+            cursor.executemany("""
+                INSERT INTO pedidos (id_cliente, fecha_pedido, total, direccion_envio, nodo_procesado)
+                VALUES (%s, %s, %s, %s, %s)
+            """, filas_pedidos)
+            # 1000 filas caben en un solo INSERT multi-fila: lastrowid es el id de la primera
+            primero = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO detalle_pedidos (id_pedido, id_producto, cantidad, precio_unitario, subtotal)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [
+                (primero + i * Config.DB_AUTO_INCREMENT_INCREMENT, p, c, precio, c * precio)
+                for i, lineas_pedido in enumerate(detalles)
+                for p, c, precio in lineas_pedido
+            ])
+
+    estadisticas.reconstruir()
+    ventas.reconstruir()
+    return {
+        'clientes': ids_clientes,
+        'productos': ids_productos,
+        'precios': {id_producto: float(precio) for id_producto, precio in precios.items()}
+    }
@@ -0,0 +1,121 @@
+"""
+Escenarios de benchmark. Cada uno recibe el contexto (ids poblados y
+parámetros) y retorna una función peticion(cliente, i) que hace la i-ésima
+petición y retorna la respuesta; cliente es el test client de Flask o un
+ClienteHTTP con la misma interfaz (get/post).
+"""
+import itertools
+import random
+import threading
+
+from utils.formato_replicacion import TIPO_COMPACTO, codificar
+
+ORIGEN_REPLICACION = 'bench-origen'
+
+
+def crear_pedido(contexto):
+    """POST /api/pedidos con contexto['lineas'] líneas de productos distintos, a su precio"""
+    productos = contexto['productos']
+    precios = contexto['precios']
+    clientes = contexto['clientes']
+    lineas = min(contexto['lineas'], len(productos))
+
+    def peticion(cliente, i):
+        azar = random.Random(i)
+        return cliente.post('/api/pedidos/', json={
+            'cliente_id': azar.choice(clientes),
+            'direccion_envio': 'Dirección de prueba',
+            'detalles': [
+                {'id_producto': p, 'cantidad': 1, 'precio_unitario': precios[p]}
+                for p in azar.sample(productos, lineas)
+            ]
+        })
+    return peticion
+
+
+def catalogo(contexto):
+    """Alterna la primera página del catálogo y productos individuales"""
+    productos = contexto['productos']
+
+    def peticion(cliente, i):
+        if i % 2 == 0:
+            return cliente.get('/api/productos/?limit=100')
+        return cliente.get(f'/api/productos/{random.Random(i).choice(productos)}')
+    return peticion
+
+
+def listar_pedidos(contexto):
+    """Alterna la primera página de pedidos y los pedidos de un cliente"""
+    clientes = contexto['clientes']
+
+    def peticion(cliente, i):
+        if i % 2 == 0:
+            return cliente.get('/api/pedidos/?limit=100')
+        return cliente.get(f'/api/pedidos/cliente/{random.Random(i).choice(clientes)}?limit=50')
+    return peticion
+
+
+def replicacion(contexto):
+    """
+    Ponerse al día: cada petición aplica un lote de contexto['logs'] logs de
+    otro nodo (altas de clientes y cambios de productos) en formato compacto.
+    """
+    from database import execute_query
+
+    productos = contexto['productos']
+    precios = contexto['precios']
+    tam_lote = contexto['logs']
+    # Sobre una base reutilizada los id_log de una corrida anterior ya figuran como aplicados
+    execute_query("DELETE FROM replicacion_aplicada WHERE nodo_origen = %s", (ORIGEN_REPLICACION,))
+    siguiente = itertools.count(1, tam_lote)
+    lock = threading.Lock()
+
+    def peticion(cliente, i):
+        with lock:
+            # Los id_log de un origen deben llegar en orden para no omitirse
+            primero = next(siguiente)
+            logs = []
+            for id_log in range(primero, primero + tam_lote):
+                if id_log % 2:
+                    logs.append({
+                        'id_log': id_log, 'tabla_afectada': 'clientes', 'operacion': 'INSERT',
+                        'nodo_origen': ORIGEN_REPLICACION, 'id_registro': 10 ** 8 + id_log,
+                        'datos_json': {
+                            'nombre': f'Replicado {id_log}', 'email': f'replicado{id_log}@bench.local',
+                            'telefono': '555', 'direccion': 'Calle replicada'
+                        },
+                        'fecha_operacion': None
+                    })
+                else:
+                    id_producto = productos[id_log % len(productos)]
+                    logs.append({
+                        'id_log': id_log, 'tabla_afectada': 'productos', 'operacion': 'UPDATE',
+                        'nodo_origen': ORIGEN_REPLICACION, 'id_registro': id_producto,
+                        'datos_json': {
+                            'nombre': f'Producto {id_producto}', 'descripcion': 'Replicado',
+                            'precio': precios[id_producto], 'ajuste_stock': 0
+                        },
+                        'fecha_operacion': None
+                    })
+            return cliente.post(
+                '/api/replicacion/sincronizar',
+                data=codificar(logs),
+                headers={'Content-Type': TIPO_COMPACTO}
+            )
+    return peticion
+
+
+def info(contexto):
+    def peticion(cliente, i):
+        return cliente.get('/api/info')
+    return peticion
+
+
+# nombre -> (constructor, unidades por petición para el throughput secundario)
+ESCENARIOS = {
+    'crear_pedido': (crear_pedido, None),
+    'catalogo': (catalogo, None),
+    'listar_pedidos': (listar_pedidos, None),
+    'replicacion': (replicacion, 'logs'),
+    'info': (info, None),
+}
@@ -12,16 +12,130 @@ class Config:
     DB_PASSWORD = os.getenv('DB_PASSWORD', '')
     DB_NAME = os.getenv('DB_NAME', 'sistema_pedidos')
     DB_PORT = int(os.getenv('DB_PORT', 3306))
+    # Ids autoincrementales sin colisiones entre nodos: cada nodo usa otro offset (1..increment)
+    DB_AUTO_INCREMENT_INCREMENT = int(os.getenv('DB_AUTO_INCREMENT_INCREMENT', 1))
+    DB_AUTO_INCREMENT_OFFSET = int(os.getenv('DB_AUTO_INCREMENT_OFFSET', 1))
+    
+    # Pool de conexiones
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))  # segundos esperando una conexión libre
+    DB_POOL_MAX_LIFETIME = int(os.getenv('DB_POOL_MAX_LIFETIME', 1800))  # segundos de vida de una conexión
+    DB_POOL_MAX_IDLE = int(os.getenv('DB_POOL_MAX_IDLE', 300))  # segundos inactiva antes de reciclarla
+    DB_POOL_PING_INTERVAL = int(os.getenv('DB_POOL_PING_INTERVAL', 30))  # 0 = ping en cada préstamo
+    
+    # Cache de productos
+    CACHE_PRODUCTOS_TAMANO = int(os.getenv('CACHE_PRODUCTOS_TAMANO', 1000))  # entradas
+    CACHE_PRODUCTOS_TTL = int(os.getenv('CACHE_PRODUCTOS_TTL', 60))  # segundos
+    CACHE_PRODUCTOS_VERIFICAR = float(os.getenv('CACHE_PRODUCTOS_VERIFICAR', 1))  # segundos entre consultas de la versión compartida (0 = en cada lectura)
+    
+    # Contadores de pedidos por estado y por nodo (utils/estadisticas.py)
+    ESTADISTICAS_SLOTS = int(os.getenv('ESTADISTICAS_SLOTS', 16))  # filas por contador (1-256); cada transacción suma en una al azar
+    VENTAS_SLOTS = int(os.getenv('VENTAS_SLOTS', 8))  # filas por periodo, nodo y producto en los rollups de ventas (utils/ventas.py)
+    
+    # Idempotency-Key en los POST que crean registros (utils/idempotencia.py)
+    IDEMPOTENCIA_TTL = int(os.getenv('IDEMPOTENCIA_TTL', 86400))  # segundos que se guarda cada respuesta
+    IDEMPOTENCIA_BLOQUEO = int(os.getenv('IDEMPOTENCIA_BLOQUEO', 60))  # segundos que dura la reserva si el proceso cae
+    IDEMPOTENCIA_CACHE = int(os.getenv('IDEMPOTENCIA_CACHE', 10000))  # respuestas en memoria por proceso
+    IDEMPOTENCIA_PURGA = int(os.getenv('IDEMPOTENCIA_PURGA', 600))  # segundos entre purgas de claves vencidas
+    
+    # Paginación de listados
+    PAGINA_LIMITE = int(os.getenv('PAGINA_LIMITE', 100))
+    PAGINA_LIMITE_MAX = int(os.getenv('PAGINA_LIMITE_MAX', 1000))
+    
+    # Cargas masivas /bulk (utils/importacion.py)
+    IMPORTACION_LOTE = int(os.getenv('IMPORTACION_LOTE', 500))  # filas por transacción y por log de replicación
+    IMPORTACION_MAX_ERRORES = int(os.getenv('IMPORTACION_MAX_ERRORES', 1000))  # errores por fila detallados en la respuesta
+    IMPORTACION_JSON_MAX = int(os.getenv('IMPORTACION_JSON_MAX', 10 * 1024 * 1024))  # bytes de un cuerpo JSON (se carga entero en memoria; lo grande va en CSV)
+    AJUSTES_STOCK_MAX = int(os.getenv('AJUSTES_STOCK_MAX', 20000))  # filas por ajuste masivo de stock (una transacción)
     
     # Configuración de Nodo
     NODO_ID = os.getenv('NODO_ID', 'nodo1')
     NODO_PORT = int(os.getenv('NODO_PORT', 5000))
+    DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'  # solo con el servidor de desarrollo (python app.py)
+    
+    # Servidor WSGI de producción (gunicorn.conf.py)
+    WSGI_WORKERS = int(os.getenv('WSGI_WORKERS', 3))  # procesos; cada uno con su propio pool de DB_POOL_MAX
+    WSGI_THREADS = int(os.getenv('WSGI_THREADS', 4))  # hilos por proceso
+    WSGI_TIMEOUT = int(os.getenv('WSGI_TIMEOUT', 60))  # segundos antes de reiniciar un worker colgado
+    WSGI_GRACEFUL_TIMEOUT = int(os.getenv('WSGI_GRACEFUL_TIMEOUT', 30))  # segundos para terminar peticiones al recargar
+    WSGI_MAX_REQUESTS = int(os.getenv('WSGI_MAX_REQUESTS', 0))  # peticiones antes de reciclar un worker (0 = nunca)
     
     # Configuración de Replicación
     REPLICA_ENABLED = os.getenv('REPLICA_ENABLED', 'true').lower() == 'true'
-    NODOS_REPLICAS = os.getenv('NODOS_REPLICAS', 'http://localhost:5001,http://localhost:5002').split(',')
+    NODOS_REPLICAS = [
+        url.strip() for url in os.getenv('NODOS_REPLICAS', 'http://localhost:5001,http://localhost:5002').split(',')
+        if url.strip()
+    ]  # vacío = nodo sin réplicas
+    
+    REPLICATION_CHUNK = int(os.getenv('REPLICATION_CHUNK', 500))  # logs por lote enviado
+    REPLICATION_ESPERA_HUECO = int(os.getenv('REPLICATION_ESPERA_HUECO', 300))  # segundos que se espera un id_log no visible antes de saltarlo
+    REPLICATION_ESPERA_HUECO_SIN_PERMISO = int(os.getenv('REPLICATION_ESPERA_HUECO_SIN_PERMISO', 10))  # ídem cuando no se pueden consultar las transacciones abiertas (sin privilegio PROCESS)
+    REPLICATION_COLA = int(os.getenv('REPLICATION_COLA', 1000))  # trabajos en cola por nodo réplica
+    REPLICATION_FORMATO = os.getenv('REPLICATION_FORMATO', 'compacto')  # 'compacto' o 'json'
+    REPLICATION_COMPRESION = int(os.getenv('REPLICATION_COMPRESION', 6))  # nivel zlib 1-9
+    REPLICATION_MAX_DESCOMPRIMIDO = int(os.getenv('REPLICATION_MAX_DESCOMPRIMIDO', 128 * 1024 * 1024))  # bytes de un lote recibido, ya descomprimido
+    REPLICATION_PURGE = os.getenv('REPLICATION_PURGE', 'false').lower() == 'true'  # borrar logs confirmados por todos
+    
+    # Buffer de escritura del log de replicación (cuando no hay transacción a la que unirse)
+    LOG_BUFFER_LOTE = int(os.getenv('LOG_BUFFER_LOTE', 500))  # filas por INSERT
+    LOG_BUFFER_INTERVALO = float(os.getenv('LOG_BUFFER_INTERVALO', 0.2))  # segundos máximo antes de escribir
+    LOG_BUFFER_CAPACIDAD = int(os.getenv('LOG_BUFFER_CAPACIDAD', 10000))  # filas en memoria
+    LOG_BUFFER_ESPERA = float(os.getenv('LOG_BUFFER_ESPERA', 1))  # segundos de espera con la cola llena
+    
+    # Métricas en /api/metrics (hooks de Flask y observador de queries)
+    METRICAS_HABILITADAS = os.getenv('METRICAS_HABILITADAS', 'true').lower() == 'true'
+    METRICAS_DIRECTORIO = os.getenv('METRICAS_DIRECTORIO', '')  # donde cada worker publica sus métricas para sumarlas ('' = solo las del proceso)
+    METRICAS_PUBLICAR = float(os.getenv('METRICAS_PUBLICAR', 5))  # segundos entre publicaciones de cada worker
+    
+    # Perfilador de queries por petición (solo para depuración: guarda cada sentencia)
+    PERFILADOR_HABILITADO = os.getenv('PERFILADOR_HABILITADO', 'false').lower() == 'true'
+    PERFILADOR_LENTA_MS = float(os.getenv('PERFILADOR_LENTA_MS', 100))  # sentencia lenta
+    PERFILADOR_REPETICIONES = int(os.getenv('PERFILADOR_REPETICIONES', 5))  # misma plantilla en una petición = n+1
+    PERFILADOR_HISTORIAL = int(os.getenv('PERFILADOR_HISTORIAL', 200))  # peticiones guardadas
+    
+    # Balanceo de carga entre réplicas (utils/balanceador.py)
+    BALANCEO_ESTRATEGIA = os.getenv('BALANCEO_ESTRATEGIA', 'round_robin')  # 'round_robin', 'menos_pendientes' o 'latencia'
+    PROXY_HABILITADO = os.getenv('PROXY_HABILITADO', 'false').lower() == 'true'  # /api/proxy/<ruta> reenvía al nodo elegido
+    PROXY_TIMEOUT = float(os.getenv('PROXY_TIMEOUT', 10))  # segundos por petición reenviada
+    
+    # Circuit breakers por nodo réplica (utils/circuito.py)
+    CIRCUITO_FALLOS = int(os.getenv('CIRCUITO_FALLOS', 5))  # errores seguidos para expulsar un nodo
+    CIRCUITO_ESPERA = float(os.getenv('CIRCUITO_ESPERA', 5))  # segundos de la primera expulsión; se duplica en cada una seguida
+    CIRCUITO_ESPERA_MAX = float(os.getenv('CIRCUITO_ESPERA_MAX', 300))  # tope de la expulsión
     
     # Timeouts y Reintentos
-    HEALTH_CHECK_INTERVAL = 30  # segundos
-    REPLICATION_TIMEOUT = 5  # segundos
-    MAX_RETRIES = 3
\ No newline at end of file
+    HEALTH_CHECK_INTERVAL = int(os.getenv('HEALTH_CHECK_INTERVAL', 30))  # segundos entre heartbeats
+    HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 2))  # segundos por ping
+    HEALTH_CHECK_FALLOS = int(os.getenv('HEALTH_CHECK_FALLOS', 3))  # heartbeats perdidos para marcar inactivo
+    HEALTH_CHECK_REFRESCO = int(os.getenv('HEALTH_CHECK_REFRESCO', 10))  # rondas entre escrituras de los nodos activos en health_check (los cambios de estado se escriben al momento)
+    REPLICATION_TIMEOUT = float(os.getenv('REPLICATION_TIMEOUT', 5))  # segundos
+    
+    # Llamadas entre nodos (utils/cliente_nodos.py)
+    MAX_RETRIES = int(os.getenv('MAX_RETRIES', 3))  # reintentos por llamada ante errores de red o 502/503/504
+    REINTENTO_ESPERA = float(os.getenv('REINTENTO_ESPERA', 0.1))  # segundos del primer backoff; se duplica en cada reintento
+    REINTENTO_ESPERA_MAX = float(os.getenv('REINTENTO_ESPERA_MAX', 2))  # tope del backoff
+    REINTENTOS_PROPORCION = float(os.getenv('REINTENTOS_PROPORCION', 0.2))  # reintentos permitidos por llamada (presupuesto)
+    REINTENTOS_MINIMO = float(os.getenv('REINTENTOS_MINIMO', 5))  # reintentos por segundo permitidos siempre
+    CONEXIONES_POR_NODO = int(os.getenv('CONEXIONES_POR_NODO', 10))  # conexiones keep-alive por nodo réplica
+
+
+def verificar_secuencia_ids():
+    """
+    Con réplicas, cada nodo debe asignar ids de su propia secuencia: si dos nodos
+    dan el mismo id a registros distintos, la réplica de uno choca con el otro.
+    Lanza RuntimeError si DB_AUTO_INCREMENT_INCREMENT / _OFFSET no lo garantizan.
+    """
+    if not Config.REPLICA_ENABLED or not Config.NODOS_REPLICAS:
+        return
+    nodos = len(Config.NODOS_REPLICAS) + 1
+    if Config.DB_AUTO_INCREMENT_INCREMENT < nodos:
+        raise RuntimeError(
+            f'Replicación con {nodos} nodos: DB_AUTO_INCREMENT_INCREMENT debe ser al menos {nodos} '
+            f'(es {Config.DB_AUTO_INCREMENT_INCREMENT}) y DB_AUTO_INCREMENT_OFFSET distinto en cada nodo'
+        )
+    if not 1 <= Config.DB_AUTO_INCREMENT_OFFSET <= Config.DB_AUTO_INCREMENT_INCREMENT:
+        raise RuntimeError(
+            f'DB_AUTO_INCREMENT_OFFSET debe estar entre 1 y {Config.DB_AUTO_INCREMENT_INCREMENT} '
+            f'(es {Config.DB_AUTO_INCREMENT_OFFSET})'
+        )
@@ -1,30 +1,378 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import pymysql
 from config import Config
 
-def get_db_connection():
-    """Obtiene una conexión a la base de datos"""
-    return pymysql.connect(
-        host=Config.DB_HOST,
-        user=Config.DB_USER,
-        password=Config.DB_PASSWORD,
-        database=Config.DB_NAME,
-        port=Config.DB_PORT,
-        cursorclass=pymysql.cursors.DictCursor
+
+class PoolAgotadoError(Exception):
+    """No se obtuvo una conexión libre dentro de DB_POOL_TIMEOUT"""
+
+
+# Funciones observador(query, params, duracion) llamadas tras cada sentencia
+_observadores = []
+
+
+def agregar_observador(funcion):
+    """Registra un observador de sentencias SQL (métricas, perfilado, análisis de planes)"""
+    _observadores.append(funcion)
+
+
+def quitar_observador(funcion):
+    if funcion in _observadores:
+        _observadores.remove(funcion)
+
+
+class _CursorObservadoMixin:
+    """
+    Notifica a los observadores cada execute/executemany con su query original
+    (la plantilla con %s) y su duración. Sin observadores no añade coste.
+    """
+    _en_lote = False
+
+    def _notificar(self, query, args, inicio):
+        duracion = time.perf_counter() - inicio
+        for observador in list(_observadores):
+            try:
+                observador(query, args, duracion)
+            except Exception:
+                pass
+
+    def execute(self, query, args=None):
+        if not _observadores or self._en_lote:
+            return super().execute(query, args)
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            self._notificar(query, args, inicio)
+
+    def executemany(self, query, args):
+        if not _observadores:
+            return super().executemany(query, args)
+        # executemany llama internamente a execute: se cuenta como una sola sentencia
+        inicio = time.perf_counter()
+        self._en_lote = True
+        try:
+            return super().executemany(query, args)
+        finally:
+            self._en_lote = False
+            self._notificar(query, args, inicio)
+
+
+class CursorObservado(_CursorObservadoMixin, pymysql.cursors.DictCursor):
+    pass
+
+
+class CursorStreamObservado(_CursorObservadoMixin, pymysql.cursors.SSDictCursor):
+    pass
+
+
+class _ConexionPooled:
+    """
+    Envoltorio de una conexión pymysql prestada por el pool.
+    close() la devuelve al pool en lugar de cerrarla.
+    """
+
+    def __init__(self, pool, raw, creada):
+        self._pool = pool
+        self._raw = raw
+        self._creada = creada
+        self._devuelta = False
+
+    def __getattr__(self, nombre):
+        return getattr(self._raw, nombre)
+
+    def close(self):
+        if not self._devuelta:
+            self._devuelta = True
+            self._pool.liberar(self._raw, self._creada)
+
+    def descartar(self):
+        """Cierra la conexión de verdad (p. ej. tras un error de red)"""
+        if not self._devuelta:
+            self._devuelta = True
+            self._pool.descartar(self._raw)
+
+
+def _init_command():
+    """Ajustes de sesión de cada conexión nueva (None si no hace falta ninguno)"""
+    if Config.DB_AUTO_INCREMENT_INCREMENT <= 1:
+        return None
+    return (
+        f"SET SESSION auto_increment_increment = {Config.DB_AUTO_INCREMENT_INCREMENT}, "
+        f"auto_increment_offset = {Config.DB_AUTO_INCREMENT_OFFSET}"
     )
 
+
+class PoolConexiones:
+    """
+    Pool de conexiones acotado y thread-safe.
+    - Mantiene entre min_size y max_size conexiones.
+    - Hace ping al prestar una conexión que lleva más de ping_interval inactiva.
+    - Recicla conexiones que superan max_lifetime o max_idle.
+    - Espera como máximo timeout segundos por una conexión libre.
+    """
+
+    def __init__(self, min_size, max_size, timeout, max_lifetime, max_idle, ping_interval):
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._libres = deque()  # (raw, creada, ultimo_uso)
+        self._total = 0
+        self._en_uso = 0
+
+        self._creadas = 0
+        self._destruidas = 0
+        self._prestamos = 0
+        self._esperas = 0
+        self._tiempo_espera = 0.0
+        self._espera_maxima = 0.0
+        self._timeouts = 0
+
+    def _conectar(self):
+        return pymysql.connect(
+            host=Config.DB_HOST,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD,
+            database=Config.DB_NAME,
+            port=Config.DB_PORT,
+            cursorclass=CursorObservado,
+            autocommit=True,
+            init_command=_init_command()
+        )
+
+    def _cerrar(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._destruidas += 1
+
+    def _caducada(self, creada, ultimo_uso, ahora):
+        if self.max_lifetime and ahora - creada > self.max_lifetime:
+            return True
+        if self.max_idle and ahora - ultimo_uso > self.max_idle and self._total > self.min_size:
+            return True
+        return False
+
+    def inicializar(self):
+        """Abre las conexiones mínimas; los errores se ignoran y se reintenta al prestar"""
+        while True:
+            with self._cond:
+                if self._total >= self.min_size:
+                    return
+                self._total += 1
+            try:
+                raw = self._conectar()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                return
+            ahora = time.monotonic()
+            with self._cond:
+                self._creadas += 1
+                self._libres.append((raw, ahora, ahora))
+                self._cond.notify()
+
+    def obtener(self):
+        """Presta una conexión sana del pool"""
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+        espero = False
+
+        while True:
+            entrada = None
+            with self._cond:
+                while True:
+                    if self._libres:
+                        entrada = self._libres.pop()
+                        break
+                    if self._total < self.max_size:
+                        self._total += 1
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._timeouts += 1
+                        raise PoolAgotadoError(
+                            f'No hay conexiones libres tras {self.timeout}s '
+                            f'({self._en_uso}/{self.max_size} en uso)'
+                        )
+                    espero = True
+                    self._cond.wait(restante)
+
+            if entrada is None:
+                try:
+                    raw = self._conectar()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+                creada = time.monotonic()
+                with self._cond:
+                    self._creadas += 1
+                break
+
+            raw, creada, ultimo_uso = entrada
+            ahora = time.monotonic()
+            if self._caducada(creada, ultimo_uso, ahora):
+                self._retirar(raw)
+                continue
+            if ahora - ultimo_uso >= self.ping_interval:
+                try:
+                    raw.ping(reconnect=False)
+                except Exception:
+                    self._retirar(raw)
+                    continue
+            break
+
+        espera = time.monotonic() - inicio
+        with self._cond:
+            self._en_uso += 1
+            self._prestamos += 1
+            if espero:
+                self._esperas += 1
+            self._tiempo_espera += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+
+        return _ConexionPooled(self, raw, creada)
+
+    def _retirar(self, raw):
+        """Cierra una conexión libre que no se puede reutilizar"""
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+        self._cerrar(raw)
+
+    def liberar(self, raw, creada):
+        """Devuelve una conexión prestada"""
+        ahora = time.monotonic()
+        if raw.open and not (self.max_lifetime and ahora - creada > self.max_lifetime):
+            with self._cond:
+                self._en_uso -= 1
+                self._libres.append((raw, creada, ahora))
+                self._cond.notify()
+            return
+        self.descartar(raw)
+
+    def descartar(self, raw):
+        """Cierra una conexión prestada sin devolverla al pool"""
+        with self._cond:
+            self._en_uso -= 1
+            self._total -= 1
+            self._cond.notify()
+        self._cerrar(raw)
+
+    def cerrar_todas(self):
+        """Cierra las conexiones libres (las prestadas se cierran al devolverse)"""
+        with self._cond:
+            libres = list(self._libres)
+            self._libres.clear()
+            self._total -= len(libres)
+            self._cond.notify_all()
+        for raw, _, _ in libres:
+            self._cerrar(raw)
+
+    def estadisticas(self):
+        with self._cond:
+            return {
+                'min': self.min_size,
+                'max': self.max_size,
+                'total': self._total,
+                'en_uso': self._en_uso,
+                'libres': len(self._libres),
+                'creadas': self._creadas,
+                'destruidas': self._destruidas,
+                'prestamos': self._prestamos,
+                'esperas': self._esperas,
+                'tiempo_espera_total_ms': round(self._tiempo_espera * 1000, 3),
+                'tiempo_espera_max_ms': round(self._espera_maxima * 1000, 3),
+                'timeouts': self._timeouts
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool():
+    """
+    Retorna el pool del proceso, creándolo la primera vez.
+    Un proceso hijo (worker de gunicorn) no reutiliza el pool heredado del
+    padre: compartir un socket de MySQL entre procesos mezcla las respuestas.
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                pool = PoolConexiones(
+                    Config.DB_POOL_MIN,
+                    Config.DB_POOL_MAX,
+                    Config.DB_POOL_TIMEOUT,
+                    Config.DB_POOL_MAX_LIFETIME,
+                    Config.DB_POOL_MAX_IDLE,
+                    Config.DB_POOL_PING_INTERVAL
+                )
+                pool.inicializar()
+                _pool = pool
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def reiniciar_pool():
+    """
+    Olvida el pool heredado tras un fork sin cerrar sus conexiones (cerrarlas
+    enviaría COM_QUIT por los sockets que sigue usando el proceso padre).
+    """
+    global _pool, _pool_lock
+    _pool = None
+    # El lock pudo copiarse tomado por otro hilo del padre
+    _pool_lock = threading.Lock()
+
+
+def cerrar_pool():
+    """Cierra las conexiones del pool de este proceso, si llegó a crearlo"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.cerrar_todas()
+        _pool = None
+
+
+def estadisticas_pool():
+    """Métricas del pool para dimensionarlo"""
+    return obtener_pool().estadisticas()
+
+
+def get_db_connection():
+    """Obtiene una conexión del pool; close() la devuelve"""
+    return obtener_pool().obtener()
+
 def execute_query(query, params=None, fetch_one=False, fetch_all=False):
     """Ejecuta una query y retorna resultados según el tipo"""
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
             cursor.execute(query, params or ())
-            
+
             if fetch_one:
                 return cursor.fetchone()
             elif fetch_all:
                 return cursor.fetchall()
             else:
-                connection.commit()
+                # Las conexiones del pool van en autocommit: no hace falta COMMIT
                 return cursor.lastrowid
     finally:
         connection.close()
@@ -33,6 +381,7 @@ def execute_transaction(queries_with_params):
     """Ejecuta múltiples queries en una transacción"""
     connection = get_db_connection()
     try:
+        connection.begin()
         with connection.cursor() as cursor:
             for query, params in queries_with_params:
                 cursor.execute(query, params or ())
@@ -42,4 +391,65 @@ def execute_transaction(queries_with_params):
         connection.rollback()
         raise e
     finally:
-        connection.close()
\ No newline at end of file
+        connection.close()
+
+def insertar_multifila(cursor, tabla, columnas, filas):
+    """
+    Inserta filas con un único INSERT multi-fila y retorna los ids generados,
+    en orden. InnoDB da ids consecutivos (de DB_AUTO_INCREMENT_INCREMENT en
+    DB_AUTO_INCREMENT_INCREMENT) a un INSERT con número de filas conocido; con
+    executemany pymysql parte el INSERT si supera ~1 MB y lastrowid ya no
+    sería el de la primera fila.
+    """
+    if not filas:
+        return []
+    fila = "(" + ", ".join(["%s"] * len(columnas)) + ")"
+    query = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES {', '.join([fila] * len(filas))}"
+    cursor.execute(query, [valor for f in filas for valor in f])
+    return [cursor.lastrowid + i * Config.DB_AUTO_INCREMENT_INCREMENT for i in range(len(filas))]
+
+def stream_query(query, params=None, tam_lote=1000):
+    """
+    Generador de filas con un cursor no bufferizado (SSDictCursor): las filas
+    se leen del servidor por tandas y la memoria no crece con el resultado.
+    La conexión queda ocupada hasta agotar el generador; si se abandona antes,
+    se cierra en lugar de leer el resto del resultado.
+    """
+    connection = get_db_connection()
+    completo = False
+    try:
+        cursor = connection.cursor(CursorStreamObservado)
+        cursor.execute(query, params or ())
+        while True:
+            filas = cursor.fetchmany(tam_lote)
+            if not filas:
+                break
+            yield from filas
+        cursor.close()
+        completo = True
+    finally:
+        if completo:
+            connection.close()
+        else:
+            connection.descartar()
+
+@contextmanager
+def transaccion():
+    """
+    Abre una transacción sobre una sola conexión del pool y entrega el cursor.
+    Hace COMMIT al salir del bloque o ROLLBACK si se lanza una excepción.
+    """
+    connection = get_db_connection()
+    try:
+        connection.begin()
+        with connection.cursor() as cursor:
+            yield cursor
+        connection.commit()
+    except Exception:
+        try:
+            connection.rollback()
+        except Exception:
+            connection.descartar()
+        raise
+    finally:
+        connection.close()
@@ -0,0 +1,72 @@
+"""
+Configuración de gunicorn para un nodo (los valores salen de Config / .env).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Recarga sin cortar peticiones: kill -HUP <pid del master>. Los workers nuevos
+cargan el código y la configuración actuales y los viejos terminan las
+peticiones en curso (hasta WSGI_GRACEFUL_TIMEOUT segundos).
+
+Cada worker es un proceso con su propio pool, caches y métricas. La cache de
+productos se invalida en todos los workers a través de cache_versiones
+(utils/cache.py) y las métricas se suman a través de METRICAS_DIRECTORIO
+(utils/metricas.py).
+"""
+import glob
+import os
+import tempfile
+
+from config import Config
+
+bind = f'0.0.0.0:{Config.NODO_PORT}'
+worker_class = 'gthread'
+workers = Config.WSGI_WORKERS
+threads = Config.WSGI_THREADS
+timeout = Config.WSGI_TIMEOUT
+graceful_timeout = Config.WSGI_GRACEFUL_TIMEOUT
+keepalive = 5
+
+max_requests = Config.WSGI_MAX_REQUESTS
+max_requests_jitter = Config.WSGI_MAX_REQUESTS // 10
+
+# Con preload el código no se recarga con HUP: cada worker importa la app
+preload_app = False
+
+proc_name = f'sistema_pedidos-{Config.NODO_ID}'
+accesslog = '-'
+errorlog = '-'
+
+# Los workers heredan Config del master: todos publican sus métricas en el mismo directorio
+if not Config.METRICAS_DIRECTORIO:
+    Config.METRICAS_DIRECTORIO = os.path.join(tempfile.gettempdir(), f'{proc_name}-metricas')
+
+
+def on_starting(server):
+    # Los contadores de una ejecución anterior no se suman a los nuevos
+    for archivo in glob.glob(os.path.join(Config.METRICAS_DIRECTORIO, 'metricas-*.json')):
+        os.remove(archivo)
+
+
+def post_fork(server, worker):
+    # Cada worker abre su propio pool; el buffer del log y el despachador
+    # de replicación ya detectan el fork por el pid
+    from database import reiniciar_pool
+    reiniciar_pool()
+
+
+def worker_exit(server, worker):
+    # Escribe los logs de replicación que aún estén en memoria antes de salir
+    try:
+        from utils.buffer_log import buffer_log
+        buffer_log.vaciar()
+    except Exception as e:
+        server.log.warning(f'No se pudo vaciar el buffer del log: {e}')
+    # Lo último que midió el worker sigue contando en los totales del nodo
+    try:
+        from utils.metricas import publicador
+        publicador.publicar()
+    except Exception as e:
+        server.log.warning(f'No se pudieron publicar las métricas: {e}')
+    # Sin crear un pool en un worker que nunca abrió uno
+    from database import cerrar_pool
+    cerrar_pool()
@@ -0,0 +1,14 @@
+-- Tablas de replicación agregadas después del esquema inicial
+-- (ya incluidas en sistema_pedidos.sql para instalaciones nuevas)
+
+CREATE TABLE IF NOT EXISTS replicacion_aplicada (
+    nodo_origen VARCHAR(50) PRIMARY KEY,
+    ultimo_id_log INT NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS replicacion_cursor (
+    nodo_destino VARCHAR(255) PRIMARY KEY,
+    ultimo_id_log INT NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
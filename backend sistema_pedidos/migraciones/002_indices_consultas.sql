@@ -0,0 +1,28 @@
+-- Índices secundarios para los filtros y ordenamientos de models.py y utils/helpers.py
+-- (InnoDB agrega la clave primaria al final de cada índice secundario, que sirve
+-- de desempate en la paginación por cursor)
+
+-- Listado de pedidos: ORDER BY fecha_pedido DESC, id_pedido DESC
+CREATE INDEX idx_pedidos_fecha ON pedidos (fecha_pedido);
+
+-- Pedidos de un cliente: WHERE id_cliente = ? ORDER BY fecha_pedido DESC
+CREATE INDEX idx_pedidos_cliente_fecha ON pedidos (id_cliente, fecha_pedido);
+
+-- Estadísticas por estado y por nodo
+CREATE INDEX idx_pedidos_estado ON pedidos (estado);
+CREATE INDEX idx_pedidos_nodo ON pedidos (nodo_procesado);
+
+-- Detalles de un pedido
+CREATE INDEX idx_detalle_pedido ON detalle_pedidos (id_pedido);
+
+-- Logs pendientes de un nodo y marcado por rango: WHERE nodo_origen = ? AND replicado = ? ... id_log
+CREATE INDEX idx_log_origen_replicado ON log_replicacion (nodo_origen, replicado, id_log);
+
+-- Envío por cursor: WHERE nodo_origen = ? AND id_log > ? ORDER BY id_log
+CREATE INDEX idx_log_origen_id ON log_replicacion (nodo_origen, id_log);
+
+-- Catálogo: WHERE estado = 'activo' ORDER BY nombre, id_producto
+CREATE INDEX idx_productos_estado_nombre ON productos (estado, nombre);
+
+-- Listado de clientes: ORDER BY fecha_registro DESC, id_cliente DESC
+CREATE INDEX idx_clientes_fecha ON clientes (fecha_registro);
@@ -0,0 +1,19 @@
+-- Contadores materializados de pedidos por estado y por nodo
+-- (se mantienen en la misma transacción que crea, actualiza o elimina cada pedido)
+
+CREATE TABLE IF NOT EXISTS estadisticas_pedidos (
+    dimension ENUM('estado', 'nodo') NOT NULL,
+    valor VARCHAR(50) NOT NULL,
+    cantidad BIGINT NOT NULL DEFAULT 0,
+    total DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, valor)
+);
+
+-- Carga inicial a partir de los pedidos existentes
+INSERT INTO estadisticas_pedidos (dimension, valor, cantidad, total)
+SELECT 'estado', estado, COUNT(*), COALESCE(SUM(total), 0) FROM pedidos GROUP BY estado
+ON DUPLICATE KEY UPDATE cantidad = VALUES(cantidad), total = VALUES(total);
+
+INSERT INTO estadisticas_pedidos (dimension, valor, cantidad, total)
+SELECT 'nodo', COALESCE(nodo_procesado, ''), COUNT(*), COALESCE(SUM(total), 0) FROM pedidos GROUP BY nodo_procesado
+ON DUPLICATE KEY UPDATE cantidad = VALUES(cantidad), total = VALUES(total);
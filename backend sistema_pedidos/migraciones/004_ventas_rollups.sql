@@ -0,0 +1,62 @@
+-- Rollups de ventas por hora, día y mes (por nodo y por producto)
+-- Se actualizan al crear, replicar o eliminar pedidos; los informes no leen pedidos.
+
+CREATE TABLE IF NOT EXISTS ventas_resumen (
+    granularidad ENUM('hora', 'dia', 'mes') NOT NULL,
+    periodo DATETIME NOT NULL,
+    nodo VARCHAR(50) NOT NULL,
+    pedidos INT NOT NULL DEFAULT 0,
+    unidades INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularidad, periodo, nodo)
+);
+
+CREATE TABLE IF NOT EXISTS ventas_producto (
+    granularidad ENUM('hora', 'dia', 'mes') NOT NULL,
+    periodo DATETIME NOT NULL,
+    id_producto INT NOT NULL,
+    nodo VARCHAR(50) NOT NULL,
+    pedidos INT NOT NULL DEFAULT 0,
+    unidades INT NOT NULL DEFAULT 0,
+    ingresos DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularidad, periodo, id_producto, nodo),
+    KEY idx_ventas_producto (granularidad, id_producto, periodo)
+);
+
+-- Carga inicial a partir de los pedidos existentes
+INSERT INTO ventas_resumen (granularidad, periodo, nodo, pedidos, unidades, ingresos)
+SELECT g.granularidad,
+       CASE g.granularidad
+           WHEN 'hora' THEN DATE_FORMAT(p.fecha_pedido, '%Y-%m-%d %H:00:00')
+           WHEN 'dia' THEN DATE_FORMAT(p.fecha_pedido, '%Y-%m-%d 00:00:00')
+           ELSE DATE_FORMAT(p.fecha_pedido, '%Y-%m-01 00:00:00')
+       END AS periodo,
+       COALESCE(p.nodo_procesado, ''),
+       COUNT(*),
+       COALESCE(SUM(u.unidades), 0),
+       SUM(p.total)
+FROM pedidos p
+LEFT JOIN (
+    SELECT id_pedido, SUM(cantidad) AS unidades FROM detalle_pedidos GROUP BY id_pedido
+) u ON u.id_pedido = p.id_pedido
+CROSS JOIN (SELECT 'hora' AS granularidad UNION ALL SELECT 'dia' UNION ALL SELECT 'mes') g
+GROUP BY g.granularidad, periodo, p.nodo_procesado
+ON DUPLICATE KEY UPDATE pedidos = VALUES(pedidos), unidades = VALUES(unidades), ingresos = VALUES(ingresos);
+
+INSERT INTO ventas_producto (granularidad, periodo, id_producto, nodo, pedidos, unidades, ingresos)
+SELECT g.granularidad,
+       CASE g.granularidad
+           WHEN 'hora' THEN DATE_FORMAT(p.fecha_pedido, '%Y-%m-%d %H:00:00')
+           WHEN 'dia' THEN DATE_FORMAT(p.fecha_pedido, '%Y-%m-%d 00:00:00')
+           ELSE DATE_FORMAT(p.fecha_pedido, '%Y-%m-01 00:00:00')
+       END AS periodo,
+       d.id_producto,
+       COALESCE(p.nodo_procesado, ''),
+       COUNT(DISTINCT p.id_pedido),
+       SUM(d.cantidad),
+       SUM(d.subtotal)
+FROM pedidos p
+INNER JOIN detalle_pedidos d ON d.id_pedido = p.id_pedido
+CROSS JOIN (SELECT 'hora' AS granularidad UNION ALL SELECT 'dia' UNION ALL SELECT 'mes') g
+GROUP BY g.granularidad, periodo, d.id_producto, p.nodo_procesado
+ON DUPLICATE KEY UPDATE pedidos = VALUES(pedidos), unidades = VALUES(unidades), ingresos = VALUES(ingresos);
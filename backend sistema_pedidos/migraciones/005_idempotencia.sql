@@ -0,0 +1,17 @@
+-- Claves de idempotencia (cabecera Idempotency-Key) de los POST que crean registros
+-- Una fila 'en_curso' reserva la clave mientras se procesa la petición; al terminar
+-- guarda la respuesta para repetirla ante reintentos. Las filas vencidas se purgan.
+
+CREATE TABLE IF NOT EXISTS idempotencia (
+    ruta VARCHAR(100) NOT NULL,
+    clave VARCHAR(255) NOT NULL,
+    huella CHAR(64) NOT NULL,
+    estado ENUM('en_curso', 'completada') NOT NULL DEFAULT 'en_curso',
+    codigo_http SMALLINT NULL,
+    respuesta MEDIUMTEXT NULL,
+    nodo VARCHAR(50) NOT NULL,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expira DATETIME NOT NULL,
+    PRIMARY KEY (ruta, clave),
+    KEY idx_idempotencia_expira (expira)
+);
@@ -0,0 +1,4 @@
+-- Las cargas masivas (/bulk) registran un solo log por lote con todas sus filas:
+-- datos_json necesita más de los 64 KB de TEXT
+
+ALTER TABLE log_replicacion MODIFY datos_json MEDIUMTEXT;
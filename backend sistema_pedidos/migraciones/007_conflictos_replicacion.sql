@@ -0,0 +1,20 @@
+-- Origen de clientes y productos y registro de conflictos de replicación
+-- nodo_origen distingue el reintento de un alta ya aplicada (mismo origen) de un id
+-- que otro nodo dio a otro registro (conflicto). NULL = registro anterior a esta migración.
+
+ALTER TABLE clientes ADD COLUMN nodo_origen VARCHAR(50) NULL;
+ALTER TABLE productos ADD COLUMN nodo_origen VARCHAR(50) NULL;
+
+-- Operaciones replicadas que no se aplicaron para no pisar ni perder un registro local
+CREATE TABLE IF NOT EXISTS replicacion_conflictos (
+    id_conflicto INT AUTO_INCREMENT PRIMARY KEY,
+    tabla_afectada VARCHAR(50) NOT NULL,
+    operacion ENUM('INSERT', 'UPDATE', 'DELETE') NOT NULL,
+    id_registro INT NOT NULL,
+    nodo_origen VARCHAR(50) NOT NULL,
+    motivo VARCHAR(50) NOT NULL,
+    detalle VARCHAR(255) NULL,
+    datos_json MEDIUMTEXT,
+    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_conflictos_fecha (fecha)
+);
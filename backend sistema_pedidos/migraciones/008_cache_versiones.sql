@@ -0,0 +1,8 @@
+-- Versión de cada cache en memoria, compartida por los procesos de un nodo
+-- (utils/cache.py VersionCompartida): una escritura la incrementa y cada worker
+-- de gunicorn vacía su cache al ver una versión nueva.
+
+CREATE TABLE IF NOT EXISTS cache_versiones (
+    nombre VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
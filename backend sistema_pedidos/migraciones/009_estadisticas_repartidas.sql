@@ -0,0 +1,9 @@
+-- Contadores de estadisticas_pedidos repartidos en varias filas (slot) por clave
+-- Cada transacción suma en un slot al azar, así los pedidos concurrentes no esperan
+-- el bloqueo de la misma fila hasta el COMMIT; las lecturas suman los slots.
+-- Las filas existentes quedan en el slot 0.
+
+ALTER TABLE estadisticas_pedidos
+    ADD COLUMN slot TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER valor,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (dimension, valor, slot);
@@ -0,0 +1,14 @@
+-- Rollups de ventas repartidos en varias filas (slot) por periodo, nodo y producto
+-- Cada transacción suma en un slot al azar, así los pedidos concurrentes no esperan
+-- el bloqueo de la fila de la hora en curso hasta el COMMIT; los informes ya suman.
+-- Las filas existentes quedan en el slot 0.
+
+ALTER TABLE ventas_resumen
+    ADD COLUMN slot TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER nodo,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (granularidad, periodo, nodo, slot);
+
+ALTER TABLE ventas_producto
+    ADD COLUMN slot TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER nodo,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (granularidad, periodo, id_producto, nodo, slot);
@@ -0,0 +1,115 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada archivo migraciones/NNN_descripcion.sql se aplica una sola vez, en orden
+de versión, y queda registrado en la tabla schema_migraciones.
+
+Uso:
+    python migrar.py            aplica las migraciones pendientes
+    python migrar.py --estado   muestra las aplicadas y las pendientes
+"""
+import os
+import re
+import sys
+
+import pymysql
+from database import get_db_connection
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migraciones')
+
+# Objeto ya existente: permite re-ejecutar una migración aplicada a mano
+ERRORES_IGNORABLES = {
+    1050,  # la tabla ya existe
+    1060,  # la columna ya existe
+    1061,  # el índice ya existe
+}
+
+QUERY_TABLA_MIGRACIONES = """
+    CREATE TABLE IF NOT EXISTS schema_migraciones (
+        version INT PRIMARY KEY,
+        nombre VARCHAR(255) NOT NULL,
+        fecha_aplicacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def listar_migraciones():
+    """Retorna [(version, nombre, ruta)] ordenado por versión"""
+    migraciones = []
+    for archivo in os.listdir(DIRECTORIO):
+        coincidencia = re.match(r'^(\d+)_(.+)\.sql$', archivo)
+        if coincidencia:
+            migraciones.append((int(coincidencia.group(1)), coincidencia.group(2), os.path.join(DIRECTORIO, archivo)))
+    return sorted(migraciones)
+
+
+def _sentencias(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        lineas = [l for l in archivo.read().splitlines() if not l.strip().startswith('--')]
+    return [s.strip() for s in '\n'.join(lineas).split(';') if s.strip()]
+
+
+def versiones_aplicadas(cursor):
+    cursor.execute(QUERY_TABLA_MIGRACIONES)
+    cursor.execute("SELECT version FROM schema_migraciones")
+    return {fila['version'] for fila in cursor.fetchall()}
+
+
+def aplicar_pendientes(salida=print, connection=None):
+    """
+    Aplica las migraciones pendientes; retorna las versiones aplicadas.
+    connection permite migrar otra base (con DictCursor); no se cierra.
+    """
+    propia = connection is None
+    if propia:
+        connection = get_db_connection()
+    aplicadas = []
+    try:
+        with connection.cursor() as cursor:
+            # Evita que dos nodos migren la misma base a la vez
+            cursor.execute("SELECT GET_LOCK('schema_migraciones', 60) AS obtenido")
+            if not cursor.fetchone()['obtenido']:
+                raise RuntimeError('Otro proceso está aplicando migraciones')
+            try:
+                ya_aplicadas = versiones_aplicadas(cursor)
+                for version, nombre, ruta in listar_migraciones():
+                    if version in ya_aplicadas:
+                        continue
+                    salida(f'Aplicando {version:03d}_{nombre}...')
+                    for sentencia in _sentencias(ruta):
+                        try:
+                            cursor.execute(sentencia)
+                        except pymysql.err.MySQLError as e:
+                            if e.args[0] not in ERRORES_IGNORABLES:
+                                raise
+                            salida(f'  (ya existía) {e.args[1]}')
+                    cursor.execute(
+                        "INSERT INTO schema_migraciones (version, nombre) VALUES (%s, %s)",
+                        (version, nombre)
+                    )
+                    aplicadas.append(version)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK('schema_migraciones')")
+    finally:
+        if propia:
+            connection.close()
+    return aplicadas
+
+
+def estado():
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            ya_aplicadas = versiones_aplicadas(cursor)
+    finally:
+        connection.close()
+    return [(version, nombre, version in ya_aplicadas) for version, nombre, _ in listar_migraciones()]
+
+
+if __name__ == '__main__':
+    if '--estado' in sys.argv:
+        for version, nombre, aplicada in estado():
+            print(f"{version:03d}_{nombre}: {'aplicada' if aplicada else 'pendiente'}")
+    else:
+        aplicadas = aplicar_pendientes()
+        print(f'{len(aplicadas)} migraciones aplicadas' if aplicadas else 'El esquema está al día')
@@ -1,130 +1,516 @@
-from database import execute_query, execute_transaction
+from database import execute_query, transaccion, get_db_connection, stream_query, insertar_multifila
 from config import Config
+from utils.buffer_log import buffer_log, QUERY_INSERT_LOG
+from utils.cache import CacheLRU, VersionCompartida
+from utils.paginacion import consultar_pagina, proyectar
+from utils import estadisticas, ventas
 import json
 from datetime import datetime
 
+# Cache de las páginas del catálogo de productos (el stock nunca se guarda aquí)
+cache_productos = CacheLRU(Config.CACHE_PRODUCTOS_TAMANO, Config.CACHE_PRODUCTOS_TTL)
+# Las escrituras de otros workers del nodo se ven tras a lo sumo CACHE_PRODUCTOS_VERIFICAR segundos
+version_productos = VersionCompartida('productos', cache_productos, Config.CACHE_PRODUCTOS_VERIFICAR)
+CLAVE_CATALOGO = 'catalogo'
+
+CAMPOS_CLIENTE = {c: c for c in ('id_cliente', 'nombre', 'email', 'telefono', 'direccion', 'fecha_registro')}
+CAMPOS_PRODUCTO = {c: c for c in ('id_producto', 'nombre', 'descripcion', 'precio', 'stock', 'estado')}
+CAMPOS_PEDIDO = {c: f'p.{c}' for c in (
+    'id_pedido', 'id_cliente', 'fecha_pedido', 'estado', 'total', 'direccion_envio', 'nodo_procesado'
+)}
+CAMPOS_PEDIDO['nombre_cliente'] = 'c.nombre AS nombre_cliente'
+ESTADOS_PEDIDO = ('pendiente', 'en_proceso', 'enviado', 'entregado', 'cancelado')
+
+class ErrorReservaStock(Exception):
+    """
+    Una o más líneas del pedido no se pudieron reservar.
+    fallos es una lista de diccionarios con id_producto, motivo
+    ('no_encontrado' o 'stock_insuficiente'), disponible y requerido.
+    """
+    def __init__(self, fallos):
+        self.fallos = fallos
+        primero = fallos[0]
+        if primero['motivo'] == 'no_encontrado':
+            mensaje = f'Producto {primero["id_producto"]} no encontrado'
+        else:
+            mensaje = f'Stock insuficiente para {primero["nombre"]}'
+        super().__init__(mensaje)
+
+
 class Cliente:
     @staticmethod
-    def crear(nombre, email, telefono=None, direccion=None):
-        query = "INSERT INTO clientes (nombre, email, telefono, direccion) VALUES (%s, %s, %s, %s)"
-        cliente_id = execute_query(query, (nombre, email, telefono, direccion))
-        
-        # Registrar en log de replicación
-        LogReplicacion.registrar('clientes', 'INSERT', cliente_id, {
-            'nombre': nombre, 'email': email, 'telefono': telefono, 'direccion': direccion
-        })
+    def crear(nombre, email, telefono=None, direccion=None, al_confirmar=None):
+        """
+        al_confirmar(cursor, cliente_id), si se indica, corre al final de la misma
+        transacción (p. ej. utils.idempotencia.guardar_respuesta).
+        """
+        query = "INSERT INTO clientes (nombre, email, telefono, direccion, nodo_origen) VALUES (%s, %s, %s, %s, %s)"
+        with transaccion() as cursor:
+            cursor.execute(query, (nombre, email, telefono, direccion, Config.NODO_ID))
+            cliente_id = cursor.lastrowid
+            
+            # Registrar en log de replicación (misma transacción)
+            LogReplicacion.registrar('clientes', 'INSERT', cliente_id, {
+                'nombre': nombre, 'email': email, 'telefono': telefono, 'direccion': direccion
+            }, cursor)
+            
+            if al_confirmar:
+                al_confirmar(cursor, cliente_id)
         
         return cliente_id
     
+    @staticmethod
+    def crear_lote(clientes):
+        """
+        Inserta varios clientes (dicts con nombre, email, telefono, direccion) en una
+        transacción, con un INSERT multi-fila y un solo log de replicación para todo
+        el lote. Retorna los ids en el mismo orden.
+        """
+        campos = ('nombre', 'email', 'telefono', 'direccion')
+        with transaccion() as cursor:
+            ids = insertar_multifila(cursor, 'clientes', campos + ('nodo_origen',), [
+                tuple(c.get(campo) for campo in campos) + (Config.NODO_ID,) for c in clientes
+            ])
+            LogReplicacion.registrar('clientes', 'INSERT', ids[0], {'lote': [
+                dict({campo: c.get(campo) for campo in campos}, id=cliente_id)
+                for cliente_id, c in zip(ids, clientes)
+            ]}, cursor)
+        return ids
+    
     @staticmethod
     def obtener_por_id(cliente_id):
         query = "SELECT * FROM clientes WHERE id_cliente = %s"
         return execute_query(query, (cliente_id,), fetch_one=True)
     
     @staticmethod
-    def obtener_todos():
-        query = "SELECT * FROM clientes ORDER BY fecha_registro DESC"
-        return execute_query(query, fetch_all=True)
+    def obtener_todos(limit=None, after=None, campos=None):
+        """
+        Página de clientes, los más recientes primero.
+        after es el cursor (fecha_registro, id_cliente) de la página anterior.
+        Retorna (clientes, next_cursor).
+        """
+        return consultar_pagina(
+            proyectar(campos, CAMPOS_CLIENTE, ('id_cliente', 'fecha_registro')),
+            'clientes',
+            ('fecha_registro', 'fecha_registro'),
+            ('id_cliente', 'id_cliente'),
+            limit or Config.PAGINA_LIMITE,
+            after
+        )
+    
+    @staticmethod
+    def exportar(campos=None, limit=None):
+        """Generador con todos los clientes (o los limit más recientes), leídos en streaming"""
+        columnas = proyectar(campos, CAMPOS_CLIENTE, ('id_cliente', 'fecha_registro'))
+        query = f"SELECT {', '.join(columnas)} FROM clientes ORDER BY fecha_registro DESC, id_cliente DESC"
+        if limit:
+            return stream_query(query + " LIMIT %s", (limit,))
+        return stream_query(query)
     
     @staticmethod
     def actualizar(cliente_id, nombre=None, email=None, telefono=None, direccion=None):
         query = "UPDATE clientes SET nombre = %s, email = %s, telefono = %s, direccion = %s WHERE id_cliente = %s"
-        execute_query(query, (nombre, email, telefono, direccion, cliente_id))
-        
-        LogReplicacion.registrar('clientes', 'UPDATE', cliente_id, {
-            'nombre': nombre, 'email': email, 'telefono': telefono, 'direccion': direccion
-        })
+        with transaccion() as cursor:
+            cursor.execute(query, (nombre, email, telefono, direccion, cliente_id))
+            
+            LogReplicacion.registrar('clientes', 'UPDATE', cliente_id, {
+                'nombre': nombre, 'email': email, 'telefono': telefono, 'direccion': direccion
+            }, cursor)
     
     @staticmethod
     def eliminar(cliente_id):
         query = "DELETE FROM clientes WHERE id_cliente = %s"
-        execute_query(query, (cliente_id,))
-        
-        LogReplicacion.registrar('clientes', 'DELETE', cliente_id, {})
+        with transaccion() as cursor:
+            # Sus pedidos se borran en cascada: se descuentan de las estadísticas
+            estadisticas.descontar_pedidos(cursor, "id_cliente = %s", (cliente_id,))
+            ventas.descontar_pedidos(cursor, "p.id_cliente = %s", (cliente_id,))
+            cursor.execute(query, (cliente_id,))
+            
+            LogReplicacion.registrar('clientes', 'DELETE', cliente_id, {}, cursor)
 
 
 class Producto:
     @staticmethod
     def crear(nombre, descripcion, precio, stock=0):
-        query = "INSERT INTO productos (nombre, descripcion, precio, stock) VALUES (%s, %s, %s, %s)"
-        producto_id = execute_query(query, (nombre, descripcion, precio, stock))
-        
-        LogReplicacion.registrar('productos', 'INSERT', producto_id, {
-            'nombre': nombre, 'descripcion': descripcion, 'precio': float(precio), 'stock': stock
-        })
+        query = "INSERT INTO productos (nombre, descripcion, precio, stock, nodo_origen) VALUES (%s, %s, %s, %s, %s)"
+        with transaccion() as cursor:
+            cursor.execute(query, (nombre, descripcion, precio, stock, Config.NODO_ID))
+            producto_id = cursor.lastrowid
+            
+            LogReplicacion.registrar('productos', 'INSERT', producto_id, {
+                'nombre': nombre, 'descripcion': descripcion, 'precio': float(precio), 'stock': stock
+            }, cursor)
         
+        Producto.invalidar_cache()
         return producto_id
     
+    @staticmethod
+    def crear_lote(productos):
+        """
+        Inserta varios productos (dicts con nombre, descripcion, precio, stock) en una
+        transacción, con un INSERT multi-fila y un solo log de replicación para todo
+        el lote. Retorna los ids en el mismo orden.
+        """
+        with transaccion() as cursor:
+            ids = insertar_multifila(cursor, 'productos', ('nombre', 'descripcion', 'precio', 'stock', 'nodo_origen'), [
+                (p['nombre'], p['descripcion'], p['precio'], p['stock'], Config.NODO_ID) for p in productos
+            ])
+            LogReplicacion.registrar('productos', 'INSERT', ids[0], {'lote': [
+                {
+                    'id': producto_id, 'nombre': p['nombre'], 'descripcion': p['descripcion'],
+                    'precio': float(p['precio']), 'stock': p['stock']
+                }
+                for producto_id, p in zip(ids, productos)
+            ]}, cursor)
+        
+        Producto.invalidar_cache()
+        return ids
+    
+    @staticmethod
+    def invalidar_cache():
+        """
+        Invalida todas las páginas del catálogo (escrituras locales o replicadas)
+        en este proceso; los demás workers vacían su cache al ver la versión nueva.
+        """
+        cache_productos.invalidar_si(lambda clave: isinstance(clave, tuple) and clave[0] == CLAVE_CATALOGO)
+        version_productos.incrementar()
+    
     @staticmethod
     def obtener_por_id(producto_id):
+        # Sin cache: la respuesta lleva el stock, que igual habría que leer de la BD
         query = "SELECT * FROM productos WHERE id_producto = %s"
         return execute_query(query, (producto_id,), fetch_one=True)
     
     @staticmethod
-    def obtener_todos():
-        query = "SELECT * FROM productos WHERE estado = 'activo' ORDER BY nombre"
-        return execute_query(query, fetch_all=True)
+    def obtener_por_ids(ids):
+        """Obtiene varios productos con una sola query; retorna {id_producto: producto}"""
+        ids = sorted(set(ids))
+        if not ids:
+            return {}
+        marcadores = ", ".join(["%s"] * len(ids))
+        query = f"SELECT * FROM productos WHERE id_producto IN ({marcadores})"
+        return {p['id_producto']: p for p in execute_query(query, ids, fetch_all=True)}
+    
+    @staticmethod
+    def obtener_todos(limit=None, after=None, campos=None):
+        """
+        Página del catálogo de productos activos, por nombre.
+        after es el cursor (nombre, id_producto) de la página anterior.
+        Retorna (productos, next_cursor).
+        
+        Sin proyección, la página (sin stock) sale de la cache y el stock se lee
+        siempre de la BD para los ids de la página.
+        """
+        limit = limit or Config.PAGINA_LIMITE
+        
+        def consultar(columnas):
+            return consultar_pagina(
+                columnas,
+                'productos',
+                ('nombre', 'nombre'),
+                ('id_producto', 'id_producto'),
+                limit,
+                after,
+                where=["estado = 'activo'"],
+                descendente=False
+            )
+        
+        if campos:
+            return consultar(proyectar(campos, CAMPOS_PRODUCTO, ('id_producto', 'nombre')))
+        
+        clave = (CLAVE_CATALOGO, after, limit)
+        version_productos.verificar()
+        pagina = cache_productos.obtener(clave)
+        if pagina is None:
+            productos, next_cursor = consultar(['*'])
+            cache_productos.guardar(clave, (
+                [{k: v for k, v in p.items() if k != 'stock'} for p in productos],
+                next_cursor
+            ))
+            return productos, next_cursor
+        
+        descriptivos, next_cursor = pagina
+        if not descriptivos:
+            return [], next_cursor
+        ids = [p['id_producto'] for p in descriptivos]
+        query = f"SELECT id_producto, stock FROM productos WHERE id_producto IN ({', '.join(['%s'] * len(ids))})"
+        stock = {f['id_producto']: f['stock'] for f in execute_query(query, ids, fetch_all=True)}
+        return [dict(p, stock=stock[p['id_producto']]) for p in descriptivos if p['id_producto'] in stock], next_cursor
     
     @staticmethod
     def actualizar(producto_id, nombre=None, descripcion=None, precio=None, stock=None):
+        """
+        stock es el valor nuevo, pero se replica como diferencia (ajuste_stock):
+        en las réplicas se suma a su stock, que puede haber bajado por pedidos
+        que aquí aún no llegaron.
+        """
         query = "UPDATE productos SET nombre = %s, descripcion = %s, precio = %s, stock = %s WHERE id_producto = %s"
-        execute_query(query, (nombre, descripcion, precio, stock, producto_id))
+        with transaccion() as cursor:
+            cursor.execute("SELECT stock FROM productos WHERE id_producto = %s FOR UPDATE", (producto_id,))
+            actual = cursor.fetchone()
+            ajuste = stock - actual['stock'] if actual and stock is not None and actual['stock'] is not None else 0
+            cursor.execute(query, (nombre, descripcion, precio, stock, producto_id))
+            
+            LogReplicacion.registrar('productos', 'UPDATE', producto_id, {
+                'nombre': nombre, 'descripcion': descripcion, 'precio': float(precio), 'ajuste_stock': ajuste
+            }, cursor)
         
-        LogReplicacion.registrar('productos', 'UPDATE', producto_id, {
-            'nombre': nombre, 'descripcion': descripcion, 'precio': float(precio), 'stock': stock
-        })
+        Producto.invalidar_cache()
     
     @staticmethod
     def actualizar_stock(producto_id, cantidad):
+        # El stock no se guarda en cache_productos: no hay nada que invalidar
         query = "UPDATE productos SET stock = stock + %s WHERE id_producto = %s"
         execute_query(query, (cantidad, producto_id))
+    
+    @staticmethod
+    def ajustar_stock_lote(ajustes):
+        """
+        Suma a cada producto su delta en una sola transacción: bloquea los
+        productos, verifica que ninguno quede con stock negativo y aplica todo con
+        un único UPDATE ... CASE y un solo log de replicación.
+        ajustes: lista de (id_producto, delta); un producto puede repetirse.
+        Lanza ErrorReservaStock si algún producto no existe o no alcanza el stock.
+        Retorna {id_producto: stock resultante}.
+        """
+        deltas = {}
+        for id_producto, delta in ajustes:
+            deltas[id_producto] = deltas.get(id_producto, 0) + delta
+        
+        with transaccion() as cursor:
+            productos = Producto.bloquear(cursor, deltas)
+            
+            fallos = []
+            for id_producto in sorted(deltas):
+                producto = productos.get(id_producto)
+                if not producto:
+                    fallos.append({'id_producto': id_producto, 'motivo': 'no_encontrado'})
+                elif producto['stock'] + deltas[id_producto] < 0:
+                    fallos.append({
+                        'id_producto': id_producto,
+                        'nombre': producto['nombre'],
+                        'motivo': 'stock_insuficiente',
+                        'disponible': producto['stock'],
+                        'requerido': -deltas[id_producto]
+                    })
+            if fallos:
+                raise ErrorReservaStock(fallos)
+            
+            Producto.aplicar_deltas_stock(cursor, deltas)
+            
+            # Las réplicas suman los mismos deltas (su stock también baja con los pedidos replicados)
+            cambios = [[id_producto, delta] for id_producto, delta in sorted(deltas.items()) if delta]
+            if cambios:
+                LogReplicacion.registrar('productos', 'UPDATE', cambios[0][0], {'ajustes': cambios}, cursor)
+        
+        # Las filas siguen bloqueadas hasta el COMMIT: stock leído + delta es el resultado
+        return {id_producto: productos[id_producto]['stock'] + delta for id_producto, delta in deltas.items()}
+    
+    @staticmethod
+    def aplicar_deltas_stock(cursor, deltas):
+        """
+        Suma a cada producto su delta con un único UPDATE ... CASE.
+        deltas: {id_producto: cantidad}. Se ejecuta en el cursor (transacción) recibido.
+        """
+        deltas = {id_producto: delta for id_producto, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        
+        ids = sorted(deltas)
+        casos = " ".join(["WHEN %s THEN %s"] * len(ids))
+        marcadores = ", ".join(["%s"] * len(ids))
+        query = f"""
+            UPDATE productos
+            SET stock = stock + CASE id_producto {casos} END
+            WHERE id_producto IN ({marcadores})
+        """
+        params = []
+        for id_producto in ids:
+            params.extend((id_producto, deltas[id_producto]))
+        params.extend(ids)
+        cursor.execute(query, params)
+    
+    @staticmethod
+    def bloquear(cursor, ids):
+        """
+        Lee y bloquea (FOR UPDATE) los productos indicados con una sola query.
+        Se bloquean en orden de id_producto para que dos pedidos concurrentes
+        no se crucen en un deadlock. Retorna {id_producto: producto}.
+        """
+        ids = sorted(set(ids))
+        if not ids:
+            return {}
+        marcadores = ", ".join(["%s"] * len(ids))
+        query = f"""
+            SELECT id_producto, nombre, precio, stock, estado
+            FROM productos
+            WHERE id_producto IN ({marcadores})
+            ORDER BY id_producto
+            FOR UPDATE
+        """
+        cursor.execute(query, ids)
+        return {p['id_producto']: p for p in cursor.fetchall()}
+    
+    @staticmethod
+    def reservar_stock(cursor, detalles):
+        """
+        Verifica y descuenta el stock de todas las líneas dentro de la transacción
+        del cursor. Si alguna línea falla lanza ErrorReservaStock con todas las
+        líneas fallidas y no descuenta nada.
+        """
+        requerido = {}
+        for detalle in detalles:
+            requerido[detalle['id_producto']] = requerido.get(detalle['id_producto'], 0) + detalle['cantidad']
+        
+        productos = Producto.bloquear(cursor, requerido)
+        
+        fallos = []
+        for linea, detalle in enumerate(detalles):
+            producto = productos.get(detalle['id_producto'])
+            if not producto:
+                fallos.append({
+                    'linea': linea,
+                    'id_producto': detalle['id_producto'],
+                    'motivo': 'no_encontrado'
+                })
+            elif producto['stock'] < requerido[detalle['id_producto']]:
+                fallos.append({
+                    'linea': linea,
+                    'id_producto': detalle['id_producto'],
+                    'nombre': producto['nombre'],
+                    'motivo': 'stock_insuficiente',
+                    'disponible': producto['stock'],
+                    'requerido': requerido[detalle['id_producto']]
+                })
+        
+        if fallos:
+            raise ErrorReservaStock(fallos)
+        
+        Producto.aplicar_deltas_stock(cursor, {
+            id_producto: -cantidad for id_producto, cantidad in requerido.items()
+        })
+        return productos
 
 
 class Pedido:
     @staticmethod
-    def crear(cliente_id, direccion_envio, detalles):
+    def crear(cliente_id, direccion_envio, detalles, al_confirmar=None):
         """
         detalles es una lista de diccionarios: 
         [{'id_producto': 1, 'cantidad': 2, 'precio_unitario': 100.00}, ...]
+        
+        El pedido, sus detalles y el descuento de stock se escriben en una
+        sola transacción: si algo falla no queda nada a medias.
+        al_confirmar(cursor, pedido_id), si se indica, corre al final de esa
+        transacción (p. ej. utils.idempotencia.guardar_respuesta).
+        Lanza ErrorReservaStock si algún producto no existe o no tiene stock.
         """
         # Calcular total
         total = sum(d['cantidad'] * d['precio_unitario'] for d in detalles)
+        # La fecha se fija aquí para que el rollup y las réplicas usen la misma
+        fecha = datetime.now().replace(microsecond=0)
         
-        # Insertar pedido
-        query_pedido = """
-            INSERT INTO pedidos (id_cliente, total, direccion_envio, nodo_procesado) 
-            VALUES (%s, %s, %s, %s)
-        """
-        pedido_id = execute_query(query_pedido, (cliente_id, total, direccion_envio, Config.NODO_ID))
-        
-        # Insertar detalles del pedido
-        for detalle in detalles:
-            subtotal = detalle['cantidad'] * detalle['precio_unitario']
+        with transaccion() as cursor:
+            # Reservar stock: bloquea los productos, verifica y descuenta
+            Producto.reservar_stock(cursor, detalles)
+            
+            # Insertar pedido
+            query_pedido = """
+                INSERT INTO pedidos (id_cliente, fecha_pedido, total, direccion_envio, nodo_procesado) 
+                VALUES (%s, %s, %s, %s, %s)
+            """
+            cursor.execute(query_pedido, (cliente_id, fecha, total, direccion_envio, Config.NODO_ID))
+            pedido_id = cursor.lastrowid
+            estadisticas.pedido_creado(cursor, 'pendiente', Config.NODO_ID, total)
+            ventas.pedido_creado(cursor, fecha, Config.NODO_ID, total, detalles)
+            
+            # Insertar detalles del pedido (pymysql lo envía como un INSERT multi-fila)
             query_detalle = """
                 INSERT INTO detalle_pedidos (id_pedido, id_producto, cantidad, precio_unitario, subtotal)
                 VALUES (%s, %s, %s, %s, %s)
             """
-            execute_query(query_detalle, (
-                pedido_id, 
-                detalle['id_producto'], 
-                detalle['cantidad'], 
-                detalle['precio_unitario'], 
-                subtotal
-            ))
+            cursor.executemany(query_detalle, [
+                (
+                    pedido_id,
+                    detalle['id_producto'],
+                    detalle['cantidad'],
+                    detalle['precio_unitario'],
+                    detalle['cantidad'] * detalle['precio_unitario']
+                )
+                for detalle in detalles
+            ])
             
-            # Actualizar stock
-            Producto.actualizar_stock(detalle['id_producto'], -detalle['cantidad'])
-        
-        # Registrar en log de replicación
-        LogReplicacion.registrar('pedidos', 'INSERT', pedido_id, {
-            'cliente_id': cliente_id,
-            'total': float(total),
-            'direccion_envio': direccion_envio,
-            'detalles': detalles
-        })
+            # Registrar en log de replicación
+            LogReplicacion.registrar('pedidos', 'INSERT', pedido_id, {
+                'cliente_id': cliente_id,
+                'fecha_pedido': fecha.isoformat(sep=' '),
+                'total': float(total),
+                'direccion_envio': direccion_envio,
+                'detalles': detalles
+            }, cursor)
+            
+            if al_confirmar:
+                al_confirmar(cursor, pedido_id)
         
         return pedido_id
     
+    @staticmethod
+    def crear_lote(pedidos, descontar_stock=True):
+        """
+        Inserta varios pedidos en una transacción: un INSERT multi-fila de pedidos,
+        otro de detalles y un solo log de replicación para todo el lote.
+        pedidos: dicts con cliente_id, direccion_envio, detalles (con precio_unitario),
+        fecha_pedido (datetime) y estado. Con descontar_stock=False (pedidos
+        históricos) no se reserva stock ni se descuenta en las réplicas.
+        Lanza ErrorReservaStock si el stock no alcanza para el lote entero.
+        Retorna los ids en el mismo orden.
+        """
+        totales = [sum(d['cantidad'] * d['precio_unitario'] for d in p['detalles']) for p in pedidos]
+        
+        with transaccion() as cursor:
+            if descontar_stock:
+                Producto.reservar_stock(cursor, [d for p in pedidos for d in p['detalles']])
+            
+            ids = insertar_multifila(
+                cursor, 'pedidos',
+                ('id_cliente', 'fecha_pedido', 'estado', 'total', 'direccion_envio', 'nodo_procesado'),
+                [
+                    (p['cliente_id'], p['fecha_pedido'], p['estado'], total, p['direccion_envio'], Config.NODO_ID)
+                    for p, total in zip(pedidos, totales)
+                ]
+            )
+            estadisticas.acumular(cursor, [(p['estado'], Config.NODO_ID, 1, total) for p, total in zip(pedidos, totales)])
+            ventas.acumular(cursor, [
+                (p['fecha_pedido'], Config.NODO_ID, total, [
+                    (d['id_producto'], d['cantidad'], d['cantidad'] * d['precio_unitario']) for d in p['detalles']
+                ])
+                for p, total in zip(pedidos, totales)
+            ])
+            cursor.executemany("""
+                INSERT INTO detalle_pedidos (id_pedido, id_producto, cantidad, precio_unitario, subtotal)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [
+                (pedido_id, d['id_producto'], d['cantidad'], d['precio_unitario'], d['cantidad'] * d['precio_unitario'])
+                for pedido_id, p in zip(ids, pedidos)
+                for d in p['detalles']
+            ])
+            
+            LogReplicacion.registrar('pedidos', 'INSERT', ids[0], {'lote': [
+                {
+                    'id': pedido_id,
+                    'cliente_id': p['cliente_id'],
+                    'fecha_pedido': p['fecha_pedido'].isoformat(sep=' '),
+                    'estado': p['estado'],
+                    'total': float(total),
+                    'direccion_envio': p['direccion_envio'],
+                    'detalles': p['detalles'],
+                    'sin_stock': not descontar_stock
+                }
+                for pedido_id, p, total in zip(ids, pedidos, totales)
+            ]}, cursor)
+        
+        return ids
+    
     @staticmethod
     def obtener_por_id(pedido_id):
         query = """
@@ -148,73 +534,235 @@ class Pedido:
         return pedido
     
     @staticmethod
-    def obtener_todos(limit=100):
-        query = """
-            SELECT p.*, c.nombre as nombre_cliente
-            FROM pedidos p
-            INNER JOIN clientes c ON p.id_cliente = c.id_cliente
-            ORDER BY p.fecha_pedido DESC
-            LIMIT %s
-        """
-        return execute_query(query, (limit,), fetch_all=True)
+    def _pagina(limit, after, campos, where=None, params=None):
+        columnas = proyectar(campos, CAMPOS_PEDIDO, ('id_pedido', 'fecha_pedido'))
+        desde = 'pedidos p'
+        if any(c.startswith('c.') for c in columnas):
+            desde += ' INNER JOIN clientes c ON p.id_cliente = c.id_cliente'
+        return consultar_pagina(
+            columnas,
+            desde,
+            ('p.fecha_pedido', 'fecha_pedido'),
+            ('p.id_pedido', 'id_pedido'),
+            limit or Config.PAGINA_LIMITE,
+            after,
+            where=where,
+            params=params
+        )
     
     @staticmethod
-    def obtener_por_cliente(cliente_id):
-        query = """
-            SELECT p.*, c.nombre as nombre_cliente
-            FROM pedidos p
-            INNER JOIN clientes c ON p.id_cliente = c.id_cliente
-            WHERE p.id_cliente = %s
-            ORDER BY p.fecha_pedido DESC
+    def obtener_todos(limit=None, after=None, campos=None):
         """
-        return execute_query(query, (cliente_id,), fetch_all=True)
+        Página de pedidos, los más recientes primero.
+        after es el cursor (fecha_pedido, id_pedido) de la página anterior.
+        Retorna (pedidos, next_cursor).
+        """
+        return Pedido._pagina(limit, after, campos)
+    
+    @staticmethod
+    def obtener_por_cliente(cliente_id, limit=None, after=None, campos=None):
+        """Página de pedidos de un cliente; retorna (pedidos, next_cursor)"""
+        return Pedido._pagina(limit, after, campos, where=['p.id_cliente = %s'], params=[cliente_id])
+    
+    @staticmethod
+    def exportar(campos=None, limit=None):
+        """Generador con todos los pedidos (o los limit más recientes), leídos en streaming"""
+        columnas = proyectar(campos, CAMPOS_PEDIDO, ('id_pedido', 'fecha_pedido'))
+        desde = 'pedidos p'
+        if any(c.startswith('c.') for c in columnas):
+            desde += ' INNER JOIN clientes c ON p.id_cliente = c.id_cliente'
+        query = f"SELECT {', '.join(columnas)} FROM {desde} ORDER BY p.fecha_pedido DESC, p.id_pedido DESC"
+        if limit:
+            return stream_query(query + " LIMIT %s", (limit,))
+        return stream_query(query)
     
     @staticmethod
     def actualizar_estado(pedido_id, nuevo_estado):
         query = "UPDATE pedidos SET estado = %s WHERE id_pedido = %s"
-        execute_query(query, (nuevo_estado, pedido_id))
-        
-        LogReplicacion.registrar('pedidos', 'UPDATE', pedido_id, {
-            'estado': nuevo_estado
-        })
+        with transaccion() as cursor:
+            estadisticas.cambiar_estados(cursor, {pedido_id: nuevo_estado})
+            cursor.execute(query, (nuevo_estado, pedido_id))
+            
+            LogReplicacion.registrar('pedidos', 'UPDATE', pedido_id, {
+                'estado': nuevo_estado
+            }, cursor)
     
     @staticmethod
     def eliminar(pedido_id):
         query = "DELETE FROM pedidos WHERE id_pedido = %s"
-        execute_query(query, (pedido_id,))
-        
-        LogReplicacion.registrar('pedidos', 'DELETE', pedido_id, {})
+        with transaccion() as cursor:
+            estadisticas.descontar_pedidos(cursor, "id_pedido = %s", (pedido_id,))
+            ventas.descontar_pedidos(cursor, "p.id_pedido = %s", (pedido_id,))
+            cursor.execute(query, (pedido_id,))
+            
+            LogReplicacion.registrar('pedidos', 'DELETE', pedido_id, {}, cursor)
 
 
 class LogReplicacion:
     @staticmethod
-    def registrar(tabla, operacion, id_registro, datos):
-        """Registra una operación para replicación"""
+    def registrar(tabla, operacion, id_registro, datos, cursor=None):
+        """
+        Registra una operación para replicación.
+        Con cursor, el INSERT se hace en la transacción de la operación de negocio;
+        sin cursor, la fila pasa al buffer de escritura diferida.
+        """
         if not Config.REPLICA_ENABLED:
             return
         
-        query = """
-            INSERT INTO log_replicacion 
-            (tabla_afectada, operacion, id_registro, datos_json, nodo_origen)
-            VALUES (%s, %s, %s, %s, %s)
-        """
         datos_json = json.dumps(datos)
-        execute_query(query, (tabla, operacion, id_registro, datos_json, Config.NODO_ID))
+        if cursor is not None:
+            cursor.execute(QUERY_INSERT_LOG, (tabla, operacion, id_registro, datos_json, Config.NODO_ID))
+        else:
+            buffer_log.agregar(tabla, operacion, id_registro, datos_json, Config.NODO_ID)
     
     @staticmethod
-    def obtener_pendientes():
-        """Obtiene logs no replicados"""
+    def obtener_pendientes(limit=None):
+        """Obtiene logs no replicados, como máximo limit (REPLICATION_CHUNK por defecto)"""
         query = """
             SELECT * FROM log_replicacion 
             WHERE replicado = FALSE AND nodo_origen = %s
-            ORDER BY fecha_operacion ASC
+            ORDER BY id_log ASC
+            LIMIT %s
         """
-        return execute_query(query, (Config.NODO_ID,), fetch_all=True)
+        return execute_query(query, (Config.NODO_ID, limit or Config.REPLICATION_CHUNK), fetch_all=True)
     
     @staticmethod
-    def marcar_replicado(id_log):
-        query = "UPDATE log_replicacion SET replicado = TRUE WHERE id_log = %s"
-        execute_query(query, (id_log,))
+    def obtener_desde(id_log, limit):
+        """
+        Obtiene hasta limit logs propios con id_log mayor al indicado, sin pasar
+        de un hueco en la secuencia. Un id_log se asigna al insertar pero se vuelve
+        visible al hacer commit: un hueco entre dos ids seguidos (de
+        DB_AUTO_INCREMENT_INCREMENT en DB_AUTO_INCREMENT_INCREMENT) es una
+        transacción aún abierta o revertida. Se espera a que se llene salvo que
+        ya no quede abierta ninguna transacción iniciada antes del log posterior
+        (entonces se revirtió) o que ese log tenga más de REPLICATION_ESPERA_HUECO
+        segundos; si no se pueden consultar las transacciones abiertas se espera
+        solo REPLICATION_ESPERA_HUECO_SIN_PERMISO. Pasado el hueco no se vuelve atrás: el cursor del nodo réplica
+        y su replicacion_aplicada ya lo superaron.
+        """
+        query = """
+            SELECT id_log, tabla_afectada, operacion, id_registro, datos_json, nodo_origen, fecha_operacion,
+                TIMESTAMPDIFF(SECOND, fecha_operacion, NOW()) AS antiguedad
+            FROM log_replicacion
+            WHERE nodo_origen = %s AND id_log > %s
+            ORDER BY id_log ASC
+            LIMIT %s
+        """
+        logs = execute_query(query, (Config.NODO_ID, id_log, limit), fetch_all=True)
+        
+        # Con el cursor en 0 no se sabe dónde empieza la secuencia
+        esperado = id_log + Config.DB_AUTO_INCREMENT_INCREMENT if id_log else None
+        for i, log in enumerate(logs):
+            if esperado is not None and log['id_log'] != esperado:
+                espera = Config.REPLICATION_ESPERA_HUECO
+                if log['antiguedad'] < espera:
+                    abiertas = LogReplicacion._transacciones_abiertas_desde(log['fecha_operacion'])
+                    if abiertas is None:
+                        espera = Config.REPLICATION_ESPERA_HUECO_SIN_PERMISO
+                    elif not abiertas:
+                        espera = 0
+                if log['antiguedad'] < espera:
+                    logs = logs[:i]
+                    break
+                faltantes = range(esperado, log['id_log'], Config.DB_AUTO_INCREMENT_INCREMENT)
+                motivo = f"transacción revertida o abierta más de {espera} s" if espera else "transacción revertida"
+                print(f"Log de replicación: se omiten los id_log {', '.join(map(str, faltantes[:10]))} ({motivo})")
+            esperado = log['id_log'] + Config.DB_AUTO_INCREMENT_INCREMENT
+        
+        for log in logs:
+            del log['antiguedad']
+        return logs
+    
+    @staticmethod
+    def _transacciones_abiertas_desde(fecha):
+        """
+        Transacciones abiertas sobre esta base de datos iniciadas hasta fecha
+        (con 2 s de margen por la resolución de fecha_operacion), o None si no
+        se pueden consultar (information_schema.innodb_trx y ver las conexiones
+        de otros usuarios en PROCESSLIST requieren el privilegio PROCESS).
+        """
+        query = """
+            SELECT COUNT(*) AS abiertas
+            FROM information_schema.innodb_trx t
+            JOIN information_schema.PROCESSLIST p ON p.ID = t.trx_mysql_thread_id
+            WHERE p.DB = DATABASE() AND t.trx_started <= DATE_ADD(%s, INTERVAL 2 SECOND)
+        """
+        try:
+            return execute_query(query, (fecha,), fetch_one=True)['abiertas']
+        except Exception:
+            return None
+    
+    @staticmethod
+    def marcar_replicado_hasta(id_log):
+        """Marca como replicados, con un solo UPDATE, todos los logs propios hasta id_log"""
+        query = """
+            UPDATE log_replicacion SET replicado = TRUE
+            WHERE nodo_origen = %s AND replicado = FALSE AND id_log <= %s
+        """
+        execute_query(query, (Config.NODO_ID, id_log))
+    
+    @staticmethod
+    def purgar_hasta(id_log, lote=5000):
+        """Elimina por tandas los logs propios hasta id_log (ya confirmados por todos los nodos)"""
+        query = "DELETE FROM log_replicacion WHERE nodo_origen = %s AND id_log <= %s LIMIT %s"
+        while True:
+            connection = get_db_connection()
+            try:
+                with connection.cursor() as cursor:
+                    borrados = cursor.execute(query, (Config.NODO_ID, id_log, lote))
+            finally:
+                connection.close()
+            if borrados < lote:
+                return
+
+
+class ConflictoReplicacion:
+    """Operaciones replicadas que no se aplicaron para no pisar ni perder un registro local"""
+    
+    @staticmethod
+    def registrar(cursor, conflictos):
+        """conflictos: lista de (tabla, operacion, id_registro, nodo_origen, motivo, detalle, datos)"""
+        query = """
+            INSERT INTO replicacion_conflictos
+            (tabla_afectada, operacion, id_registro, nodo_origen, motivo, detalle, datos_json)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        cursor.executemany(query, [
+            (tabla, operacion, id_registro, nodo_origen, motivo, detalle[:255], json.dumps(datos, default=str))
+            for tabla, operacion, id_registro, nodo_origen, motivo, detalle, datos in conflictos
+        ])
+    
+    @staticmethod
+    def obtener_recientes(limit):
+        query = "SELECT * FROM replicacion_conflictos ORDER BY id_conflicto DESC LIMIT %s"
+        return execute_query(query, (limit,), fetch_all=True)
+
+
+class CursorReplicacion:
+    """Último id_log confirmado (ack) por cada nodo réplica"""
+    
+    @staticmethod
+    def obtener(nodo_url):
+        query = "SELECT ultimo_id_log FROM replicacion_cursor WHERE nodo_destino = %s"
+        fila = execute_query(query, (nodo_url,), fetch_one=True)
+        return fila['ultimo_id_log'] if fila else 0
+    
+    @staticmethod
+    def obtener_todos():
+        """Retorna {nodo_url: ultimo_id_log} para los nodos de NODOS_REPLICAS"""
+        query = "SELECT nodo_destino, ultimo_id_log FROM replicacion_cursor"
+        filas = {f['nodo_destino']: f['ultimo_id_log'] for f in execute_query(query, fetch_all=True)}
+        return {nodo_url: filas.get(nodo_url, 0) for nodo_url in Config.NODOS_REPLICAS}
+    
+    @staticmethod
+    def avanzar(nodo_url, id_log):
+        """Avanza el cursor del nodo; nunca retrocede"""
+        query = """
+            INSERT INTO replicacion_cursor (nodo_destino, ultimo_id_log)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE ultimo_id_log = GREATEST(ultimo_id_log, VALUES(ultimo_id_log))
+        """
+        execute_query(query, (nodo_url, id_log))
 
 
 class HealthCheck:
@@ -228,15 +776,31 @@ class HealthCheck:
         """
         execute_query(query, (nodo, estado, estado))
     
+    @staticmethod
+    def actualizar_estados(estados):
+        """Actualiza o inserta varios (nodo, estado) en una transacción"""
+        query = """
+            INSERT INTO health_check (nodo, estado, ultima_verificacion)
+            VALUES (%s, %s, NOW())
+            ON DUPLICATE KEY UPDATE estado = VALUES(estado), ultima_verificacion = NOW()
+        """
+        with transaccion() as cursor:
+            cursor.executemany(query, sorted(set(estados)))
+    
     @staticmethod
     def obtener_nodos_activos():
-        """Obtiene todos los nodos activos"""
+        """
+        Obtiene los nodos activos verificados en las últimas
+        HEALTH_CHECK_REFRESCO + HEALTH_CHECK_FALLOS + 1 rondas del monitor (que
+        reescribe cada HEALTH_CHECK_REFRESCO rondas los que ve activos): un nodo
+        que dejó de monitorearse no queda activo para siempre.
+        """
         query = """
-            SELECT * FROM health_check 
-            WHERE estado = 'activo' 
-            AND ultima_verificacion > DATE_SUB(NOW(), INTERVAL 60 SECOND)
+            SELECT * FROM health_check
+            WHERE estado = 'activo' AND ultima_verificacion >= NOW() - INTERVAL %s SECOND
         """
-        return execute_query(query, fetch_all=True)
+        rondas = Config.HEALTH_CHECK_REFRESCO + Config.HEALTH_CHECK_FALLOS + 1
+        return execute_query(query, (Config.HEALTH_CHECK_INTERVAL * rondas,), fetch_all=True)
     
     @staticmethod
     def obtener_estado_nodo(nodo):
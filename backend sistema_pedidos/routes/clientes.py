@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify
-from models import Cliente
+from models import Cliente, CAMPOS_CLIENTE
+from utils import importacion
+from utils.idempotencia import guardar_respuesta, idempotente
+from utils.paginacion import leer_parametros
+from utils.streaming import formato_stream, respuesta_stream
 
 clientes_bp = Blueprint('clientes', __name__)
 
@@ -11,7 +15,15 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
+def _cliente_creado(cliente_id):
+    return {
+        'success': True,
+        'cliente_id': cliente_id,
+        'message': 'Cliente creado exitosamente'
+    }
+
 @clientes_bp.route('/', methods=['POST'])
+@idempotente
 def crear_cliente():
     """Crear un nuevo cliente"""
     data = request.json
@@ -21,28 +33,61 @@ def crear_cliente():
             data['nombre'],
             data['email'],
             data.get('telefono'),
-            data.get('direccion')
+            data.get('direccion'),
+            al_confirmar=guardar_respuesta(201, _cliente_creado)
         )
-        return jsonify({
-            'success': True,
-            'cliente_id': cliente_id,
-            'message': 'Cliente creado exitosamente'
-        }), 201
+        return jsonify(_cliente_creado(cliente_id)), 201
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 400
 
+@clientes_bp.route('/bulk', methods=['POST'])
+def crear_clientes_bulk():
+    """Carga masiva: arreglo JSON o CSV con nombre, email, telefono, direccion (?ids=true para recibir los ids)"""
+    try:
+        resumen = importacion.importar(
+            importacion.leer_filas(request, 'clientes'),
+            importacion.validar_cliente,
+            Cliente.crear_lote,
+            importacion.comprobar_clientes,
+            incluir_ids=request.args.get('ids', 'false').lower() == 'true'
+        )
+        return importacion.responder(resumen)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @clientes_bp.route('/', methods=['GET'])
 def obtener_clientes():
-    """Obtener todos los clientes"""
+    """Obtener clientes paginados (?limit=&after=&fields=) o en streaming (?stream=ndjson|json)"""
     try:
-        clientes = Cliente.obtener_todos()
+        formato = formato_stream(request)
+        if formato:
+            _, _, campos = leer_parametros(request.args, CAMPOS_CLIENTE)
+            limit = request.args.get('limit', type=int)
+            return respuesta_stream(Cliente.exportar(campos, limit), formato, 'clientes')
+        
+        limit, after, campos = leer_parametros(request.args, CAMPOS_CLIENTE)
+        clientes, next_cursor = Cliente.obtener_todos(limit, after, campos)
         return jsonify({
             'success': True,
-            'clientes': clientes
+            'clientes': clientes,
+            'next_cursor': next_cursor
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -0,0 +1,41 @@
+from flask import Blueprint, request, jsonify
+from config import Config
+from utils import perfilador
+
+debug_bp = Blueprint('debug', __name__)
+
+@debug_bp.route('/consultas', methods=['GET'])
+def obtener_perfiles():
+    """Últimas peticiones perfiladas (?solo_alertas=true&limit=)"""
+    solo_alertas = request.args.get('solo_alertas', 'false').lower() == 'true'
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({
+        'success': True,
+        'nodo': Config.NODO_ID,
+        'umbral_lenta_ms': Config.PERFILADOR_LENTA_MS,
+        'umbral_repeticiones': Config.PERFILADOR_REPETICIONES,
+        'peticiones': perfilador.historial(solo_alertas, limit)
+    })
+
+@debug_bp.route('/consultas/<int:id_perfil>', methods=['GET'])
+def obtener_perfil(id_perfil):
+    """Detalle de una petición perfilada (id de la cabecera X-Perfil-Id)"""
+    entrada = perfilador.obtener(id_perfil)
+    if not entrada:
+        return jsonify({
+            'success': False,
+            'error': 'Perfil no encontrado (puede haber salido del historial)'
+        }), 404
+    return jsonify({
+        'success': True,
+        'peticion': entrada
+    })
+
+@debug_bp.route('/consultas', methods=['DELETE'])
+def limpiar_perfiles():
+    """Vacía el historial del perfilador"""
+    perfilador.limpiar()
+    return jsonify({
+        'success': True,
+        'message': 'Historial vaciado'
+    })
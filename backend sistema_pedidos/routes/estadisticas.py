@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+from config import Config
+from utils import ventas
+from utils.helpers import calcular_estadisticas_pedidos
+
+estadisticas_bp = Blueprint('estadisticas', __name__)
+
+# Rango por defecto según la granularidad cuando no se indica desde
+RANGO_DEFECTO = {
+    'hora': timedelta(hours=24),
+    'dia': timedelta(days=30),
+    'mes': timedelta(days=365)
+}
+
+
+def _leer_fecha(nombre, defecto):
+    """Lee ?desde= / ?hasta= (YYYY-MM-DD o YYYY-MM-DD HH:MM:SS)"""
+    valor = request.args.get(nombre)
+    if not valor:
+        return defecto
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        raise ValueError(f'Fecha "{nombre}" no válida; se espera YYYY-MM-DD o YYYY-MM-DD HH:MM:SS')
+
+
+@estadisticas_bp.route('/', methods=['GET'])
+def resumen():
+    """Totales de pedidos por estado y por nodo"""
+    try:
+        return jsonify({
+            'success': True,
+            'nodo': Config.NODO_ID,
+            'estadisticas': calcular_estadisticas_pedidos()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@estadisticas_bp.route('/ventas', methods=['GET'])
+def serie_ventas():
+    """
+    Ventas (pedidos, unidades, ingresos) por periodo desde los rollups.
+    ?granularidad=hora|dia|mes&desde=&hasta=&por=nodo|producto&id_producto=&nodo=
+    """
+    try:
+        granularidad = request.args.get('granularidad', 'dia')
+        if granularidad not in ventas.GRANULARIDADES:
+            raise ValueError(f'Granularidad no válida; opciones: {", ".join(ventas.GRANULARIDADES)}')
+        por = request.args.get('por') or None
+        if por is not None and por not in ventas.AGRUPACIONES:
+            raise ValueError(f'Agrupación no válida; opciones: {", ".join(ventas.AGRUPACIONES)}')
+
+        hasta = _leer_fecha('hasta', datetime.now())
+        if 'hasta' in request.args and len(request.args['hasta']) == 10:
+            # Una fecha sin hora incluye todo ese día
+            hasta += timedelta(days=1) - timedelta(seconds=1)
+        desde = _leer_fecha('desde', hasta - RANGO_DEFECTO[granularidad])
+        if desde > hasta:
+            raise ValueError('"desde" es posterior a "hasta"')
+
+        series = ventas.consultar(
+            granularidad,
+            desde,
+            hasta,
+            por=por,
+            id_producto=request.args.get('id_producto', type=int),
+            nodo=request.args.get('nodo')
+        )
+        return jsonify({
+            'success': True,
+            'granularidad': granularidad,
+            'desde': desde.isoformat(sep=' '),
+            'hasta': hasta.isoformat(sep=' '),
+            'por': por,
+            'series': series
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
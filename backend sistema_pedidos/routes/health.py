@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
-from models import HealthCheck
 from config import Config
-import requests
+from database import estadisticas_pool
+from utils.monitor_salud import monitor
 
 health_bp = Blueprint('health', __name__)
 
@@ -9,14 +9,13 @@ health_bp = Blueprint('health', __name__)
 def health_check():
     """Endpoint de health check"""
     try:
-        # Actualizar estado de este nodo
-        HealthCheck.actualizar_estado(Config.NODO_ID, 'activo')
-        
+        # El estado de este nodo lo registra el monitor al arrancar, no cada petición
         return jsonify({
             'success': True,
             'nodo': Config.NODO_ID,
             'estado': 'activo',
-            'puerto': Config.NODO_PORT
+            'puerto': Config.NODO_PORT,
+            'monitor': monitor.estadisticas()
         })
     except Exception as e:
         return jsonify({
@@ -28,7 +27,7 @@ def health_check():
 def obtener_nodos():
     """Obtener estado de todos los nodos"""
     try:
-        nodos = HealthCheck.obtener_nodos_activos()
+        nodos = monitor.nodos_activos()
         return jsonify({
             'success': True,
             'nodos': nodos,
@@ -46,44 +45,36 @@ def ping():
     return jsonify({
         'success': True,
         'message': 'pong',
-        'nodo': Config.NODO_ID
+        'nodo': Config.NODO_ID,
+        # El monitor de los demás nodos verifica que no compartan secuencia de ids
+        'secuencia_ids': [Config.DB_AUTO_INCREMENT_INCREMENT, Config.DB_AUTO_INCREMENT_OFFSET]
     })
 
+@health_bp.route('/pool', methods=['GET'])
+def estado_pool():
+    """Estadísticas del pool de conexiones a la base de datos"""
+    try:
+        return jsonify({
+            'success': True,
+            'nodo': Config.NODO_ID,
+            'pool': estadisticas_pool()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @health_bp.route('/verificar-replicas', methods=['GET'])
 def verificar_replicas():
     """Verificar estado de los nodos réplica"""
-    resultados = []
-    
-    for nodo_url in Config.NODOS_REPLICAS:
-        try:
-            response = requests.get(
-                f"{nodo_url}/api/health/ping",
-                timeout=3
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                resultados.append({
-                    'url': nodo_url,
-                    'estado': 'activo',
-                    'nodo': data.get('nodo', 'desconocido')
-                })
-            else:
-                resultados.append({
-                    'url': nodo_url,
-                    'estado': 'error',
-                    'mensaje': 'Respuesta inválida'
-                })
-                
-        except Exception as e:
-            resultados.append({
-                'url': nodo_url,
-                'estado': 'inactivo',
-                'error': str(e)
-            })
+    # Vista del último heartbeat; ?esperar=1 al arrancar aguarda la primera ronda
+    if request.args.get('esperar', '0') == '1':
+        monitor.esperar_ronda(Config.HEALTH_CHECK_TIMEOUT + 1)
     
     return jsonify({
         'success': True,
-        'replicas': resultados,
-        'nodo_actual': Config.NODO_ID
+        'replicas': monitor.vista(),
+        'nodo_actual': Config.NODO_ID,
+        'intervalo': Config.HEALTH_CHECK_INTERVAL
     })
\ No newline at end of file
@@ -0,0 +1,76 @@
+import os
+
+from flask import Blueprint, Response
+from config import Config
+from database import estadisticas_pool
+from models import cache_productos
+from utils import circuito
+from utils.balanceador import balanceador
+from utils.buffer_log import buffer_log
+from utils.cliente_nodos import cliente_nodos
+from utils.despachador import despachador
+from utils.idempotencia import cache_idempotencia
+from utils.metricas import exportar
+
+metricas_bp = Blueprint('metricas', __name__)
+
+TIPO_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _medidores():
+    """
+    Valores instantáneos del pool, la cache de productos y las colas de replicación.
+    Son del worker que responde: llevan su pid para no mezclar series de workers.
+    """
+    nodo = (('nodo_id', Config.NODO_ID), ('pid', os.getpid()))
+    medidores = []
+
+    for nombre, valor in estadisticas_pool().items():
+        medidores.append((f'db_pool_{nombre}', f'Pool de conexiones: {nombre}', [(nodo, valor)]))
+
+    for nombre, valor in cache_productos.estadisticas().items():
+        medidores.append((f'cache_productos_{nombre}', f'Cache de productos: {nombre}', [(nodo, valor)]))
+
+    for nombre, valor in cache_idempotencia.estadisticas().items():
+        medidores.append((f'cache_idempotencia_{nombre}', f'Cache de claves de idempotencia: {nombre}', [(nodo, valor)]))
+
+    for nombre, valor in buffer_log.estadisticas().items():
+        medidores.append((f'buffer_log_{nombre}', f'Buffer del log de replicación: {nombre}', [(nodo, valor)]))
+
+    colas = despachador.estadisticas()
+    for campo in ('en_cola', 'logs_enviados', 'logs_descartados', 'errores'):
+        medidores.append((
+            f'replicacion_cola_{campo}',
+            f'Cola de replicación por nodo réplica: {campo}',
+            [(nodo + (('nodo', cola['nodo']),), cola[campo]) for cola in colas]
+        ))
+
+    circuitos = circuito.estadisticas()
+    medidores.append((
+        'circuito_abierto',
+        'Circuit breaker expulsando al nodo réplica (1 = abierto)',
+        [(nodo + (('nodo', c['nodo']),), int(c['estado'] == circuito.ABIERTO)) for c in circuitos]
+    ))
+    for campo in ('aperturas', 'rechazadas'):
+        medidores.append((
+            f'circuito_{campo}',
+            f'Circuit breaker por nodo réplica: {campo}',
+            [(nodo + (('nodo', c['nodo']),), c[campo]) for c in circuitos]
+        ))
+    for nombre, valor in cliente_nodos.estadisticas().items():
+        medidores.append((f'cliente_nodos_{nombre}', f'Llamadas entre nodos: {nombre}', [(nodo, valor)]))
+    medidores.append((
+        'balanceador_pendientes',
+        'Peticiones reenviadas en curso por nodo réplica',
+        [(nodo + (('nodo', n['url']),), n['pendientes']) for n in balanceador.estadisticas()['nodos']]
+    ))
+    return medidores
+
+
+@metricas_bp.route('/', methods=['GET'])
+def metricas():
+    """Métricas del nodo en formato de texto de Prometheus"""
+    try:
+        return Response(exportar(_medidores()), mimetype=TIPO_PROMETHEUS)
+    except Exception as e:
+        return Response(f'# error: {e}\n', status=500, mimetype=TIPO_PROMETHEUS)
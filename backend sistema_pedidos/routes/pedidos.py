@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify
-from models import Pedido, Producto, Cliente
+from models import Pedido, Cliente, ErrorReservaStock, CAMPOS_PEDIDO
+from utils import importacion
+from utils.idempotencia import guardar_respuesta, idempotente
+from utils.paginacion import leer_parametros
+from utils.streaming import formato_stream, respuesta_stream
 from config import Config
 
 pedidos_bp = Blueprint('pedidos', __name__)
@@ -12,7 +16,16 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
+def _pedido_creado(pedido_id):
+    return {
+        'success': True,
+        'pedido_id': pedido_id,
+        'nodo_procesado': Config.NODO_ID,
+        'message': 'Pedido creado exitosamente'
+    }
+
 @pedidos_bp.route('/', methods=['POST'])
+@idempotente
 def crear_pedido():
     """Crear un nuevo pedido"""
     data = request.json
@@ -26,52 +39,80 @@ def crear_pedido():
                 'error': 'Cliente no encontrado'
             }), 404
         
-        # Validar productos y stock
-        for detalle in data['detalles']:
-            producto = Producto.obtener_por_id(detalle['id_producto'])
-            if not producto:
-                return jsonify({
-                    'success': False,
-                    'error': f'Producto {detalle["id_producto"]} no encontrado'
-                }), 404
-            
-            if producto['stock'] < detalle['cantidad']:
-                return jsonify({
-                    'success': False,
-                    'error': f'Stock insuficiente para {producto["nombre"]}'
-                }), 400
-        
-        # Crear el pedido
+        # Crear el pedido (reserva el stock y guarda la respuesta de la
+        # Idempotency-Key dentro de la misma transacción)
         pedido_id = Pedido.crear(
             data['cliente_id'],
             data['direccion_envio'],
-            data['detalles']
+            data['detalles'],
+            al_confirmar=guardar_respuesta(201, _pedido_creado)
         )
         
-        return jsonify({
-            'success': True,
-            'pedido_id': pedido_id,
-            'nodo_procesado': Config.NODO_ID,
-            'message': 'Pedido creado exitosamente'
-        }), 201
+        return jsonify(_pedido_creado(pedido_id)), 201
         
+    except ErrorReservaStock as e:
+        no_encontrado = any(f['motivo'] == 'no_encontrado' for f in e.fallos)
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'fallos': e.fallos
+        }), 404 if no_encontrado else 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 400
 
+@pedidos_bp.route('/bulk', methods=['POST'])
+def crear_pedidos_bulk():
+    """Carga masiva de pedidos (JSON o CSV, ver utils/importacion.py); ?descontar_stock=false para históricos"""
+    try:
+        descontar_stock = request.args.get('descontar_stock', 'true').lower() == 'true'
+        filas = importacion.leer_filas(request, 'pedidos')
+        if request.mimetype == 'text/csv':
+            filas = importacion.agrupar_lineas_pedido(filas)
+        resumen = importacion.importar(
+            filas,
+            importacion.validar_pedido,
+            lambda pedidos: Pedido.crear_lote(pedidos, descontar_stock),
+            importacion.comprobar_pedidos,
+            incluir_ids=request.args.get('ids', 'false').lower() == 'true'
+        )
+        return importacion.responder(resumen)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @pedidos_bp.route('/', methods=['GET'])
 def obtener_pedidos():
-    """Obtener todos los pedidos"""
+    """Obtener pedidos paginados (?limit=&after=&fields=) o en streaming (?stream=ndjson|json)"""
     try:
-        limit = request.args.get('limit', 100, type=int)
-        pedidos = Pedido.obtener_todos(limit)
+        formato = formato_stream(request)
+        if formato:
+            _, _, campos = leer_parametros(request.args, CAMPOS_PEDIDO)
+            limit = request.args.get('limit', type=int)
+            return respuesta_stream(Pedido.exportar(campos, limit), formato, 'pedidos')
+        
+        limit, after, campos = leer_parametros(request.args, CAMPOS_PEDIDO)
+        pedidos, next_cursor = Pedido.obtener_todos(limit, after, campos)
         return jsonify({
             'success': True,
             'pedidos': pedidos,
+            'next_cursor': next_cursor,
             'nodo_actual': Config.NODO_ID
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -101,13 +142,20 @@ def obtener_pedido(pedido_id):
 
 @pedidos_bp.route('/cliente/<int:cliente_id>', methods=['GET'])
 def obtener_pedidos_cliente(cliente_id):
-    """Obtener todos los pedidos de un cliente"""
+    """Obtener los pedidos de un cliente paginados (?limit=&after=&fields=)"""
     try:
-        pedidos = Pedido.obtener_por_cliente(cliente_id)
+        limit, after, campos = leer_parametros(request.args, CAMPOS_PEDIDO)
+        pedidos, next_cursor = Pedido.obtener_por_cliente(cliente_id, limit, after, campos)
         return jsonify({
             'success': True,
-            'pedidos': pedidos
+            'pedidos': pedidos,
+            'next_cursor': next_cursor
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
-from models import Producto
+from models import Producto, ErrorReservaStock, cache_productos, CAMPOS_PRODUCTO
+from utils import importacion
+from utils.paginacion import leer_parametros
 
 productos_bp = Blueprint('productos', __name__)
 
@@ -34,21 +36,94 @@ def crear_producto():
             'error': str(e)
         }), 400
 
+@productos_bp.route('/bulk', methods=['POST'])
+def crear_productos_bulk():
+    """Carga masiva: arreglo JSON o CSV con nombre, descripcion, precio, stock (?ids=true para recibir los ids)"""
+    try:
+        resumen = importacion.importar(
+            importacion.leer_filas(request, 'productos'),
+            importacion.validar_producto,
+            Producto.crear_lote,
+            incluir_ids=request.args.get('ids', 'false').lower() == 'true'
+        )
+        return importacion.responder(resumen)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@productos_bp.route('/stock/bulk', methods=['POST'])
+def ajustar_stock_bulk():
+    """Suma deltas de stock a muchos productos (JSON o CSV con id_producto, delta); todo o nada"""
+    try:
+        ajustes, errores = importacion.leer_ajustes(importacion.leer_filas(request, 'ajustes'))
+        if errores or not ajustes:
+            return jsonify({
+                'success': False,
+                'error': 'Hay filas con errores: no se aplicó ningún ajuste' if errores else 'No hay ajustes',
+                'errores': errores
+            }), 400
+        
+        stock = Producto.ajustar_stock_lote(ajustes)
+        return jsonify({
+            'success': True,
+            'ajustados': len(stock),
+            'stock': [{'id_producto': id_producto, 'stock': s} for id_producto, s in sorted(stock.items())]
+        })
+    except ErrorReservaStock as e:
+        no_encontrado = any(f['motivo'] == 'no_encontrado' for f in e.fallos)
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'fallos': e.fallos
+        }), 404 if no_encontrado else 400
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @productos_bp.route('/', methods=['GET'])
 def obtener_productos():
-    """Obtener todos los productos activos"""
+    """Obtener productos activos paginados (?limit=&after=&fields=)"""
     try:
-        productos = Producto.obtener_todos()
+        limit, after, campos = leer_parametros(request.args, CAMPOS_PRODUCTO)
+        productos, next_cursor = Producto.obtener_todos(limit, after, campos)
         return jsonify({
             'success': True,
-            'productos': productos
+            'productos': productos,
+            'next_cursor': next_cursor
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@productos_bp.route('/cache', methods=['GET'])
+def estado_cache():
+    """Aciertos, fallos y tamaño de la cache de productos"""
+    return jsonify({
+        'success': True,
+        'cache': cache_productos.estadisticas()
+    })
+
 @productos_bp.route('/<int:producto_id>', methods=['GET'])
 def obtener_producto(producto_id):
     """Obtener un producto por ID"""
@@ -0,0 +1,78 @@
+from flask import Blueprint, request, jsonify, Response
+from utils.balanceador import balanceador
+from utils.circuito import estadisticas as estadisticas_circuitos
+
+proxy_bp = Blueprint('proxy', __name__)
+
+# Cabeceras de un solo salto (RFC 7230), más host y content-length que requests recalcula.
+# El cuerpo de la petición se reenvía tal cual, con su content-encoding.
+CABECERAS_EXCLUIDAS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailers',
+    'transfer-encoding', 'upgrade', 'host', 'content-length'
+}
+# La respuesta llega ya descomprimida por iter_content(): su content-encoding
+# y content-length ya no corresponden al cuerpo que se devuelve
+CABECERAS_EXCLUIDAS_RESPUESTA = CABECERAS_EXCLUIDAS | {'content-encoding'}
+
+# Bytes por tramo al pasar la respuesta al cliente
+TAMANO_TRAMO = 64 * 1024
+
+
+def _cuerpo(response):
+    """Pasa el cuerpo por tramos sin cargarlo entero en memoria y libera la conexión al terminar"""
+    try:
+        for tramo in response.iter_content(TAMANO_TRAMO):
+            yield tramo
+    finally:
+        response.close()
+
+
+@proxy_bp.route('/estado', methods=['GET'])
+def estado():
+    """Estrategia, peticiones en curso y circuit breakers de cada réplica"""
+    return jsonify({
+        'success': True,
+        'balanceador': balanceador.estadisticas(),
+        'circuitos': estadisticas_circuitos()
+    })
+
+@proxy_bp.route('/<path:ruta>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+def reenviar(ruta):
+    """Reenvía /api/proxy/<ruta> a /api/<ruta> del nodo réplica que elija el balanceador"""
+    if ruta.split('/')[0] == 'proxy':
+        return jsonify({
+            'success': False,
+            'error': 'No se puede reenviar al proxy de otro nodo'
+        }), 400
+
+    try:
+        cabeceras = {
+            clave: valor for clave, valor in request.headers.items()
+            if clave.lower() not in CABECERAS_EXCLUIDAS
+        }
+        url, response = balanceador.reenviar(
+            request.method,
+            f'/api/{ruta}',
+            params=list(request.args.items(multi=True)),
+            data=request.get_data(),
+            headers=cabeceras,
+            stream=True
+        )
+        if url is None:
+            return jsonify({
+                'success': False,
+                'error': 'No hay nodos réplica disponibles'
+            }), 503
+
+        # Las exportaciones NDJSON o en tramos se reenvían sin esperar al final
+        respuesta = Response(_cuerpo(response), status=response.status_code, direct_passthrough=True)
+        for clave, valor in response.headers.items():
+            if clave.lower() not in CABECERAS_EXCLUIDAS_RESPUESTA:
+                respuesta.headers[clave] = valor
+        respuesta.headers['X-Nodo-Destino'] = url
+        return respuesta
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 502
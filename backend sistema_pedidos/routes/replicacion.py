@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
-from models import LogReplicacion
+from models import LogReplicacion, CursorReplicacion, ConflictoReplicacion
 from config import Config
-import requests
-import json
+from utils.buffer_log import buffer_log
+from utils.aplicador import aplicar_lote
+from utils.formato_replicacion import TIPO_COMPACTO, decodificar
+from utils.replicador import replicar_pendientes
+from utils.despachador import despachador
 
 replicacion_bp = Blueprint('replicacion', __name__)
 
@@ -10,7 +13,8 @@ replicacion_bp = Blueprint('replicacion', __name__)
 def obtener_logs_pendientes():
     """Obtener logs de replicación pendientes"""
     try:
-        logs = LogReplicacion.obtener_pendientes()
+        limit = request.args.get('limit', Config.REPLICATION_CHUNK, type=int)
+        logs = LogReplicacion.obtener_pendientes(limit)
         return jsonify({
             'success': True,
             'logs': logs,
@@ -22,27 +26,34 @@ def obtener_logs_pendientes():
             'error': str(e)
         }), 500
 
+@replicacion_bp.route('/buffer', methods=['GET'])
+def estado_buffer():
+    """Estado del buffer de escritura diferida del log"""
+    return jsonify({
+        'success': True,
+        'buffer': buffer_log.estadisticas(),
+        'nodo': Config.NODO_ID
+    })
+
 @replicacion_bp.route('/sincronizar', methods=['POST'])
 def sincronizar_nodo():
-    """Sincronizar datos desde otro nodo"""
-    data = request.json
-    
+    """Sincronizar datos desde otro nodo (JSON o lote compacto comprimido)"""
     try:
-        # Recibir logs de replicación de otro nodo
-        logs = data.get('logs', [])
+        # Recibir logs de replicación de otro nodo y aplicarlos en la BD local
+        if request.mimetype == TIPO_COMPACTO:
+            logs = decodificar(request.get_data())
+        else:
+            logs = request.json.get('logs', [])
+        resumen = aplicar_lote(logs)
         
-        for log in logs:
-            # Aplicar las operaciones según el tipo
-            tabla = log['tabla_afectada']
-            operacion = log['operacion']
-            datos = json.loads(log['datos_json'])
-            
-            # Aquí se aplicarían las operaciones en la BD local
-            # Por simplicidad, solo marcamos como recibidos
-            
         return jsonify({
             'success': True,
             'logs_procesados': len(logs),
+            'aplicados': resumen['aplicados'],
+            'omitidos': resumen['omitidos'],
+            'ignorados': resumen['ignorados'],
+            'conflictos': resumen['conflictos'],
+            'ultimo_id_log': resumen['ultimo_id_log'],
             'message': 'Sincronización completada'
         })
         
@@ -62,55 +73,56 @@ def replicar_a_nodos():
         }), 400
     
     try:
-        logs = LogReplicacion.obtener_pendientes()
+        esperar = request.args.get('esperar', Config.REPLICATION_TIMEOUT, type=float)
+        resultado = replicar_pendientes(esperar)
         
-        if not logs:
+        if not resultado['logs_replicados'] and all(r['status'] == 'success' for r in resultado['resultados']):
             return jsonify({
                 'success': True,
-                'message': 'No hay logs pendientes para replicar'
+                'message': 'No hay logs pendientes para replicar',
+                'resultados': resultado['resultados']
             })
         
-        resultados = []
-        
-        for nodo_url in Config.NODOS_REPLICAS:
-            try:
-                response = requests.post(
-                    f"{nodo_url}/api/replicacion/sincronizar",
-                    json={'logs': logs},
-                    timeout=Config.REPLICATION_TIMEOUT
-                )
-                
-                if response.status_code == 200:
-                    resultados.append({
-                        'nodo': nodo_url,
-                        'status': 'success'
-                    })
-                else:
-                    resultados.append({
-                        'nodo': nodo_url,
-                        'status': 'error',
-                        'error': response.text
-                    })
-                    
-            except Exception as e:
-                resultados.append({
-                    'nodo': nodo_url,
-                    'status': 'error',
-                    'error': str(e)
-                })
-        
-        # Marcar logs como replicados
-        for log in logs:
-            LogReplicacion.marcar_replicado(log['id_log'])
-        
         return jsonify({
             'success': True,
-            'logs_replicados': len(logs),
-            'resultados': resultados
+            'logs_replicados': resultado['logs_replicados'],
+            'resultados': resultado['resultados']
         })
         
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+@replicacion_bp.route('/cursores', methods=['GET'])
+def obtener_cursores():
+    """Último id_log confirmado por cada nodo réplica y estado de sus colas de envío"""
+    try:
+        return jsonify({
+            'success': True,
+            'cursores': CursorReplicacion.obtener_todos(),
+            'colas': despachador.estadisticas(),
+            'nodo': Config.NODO_ID
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@replicacion_bp.route('/conflictos', methods=['GET'])
+def obtener_conflictos():
+    """Últimas operaciones replicadas que no se aplicaron por conflicto (?limit=)"""
+    try:
+        limit = min(request.args.get('limit', Config.PAGINA_LIMITE, type=int), Config.PAGINA_LIMITE_MAX)
+        return jsonify({
+            'success': True,
+            'conflictos': ConflictoReplicacion.obtener_recientes(limit),
+            'nodo': Config.NODO_ID
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -1,6 +1,6 @@
 @echo off
-start cmd /k "set NODO_ID=nodo1 && set NODO_PORT=5000 && python app.py"
+start cmd /k "set NODO_ID=nodo1&& set DB_AUTO_INCREMENT_INCREMENT=3&& set DB_AUTO_INCREMENT_OFFSET=1&& set NODO_PORT=5000 && python app.py"
 timeout /t 3
-start cmd /k "set NODO_ID=nodo2 && set NODO_PORT=5001 && python app.py"
+start cmd /k "set NODO_ID=nodo2&& set DB_AUTO_INCREMENT_INCREMENT=3&& set DB_AUTO_INCREMENT_OFFSET=2&& set NODO_PORT=5001 && python app.py"
 timeout /t 3
-start cmd /k "set NODO_ID=nodo3 && set NODO_PORT=5002 && python app.py"
\ No newline at end of file
+start cmd /k "set NODO_ID=nodo3&& set DB_AUTO_INCREMENT_INCREMENT=3&& set DB_AUTO_INCREMENT_OFFSET=3&& set NODO_PORT=5002 && python app.py"
\ No newline at end of file
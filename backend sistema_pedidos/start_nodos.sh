@@ -0,0 +1,68 @@
+#!/bin/sh
+# Levanta nodo1..nodo3 en esta máquina con gunicorn (puertos 5000-5002).
+#
+#   ./start_nodos.sh [start|stop|reload|status]
+#
+# reload envía HUP: los workers se reemplazan sin cortar las peticiones en curso.
+cd "$(dirname "$0")"
+mkdir -p run logs
+
+NODOS="nodo1:5000 nodo2:5001 nodo3:5002"
+# Cada nodo asigna ids de su propia secuencia (offset = su posición en NODOS)
+TOTAL=$(echo $NODOS | wc -w)
+
+replicas_de() {
+    # URLs de los demás nodos, separadas por comas
+    lista=""
+    for otro in $NODOS; do
+        [ "${otro#*:}" = "$1" ] && continue
+        lista="${lista:+$lista,}http://localhost:${otro#*:}"
+    done
+    echo "$lista"
+}
+
+pid_de() {
+    [ -f "run/$1.pid" ] && cat "run/$1.pid"
+}
+
+accion="${1:-start}"
+offset=0
+for nodo in $NODOS; do
+    offset=$((offset + 1))
+    id="${nodo%%:*}"
+    puerto="${nodo#*:}"
+    pid="$(pid_de "$id")"
+    case "$accion" in
+        start)
+            if [ -n "$pid" ] && kill -0 "$pid" 2>/dev/null; then
+                echo "$id ya está en ejecución (pid $pid)"
+                continue
+            fi
+            NODO_ID="$id" NODO_PORT="$puerto" NODOS_REPLICAS="$(replicas_de "$puerto")" \
+                DB_AUTO_INCREMENT_INCREMENT="$TOTAL" DB_AUTO_INCREMENT_OFFSET="$offset" \
+                gunicorn -c gunicorn.conf.py --daemon \
+                --pid "run/$id.pid" \
+                --access-logfile "logs/$id.access.log" \
+                --error-logfile "logs/$id.error.log" \
+                wsgi:app
+            echo "$id iniciado en el puerto $puerto"
+            ;;
+        stop)
+            [ -n "$pid" ] && kill -TERM "$pid" && echo "$id detenido"
+            ;;
+        reload)
+            [ -n "$pid" ] && kill -HUP "$pid" && echo "$id recargado"
+            ;;
+        status)
+            if [ -n "$pid" ] && kill -0 "$pid" 2>/dev/null; then
+                echo "$id: activo (pid $pid, puerto $puerto)"
+            else
+                echo "$id: detenido"
+            fi
+            ;;
+        *)
+            echo "Uso: $0 [start|stop|reload|status]"
+            exit 2
+            ;;
+    esac
+done
@@ -0,0 +1,63 @@
+import json
+import unittest
+import zlib
+from datetime import datetime
+from unittest import mock
+
+from config import Config
+from utils.formato_replicacion import codificar, decodificar
+
+
+def _log(id_log, tabla, operacion, datos, nodo='nodo1'):
+    return {
+        'id_log': id_log,
+        'tabla_afectada': tabla,
+        'operacion': operacion,
+        'id_registro': id_log * 10,
+        'datos_json': datos,
+        'nodo_origen': nodo,
+        'fecha_operacion': datetime(2025, 1, 2, 3, 4, 5)
+    }
+
+
+class FormatoReplicacionTest(unittest.TestCase):
+    def test_ida_y_vuelta(self):
+        logs = [
+            _log(1, 'clientes', 'INSERT', json.dumps({'nombre': 'Ana'})),
+            _log(4, 'pedidos', 'INSERT', {'total': 10.5, 'detalles': []}),
+            _log(7, 'clientes', 'UPDATE', '', nodo='nodo2'),
+        ]
+        decodificados = decodificar(codificar(logs))
+        self.assertEqual([l['id_log'] for l in decodificados], [1, 4, 7])
+        self.assertEqual([l['tabla_afectada'] for l in decodificados], ['clientes', 'pedidos', 'clientes'])
+        self.assertEqual([l['nodo_origen'] for l in decodificados], ['nodo1', 'nodo1', 'nodo2'])
+        self.assertEqual(decodificados[0]['datos_json'], {'nombre': 'Ana'})
+        self.assertEqual(decodificados[1]['datos_json'], {'total': 10.5, 'detalles': []})
+        self.assertEqual(decodificados[2]['datos_json'], {})
+        self.assertEqual(decodificados[0]['fecha_operacion'], '2025-01-02T03:04:05')
+
+    def test_diccionarios_por_lote(self):
+        logs = [_log(i, 'clientes', 'INSERT', {}) for i in range(1, 4)]
+        lote = json.loads(zlib.decompress(codificar(logs)))
+        self.assertEqual(lote['tablas'], ['clientes'])
+        self.assertEqual(lote['columnas']['tabla'], [0, 0, 0])
+
+    def test_lote_vacio(self):
+        self.assertEqual(decodificar(codificar([])), [])
+
+    def test_rechaza_lote_que_supera_el_maximo_descomprimido(self):
+        cuerpo = codificar([_log(1, 'clientes', 'INSERT', {'nombre': 'x' * 5000})])
+        with mock.patch.object(Config, 'REPLICATION_MAX_DESCOMPRIMIDO', 1000):
+            with self.assertRaisesRegex(ValueError, 'más de 1000 bytes'):
+                decodificar(cuerpo)
+
+    def test_rechaza_lote_incompleto_o_de_otra_version(self):
+        cuerpo = codificar([_log(1, 'clientes', 'INSERT', {})])
+        with self.assertRaisesRegex(ValueError, 'incompleto'):
+            decodificar(cuerpo[:-4])
+        with self.assertRaisesRegex(ValueError, 'Versión de lote no soportada'):
+            decodificar(zlib.compress(json.dumps({'v': 99}).encode('utf-8')))
+
+
+if __name__ == '__main__':
+    unittest.main()
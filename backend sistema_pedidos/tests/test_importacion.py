@@ -0,0 +1,136 @@
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+
+from config import Config
+from utils.importacion import (
+    agrupar_lineas_pedido, leer_ajustes, validar_cliente, validar_pedido, validar_producto
+)
+
+
+class ValidarClienteTest(unittest.TestCase):
+    def test_recorta_y_completa_opcionales(self):
+        cliente = validar_cliente({'nombre': '  Ana ', 'email': 'ana@example.com', 'telefono': ''})
+        self.assertEqual(cliente, {
+            'nombre': 'Ana', 'email': 'ana@example.com', 'telefono': None, 'direccion': None
+        })
+
+    def test_email_obligatorio_y_valido(self):
+        with self.assertRaisesRegex(ValueError, 'email es obligatorio'):
+            validar_cliente({'nombre': 'Ana'})
+        with self.assertRaisesRegex(ValueError, 'email no válido'):
+            validar_cliente({'nombre': 'Ana', 'email': 'ana.example.com'})
+
+    def test_largo_maximo(self):
+        with self.assertRaisesRegex(ValueError, 'nombre admite hasta 100'):
+            validar_cliente({'nombre': 'x' * 101, 'email': 'ana@example.com'})
+
+
+class ValidarProductoTest(unittest.TestCase):
+    def test_precio_redondeado_y_stock_por_defecto(self):
+        producto = validar_producto({'nombre': 'Mouse', 'precio': '10.006'})
+        self.assertEqual(producto['precio'], Decimal('10.01'))
+        self.assertEqual(producto['stock'], 0)
+        self.assertEqual(producto['descripcion'], '')
+
+    def test_precio_no_numerico_o_negativo(self):
+        with self.assertRaisesRegex(ValueError, 'precio debe ser un número'):
+            validar_producto({'nombre': 'Mouse', 'precio': 'diez'})
+        with self.assertRaisesRegex(ValueError, 'precio debe ser mayor o igual a 0'):
+            validar_producto({'nombre': 'Mouse', 'precio': -1})
+
+    def test_stock_entero_no_negativo(self):
+        with self.assertRaisesRegex(ValueError, 'stock debe ser un entero'):
+            validar_producto({'nombre': 'Mouse', 'precio': 1, 'stock': 2.5})
+        with self.assertRaisesRegex(ValueError, 'stock debe ser mayor o igual a 0'):
+            validar_producto({'nombre': 'Mouse', 'precio': 1, 'stock': -3})
+
+
+class ValidarPedidoTest(unittest.TestCase):
+    def fila(self, **cambios):
+        fila = {
+            'cliente_id': '7',
+            'direccion_envio': 'Calle 1',
+            'detalles': [{'id_producto': 3, 'cantidad': '2', 'precio_unitario': '1.5'}]
+        }
+        fila.update(cambios)
+        return fila
+
+    def test_pedido_valido(self):
+        pedido = validar_pedido(self.fila(fecha_pedido='2025-01-02 03:04:05', estado='enviado'))
+        self.assertEqual(pedido['cliente_id'], 7)
+        self.assertEqual(pedido['detalles'], [{'id_producto': 3, 'cantidad': 2, 'precio_unitario': 1.5}])
+        self.assertEqual(pedido['fecha_pedido'], datetime(2025, 1, 2, 3, 4, 5))
+        self.assertEqual(pedido['estado'], 'enviado')
+
+    def test_valores_por_defecto(self):
+        pedido = validar_pedido(self.fila(detalles=[{'id_producto': 3, 'cantidad': 1}]))
+        self.assertEqual(pedido['estado'], 'pendiente')
+        self.assertIsNone(pedido['detalles'][0]['precio_unitario'])
+        self.assertEqual(pedido['fecha_pedido'].microsecond, 0)
+
+    def test_detalles_invalidos(self):
+        with self.assertRaisesRegex(ValueError, 'lista no vacía'):
+            validar_pedido(self.fila(detalles=[]))
+        with self.assertRaisesRegex(ValueError, r'detalles\[0\] debe ser un objeto'):
+            validar_pedido(self.fila(detalles=[3]))
+        with self.assertRaisesRegex(ValueError, r'detalles\[0\]: cantidad debe ser mayor o igual a 1'):
+            validar_pedido(self.fila(detalles=[{'id_producto': 3, 'cantidad': 0}]))
+
+    def test_estado_y_fecha_invalidos(self):
+        with self.assertRaisesRegex(ValueError, 'estado no válido'):
+            validar_pedido(self.fila(estado='perdido'))
+        with self.assertRaisesRegex(ValueError, 'fecha_pedido debe tener formato ISO'):
+            validar_pedido(self.fila(fecha_pedido='ayer'))
+
+
+class LeerAjustesTest(unittest.TestCase):
+    def test_separa_ajustes_y_errores(self):
+        ajustes, errores = leer_ajustes(enumerate([
+            {'id_producto': 1, 'delta': -2},
+            {'id_producto': 'x', 'delta': 1},
+            'no es un objeto',
+            {'id_producto': '4', 'delta': '5'}
+        ], start=1))
+        self.assertEqual(ajustes, [(1, -2), (4, 5)])
+        self.assertEqual(errores, [
+            {'fila': 2, 'error': 'id_producto debe ser un entero'},
+            {'fila': 3, 'error': 'Cada fila debe ser un objeto'}
+        ])
+
+    def test_limite_de_ajustes(self):
+        with mock.patch.object(Config, 'AJUSTES_STOCK_MAX', 2):
+            with self.assertRaisesRegex(ValueError, 'hasta 2 ajustes'):
+                leer_ajustes(enumerate([{'id_producto': i, 'delta': 1} for i in range(3)], start=1))
+
+    def test_limite_de_errores_informados(self):
+        with mock.patch.object(Config, 'IMPORTACION_MAX_ERRORES', 1):
+            ajustes, errores = leer_ajustes(enumerate([{}, {}, {'id_producto': 1, 'delta': 1}], start=1))
+        self.assertEqual(ajustes, [(1, 1)])
+        self.assertEqual([e['fila'] for e in errores], [1])
+
+
+class AgruparLineasPedidoTest(unittest.TestCase):
+    def test_agrupa_lineas_seguidas_por_referencia(self):
+        lineas = [
+            (2, {'referencia': 'A', 'cliente_id': '1', 'direccion_envio': 'Calle 1', 'id_producto': '10', 'cantidad': '1'}),
+            (3, {'referencia': 'A', 'cliente_id': '1', 'direccion_envio': 'Calle 1', 'id_producto': '11', 'cantidad': '2'}),
+            (4, {'referencia': 'B', 'cliente_id': '2', 'direccion_envio': 'Calle 2', 'id_producto': '10', 'cantidad': '3'}),
+        ]
+        pedidos = list(agrupar_lineas_pedido(lineas))
+        self.assertEqual([numero for numero, _ in pedidos], [2, 4])
+        self.assertEqual(pedidos[0][1]['cliente_id'], '1')
+        self.assertEqual([d['id_producto'] for d in pedidos[0][1]['detalles']], ['10', '11'])
+        self.assertEqual(pedidos[1][1]['detalles'], [{'id_producto': '10', 'cantidad': '3', 'precio_unitario': None}])
+
+    def test_sin_referencia_cada_linea_es_un_pedido(self):
+        lineas = [(2, {'id_producto': '10'}), (3, {'id_producto': '10'})]
+        self.assertEqual([numero for numero, _ in agrupar_lineas_pedido(lineas)], [2, 3])
+
+    def test_sin_lineas(self):
+        self.assertEqual(list(agrupar_lineas_pedido([])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from werkzeug.datastructures import MultiDict
+
+from config import Config
+from utils.paginacion import codificar_cursor, leer_parametros, proyectar
+
+CAMPOS = {'id_cliente': 'id_cliente', 'nombre': 'nombre', 'email': 'email'}
+
+
+class LeerParametrosTest(unittest.TestCase):
+    def test_valores_por_defecto(self):
+        self.assertEqual(leer_parametros(MultiDict(), CAMPOS), (Config.PAGINA_LIMITE, None, None))
+
+    def test_limit_acotado(self):
+        with mock.patch.object(Config, 'PAGINA_LIMITE_MAX', 50):
+            self.assertEqual(leer_parametros(MultiDict({'limit': '500'}), CAMPOS)[0], 50)
+        self.assertEqual(leer_parametros(MultiDict({'limit': '0'}), CAMPOS)[0], 1)
+
+    def test_cursor(self):
+        _, after, _ = leer_parametros(MultiDict({'after': '2025-01-02 03:04:05,42'}), CAMPOS)
+        self.assertEqual(after, ('2025-01-02 03:04:05', 42))
+        # El valor puede tener comas: el id es lo que sigue a la última
+        _, after, _ = leer_parametros(MultiDict({'after': 'Mouse, inalámbrico,7'}), CAMPOS)
+        self.assertEqual(after, ('Mouse, inalámbrico', 7))
+
+    def test_cursor_invalido(self):
+        for after in ('42', 'valor,x'):
+            with self.assertRaisesRegex(ValueError, 'Cursor "after" no válido'):
+                leer_parametros(MultiDict({'after': after}), CAMPOS)
+
+    def test_fields(self):
+        _, _, campos = leer_parametros(MultiDict({'fields': 'nombre, email,'}), CAMPOS)
+        self.assertEqual(campos, ['nombre', 'email'])
+        with self.assertRaisesRegex(ValueError, 'Campos no válidos: clave'):
+            leer_parametros(MultiDict({'fields': 'nombre,clave'}), CAMPOS)
+
+
+class CursorTest(unittest.TestCase):
+    def test_codificar_cursor(self):
+        self.assertEqual(codificar_cursor('Mouse', 7), 'Mouse,7')
+        self.assertEqual(codificar_cursor(datetime(2025, 1, 2, 3, 4, 5), 42), '2025-01-02 03:04:05,42')
+        self.assertEqual(
+            codificar_cursor(datetime(2025, 1, 2, 3, 4, 5, 120), 42), '2025-01-02 03:04:05.000120,42'
+        )
+
+    def test_ida_y_vuelta(self):
+        cursor = codificar_cursor(datetime(2025, 1, 2, 3, 4, 5), 42)
+        _, after, _ = leer_parametros(MultiDict({'after': cursor}), CAMPOS)
+        self.assertEqual(after, ('2025-01-02 03:04:05', 42))
+
+
+class ProyectarTest(unittest.TestCase):
+    def test_incluye_obligatorios_primero(self):
+        expresiones = {'id_pedido': 'p.id_pedido', 'fecha_pedido': 'p.fecha_pedido', 'total': 'p.total'}
+        self.assertEqual(
+            proyectar(['total'], expresiones, ('fecha_pedido', 'id_pedido')),
+            ['p.fecha_pedido', 'p.id_pedido', 'p.total']
+        )
+
+    def test_sin_campos_todos(self):
+        self.assertEqual(proyectar(None, CAMPOS, ('nombre', 'id_cliente')), ['nombre', 'id_cliente', 'email'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from unittest import mock
+
+from config import Config
+from utils.perfilador import analizar
+
+
+def _consulta(plantilla, duracion_ms):
+    return {'plantilla': plantilla, 'parametros': None, 'inicio_ms': 0, 'duracion_ms': duracion_ms}
+
+
+@mock.patch.object(Config, 'PERFILADOR_REPETICIONES', 3)
+@mock.patch.object(Config, 'PERFILADOR_LENTA_MS', 100)
+class AnalizarTest(unittest.TestCase):
+    def test_sin_alertas(self):
+        consultas = [_consulta('SELECT 1', 1), _consulta('SELECT 1', 2), _consulta('SELECT 2', 99.9)]
+        self.assertEqual(analizar(consultas), [])
+
+    def test_n_mas_1(self):
+        consultas = [_consulta('SELECT * FROM productos WHERE id_producto = %s', 1.25) for _ in range(4)]
+        self.assertEqual(analizar(consultas), [{
+            'tipo': 'n+1',
+            'plantilla': 'SELECT * FROM productos WHERE id_producto = %s',
+            'repeticiones': 4,
+            'tiempo_total_ms': 5.0
+        }])
+
+    def test_lentas(self):
+        consultas = [_consulta('SELECT 1', 150), _consulta('SELECT 2', 100), _consulta('SELECT 3', 10)]
+        self.assertEqual(analizar(consultas), [
+            {'tipo': 'lenta', 'plantilla': 'SELECT 1', 'duracion_ms': 150},
+            {'tipo': 'lenta', 'plantilla': 'SELECT 2', 'duracion_ms': 100},
+        ])
+
+    def test_sin_consultas(self):
+        self.assertEqual(analizar([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
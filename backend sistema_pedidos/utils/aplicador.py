@@ -0,0 +1,404 @@
+import json
+from datetime import datetime
+from itertools import groupby
+
+from config import Config
+from database import transaccion
+from utils import estadisticas, idempotencia, ventas
+
+
+def _datos(log):
+    """Datos de la operación; acepta datos_json como texto o ya decodificado"""
+    datos = log.get('datos_json')
+    if datos is None:
+        return log.get('datos') or {}
+    if isinstance(datos, (str, bytes)):
+        return json.loads(datos) if datos else {}
+    return datos
+
+
+def _expandir(log):
+    """
+    [(id_registro, datos)] de un log. Las cargas masivas (/bulk) registran un
+    solo log por lote con datos {'lote': [{'id': ..., campos...}, ...]}.
+    """
+    datos = _datos(log)
+    if 'lote' not in datos:
+        return [(log['id_registro'], datos)]
+    return [(fila.pop('id'), fila) for fila in datos['lote']]
+
+
+def _marcadores(n):
+    return ", ".join(["%s"] * n)
+
+
+def _conflicto(log, motivo, detalle):
+    """Marca el log como no aplicado; aplicar_lote lo guarda en replicacion_conflictos"""
+    log['conflicto'] = (motivo, detalle)
+
+
+def _origenes(cursor, tabla, columna_id, columna_origen, ids):
+    """{id: nodo de origen} de los registros que ya existen (origen None si se desconoce)"""
+    ids = sorted(set(ids))
+    if not ids:
+        return {}
+    cursor.execute(
+        f"SELECT {columna_id} AS id, {columna_origen} AS origen FROM {tabla} WHERE {columna_id} IN ({_marcadores(len(ids))})",
+        ids
+    )
+    return {fila['id']: fila['origen'] for fila in cursor.fetchall()}
+
+
+def _altas_nuevas(cursor, logs, tabla, columna_id, columna_origen):
+    """
+    Filtra las altas replicadas: un id que ya existe con el mismo origen es un
+    reintento y se omite; con otro origen es otro registro que recibió el mismo
+    id (secuencias de ids mal configuradas) y se marca como conflicto en vez de pisarlo.
+    """
+    existentes = _origenes(cursor, tabla, columna_id, columna_origen, [log['id_registro'] for log in logs])
+    nuevas = []
+    for log in logs:
+        origen = existentes.get(log['id_registro'], False)
+        if origen is False:
+            existentes[log['id_registro']] = log['nodo_origen']
+            nuevas.append(log)
+        elif origen != log['nodo_origen']:
+            _conflicto(log, 'id_duplicado', f"el id ya es de un registro de {origen or 'origen desconocido'}")
+    return nuevas
+
+
+def _sin_email_ajeno(cursor, logs):
+    """Descarta (como conflicto) los clientes cuyo email ya tiene otro cliente local"""
+    emails = sorted({log['datos']['email'] for log in logs if log['datos'].get('email')})
+    duenos = {}
+    if emails:
+        cursor.execute(f"SELECT id_cliente, email FROM clientes WHERE email IN ({_marcadores(len(emails))})", emails)
+        duenos = {fila['email'].lower(): fila['id_cliente'] for fila in cursor.fetchall()}
+    validos = []
+    for log in logs:
+        email = (log['datos'].get('email') or '').lower()
+        dueno = duenos.get(email, log['id_registro'])
+        if dueno != log['id_registro']:
+            _conflicto(log, 'email_duplicado', f'el email ya es del cliente {dueno}')
+            continue
+        if email:
+            duenos[email] = log['id_registro']
+        validos.append(log)
+    return validos
+
+
+def _insertar_clientes(cursor, logs):
+    logs = _sin_email_ajeno(cursor, _altas_nuevas(cursor, logs, 'clientes', 'id_cliente', 'nodo_origen'))
+    if not logs:
+        return
+    cursor.executemany("""
+        INSERT INTO clientes (id_cliente, nombre, email, telefono, direccion, nodo_origen)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, [
+        (log['id_registro'], log['datos'].get('nombre'), log['datos'].get('email'),
+         log['datos'].get('telefono'), log['datos'].get('direccion'), log['nodo_origen'])
+        for log in logs
+    ])
+
+
+def _existentes(cursor, logs, tabla, columna_id):
+    """Los logs cuyo registro existe; los demás se marcan como conflicto (no_encontrado)"""
+    existentes = _origenes(cursor, tabla, columna_id, columna_id, [log['id_registro'] for log in logs])
+    for log in logs:
+        if log['id_registro'] not in existentes:
+            _conflicto(log, 'no_encontrado', 'el registro no existe en este nodo')
+    return [log for log in logs if log['id_registro'] in existentes]
+
+
+def _actualizar_clientes(cursor, logs):
+    logs = _sin_email_ajeno(cursor, _existentes(cursor, logs, 'clientes', 'id_cliente'))
+    if not logs:
+        return
+    cursor.executemany("""
+        UPDATE clientes SET nombre = %s, email = %s, telefono = %s, direccion = %s
+        WHERE id_cliente = %s
+    """, [
+        (log['datos'].get('nombre'), log['datos'].get('email'), log['datos'].get('telefono'),
+         log['datos'].get('direccion'), log['id_registro'])
+        for log in logs
+    ])
+
+
+def _insertar_productos(cursor, logs):
+    logs = _altas_nuevas(cursor, logs, 'productos', 'id_producto', 'nodo_origen')
+    if not logs:
+        return
+    cursor.executemany("""
+        INSERT INTO productos (id_producto, nombre, descripcion, precio, stock, nodo_origen)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, [
+        (log['id_registro'], log['datos'].get('nombre'), log['datos'].get('descripcion'),
+         log['datos'].get('precio'), log['datos'].get('stock', 0), log['nodo_origen'])
+        for log in logs
+    ])
+
+
+def _tipo_actualizacion_producto(log):
+    if 'ajustes' in log['datos']:
+        return 'ajustes'
+    # Logs anteriores a ajuste_stock: traen el stock absoluto
+    return 'ajuste_stock' if 'ajuste_stock' in log['datos'] else 'stock'
+
+
+def _actualizar_productos(cursor, logs):
+    """
+    UPDATE de productos. El stock se replica como diferencia para no pisar los
+    descuentos de pedidos aplicados aquí mientras tanto:
+    - Producto.actualizar: campos descriptivos y ajuste_stock
+    - Producto.ajustar_stock_lote: {'ajustes': [[id, delta], ...]}
+    Se respeta el orden entre tramos de distinto tipo.
+    """
+    from models import Producto
+
+    for tipo, tramo in groupby(logs, key=_tipo_actualizacion_producto):
+        tramo = list(tramo)
+        if tipo == 'ajustes':
+            deltas = {}
+            for log in tramo:
+                for id_producto, delta in log['datos']['ajustes']:
+                    deltas[id_producto] = deltas.get(id_producto, 0) + delta
+            Producto.aplicar_deltas_stock(cursor, deltas)
+            continue
+
+        tramo = _existentes(cursor, tramo, 'productos', 'id_producto')
+        if not tramo:
+            continue
+        stock = 'stock + %s' if tipo == 'ajuste_stock' else '%s'
+        cursor.executemany(f"""
+            UPDATE productos SET nombre = %s, descripcion = %s, precio = %s, stock = {stock}
+            WHERE id_producto = %s
+        """, [
+            (log['datos'].get('nombre'), log['datos'].get('descripcion'), log['datos'].get('precio'),
+             log['datos'].get(tipo) or 0, log['id_registro'])
+            for log in tramo
+        ])
+
+
+def _con_padres(cursor, logs):
+    """
+    Los pedidos cuyo cliente y productos existen aquí; los demás se marcan como
+    conflicto (padre_no_encontrado) en vez de hacer fallar el lote por la FK.
+    """
+    clientes = _origenes(cursor, 'clientes', 'id_cliente', 'id_cliente',
+                         [log['datos']['cliente_id'] for log in logs])
+    productos = _origenes(cursor, 'productos', 'id_producto', 'id_producto', [
+        detalle['id_producto'] for log in logs for detalle in log['datos'].get('detalles', [])
+    ])
+    validos = []
+    for log in logs:
+        d = log['datos']
+        if d['cliente_id'] not in clientes:
+            _conflicto(log, 'padre_no_encontrado', f"el cliente {d['cliente_id']} no existe en este nodo")
+            continue
+        faltantes = sorted({
+            detalle['id_producto'] for detalle in d.get('detalles', [])
+            if detalle['id_producto'] not in productos
+        })
+        if faltantes:
+            _conflicto(log, 'padre_no_encontrado',
+                       f"los productos {', '.join(map(str, faltantes))} no existen en este nodo")
+            continue
+        validos.append(log)
+    return validos
+
+
+def _insertar_pedidos(cursor, logs):
+    """
+    Inserta los pedidos que aún no existen, con sus detalles, y descuenta el
+    stock local. Un pedido que ya existe con el mismo nodo_procesado se omite
+    para no descontar dos veces; con otro nodo es un conflicto de ids. Los que
+    referencian un cliente o producto inexistente quedan como conflicto.
+    Los pedidos históricos de una carga masiva (sin_stock) no descuentan stock.
+    """
+    from models import Producto
+
+    pedidos = []
+    detalles = []
+    deltas = {}
+    rollups = []
+    for log in _con_padres(cursor, _altas_nuevas(cursor, logs, 'pedidos', 'id_pedido', 'nodo_procesado')):
+        d = log['datos']
+        # Los logs anteriores a fecha_pedido toman la hora de llegada, como antes
+        fecha = datetime.now().replace(microsecond=0)
+        if d.get('fecha_pedido'):
+            fecha = ventas.leer_fecha(d['fecha_pedido'])
+        pedidos.append((
+            log['id_registro'], d['cliente_id'], fecha, d['total'], d['direccion_envio'], log['nodo_origen'],
+            d.get('estado', 'pendiente')
+        ))
+        rollups.append((fecha, log['nodo_origen'], d['total'], [
+            (detalle['id_producto'], detalle['cantidad'], detalle['cantidad'] * detalle['precio_unitario'])
+            for detalle in d.get('detalles', [])
+        ]))
+        for detalle in d.get('detalles', []):
+            detalles.append((
+                log['id_registro'],
+                detalle['id_producto'],
+                detalle['cantidad'],
+                detalle['precio_unitario'],
+                detalle['cantidad'] * detalle['precio_unitario']
+            ))
+            if d.get('sin_stock'):
+                continue
+            deltas[detalle['id_producto']] = deltas.get(detalle['id_producto'], 0) - detalle['cantidad']
+
+    if not pedidos:
+        return
+    cursor.executemany("""
+        INSERT INTO pedidos (id_pedido, id_cliente, fecha_pedido, total, direccion_envio, nodo_procesado, estado)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, pedidos)
+    estadisticas.acumular(cursor, [(p[6], p[5], 1, p[3]) for p in pedidos])
+    ventas.acumular(cursor, rollups)
+    if detalles:
+        cursor.executemany("""
+            INSERT INTO detalle_pedidos (id_pedido, id_producto, cantidad, precio_unitario, subtotal)
+            VALUES (%s, %s, %s, %s, %s)
+        """, detalles)
+    Producto.aplicar_deltas_stock(cursor, deltas)
+
+
+def _actualizar_estado_pedidos(cursor, logs):
+    # Un solo UPDATE ... CASE; si un pedido aparece varias veces gana el último estado
+    estados = {log['id_registro']: log['datos']['estado'] for log in logs}
+    estadisticas.cambiar_estados(cursor, estados)
+    ids = sorted(estados)
+    params = []
+    for id_pedido in ids:
+        params.extend((id_pedido, estados[id_pedido]))
+    params.extend(ids)
+    cursor.execute(f"""
+        UPDATE pedidos
+        SET estado = CASE id_pedido {" ".join(["WHEN %s THEN %s"] * len(ids))} END
+        WHERE id_pedido IN ({_marcadores(len(ids))})
+    """, params)
+
+
+def _eliminar(tabla, columna_id):
+    def eliminar(cursor, logs):
+        ids = [log['id_registro'] for log in logs]
+        if tabla in ('pedidos', 'clientes'):
+            # Los pedidos borrados (directamente o en cascada) se descuentan de las estadísticas
+            columna = 'id_pedido' if tabla == 'pedidos' else 'id_cliente'
+            estadisticas.descontar_pedidos(cursor, f"{columna} IN ({_marcadores(len(ids))})", ids)
+            ventas.descontar_pedidos(cursor, f"p.{columna} IN ({_marcadores(len(ids))})", ids)
+        cursor.execute(f"DELETE FROM {tabla} WHERE {columna_id} IN ({_marcadores(len(ids))})", ids)
+    return eliminar
+
+
+APLICADORES = {
+    ('clientes', 'INSERT'): _insertar_clientes,
+    ('clientes', 'UPDATE'): _actualizar_clientes,
+    ('clientes', 'DELETE'): _eliminar('clientes', 'id_cliente'),
+    ('productos', 'INSERT'): _insertar_productos,
+    ('productos', 'UPDATE'): _actualizar_productos,
+    ('productos', 'DELETE'): _eliminar('productos', 'id_producto'),
+    ('pedidos', 'INSERT'): _insertar_pedidos,
+    ('pedidos', 'UPDATE'): _actualizar_estado_pedidos,
+    ('pedidos', 'DELETE'): _eliminar('pedidos', 'id_pedido'),
+    ('idempotencia', 'INSERT'): idempotencia.aplicar_replicadas,
+}
+
+
+def aplicar_lote(logs):
+    """
+    Aplica en la BD local un lote de logs recibido de otro nodo, en una sola transacción.
+
+    - Es idempotente por (nodo_origen, id_log): replicacion_aplicada guarda el
+      último id_log aplicado de cada origen y los logs ya vistos se omiten.
+    - Los logs consecutivos con la misma tabla y operación se agrupan y se
+      aplican con executemany; se respeta el orden entre grupos para que, por
+      ejemplo, un INSERT seguido de un DELETE del mismo registro acabe borrado.
+    - Los logs originados en este mismo nodo se ignoran.
+    - Un log de carga masiva ({'lote': [...]}) se expande en una operación por
+      fila; 'aplicados' cuenta filas.
+    - Una operación que pisaría o perdería un registro local (un id o email que
+      aquí es de otro registro, un UPDATE de un registro que no existe, un
+      pedido cuyo cliente o producto no existe aquí) no se aplica: se guarda en replicacion_conflictos y se cuenta en 'conflictos'.
+    """
+    from models import ConflictoReplicacion
+
+    resumen = {
+        'recibidos': len(logs), 'aplicados': 0, 'omitidos': 0, 'ignorados': 0, 'conflictos': 0,
+        'ultimo_id_log': {}
+    }
+    if not logs:
+        return resumen
+
+    with transaccion() as cursor:
+        origenes = sorted({
+            log['nodo_origen'] for log in logs
+            if log.get('id_log') is not None and log['nodo_origen'] != Config.NODO_ID
+        })
+        aplicado = {}
+        if origenes:
+            cursor.executemany(
+                "INSERT IGNORE INTO replicacion_aplicada (nodo_origen, ultimo_id_log) VALUES (%s, 0)",
+                [(origen,) for origen in origenes]
+            )
+            cursor.execute(f"""
+                SELECT nodo_origen, ultimo_id_log FROM replicacion_aplicada
+                WHERE nodo_origen IN ({_marcadores(len(origenes))})
+                ORDER BY nodo_origen
+                FOR UPDATE
+            """, origenes)
+            aplicado = {fila['nodo_origen']: fila['ultimo_id_log'] for fila in cursor.fetchall()}
+
+        pendientes = []
+        maximo = dict(aplicado)
+        for log in logs:
+            id_log = log.get('id_log')
+            if log['nodo_origen'] == Config.NODO_ID:
+                resumen['omitidos'] += 1
+                continue
+            if id_log is not None:
+                if id_log <= aplicado[log['nodo_origen']]:
+                    resumen['omitidos'] += 1
+                    continue
+                maximo[log['nodo_origen']] = max(maximo[log['nodo_origen']], id_log)
+            pendientes.extend({
+                'tabla': log['tabla_afectada'],
+                'operacion': log['operacion'],
+                'id_registro': id_registro,
+                'nodo_origen': log['nodo_origen'],
+                'datos': datos
+            } for id_registro, datos in _expandir(log))
+
+        for (tabla, operacion), grupo in groupby(pendientes, key=lambda l: (l['tabla'], l['operacion'])):
+            grupo = list(grupo)
+            aplicador = APLICADORES.get((tabla, operacion))
+            if aplicador is None:
+                resumen['ignorados'] += len(grupo)
+                continue
+            aplicador(cursor, grupo)
+            conflictos = [log for log in grupo if log.get('conflicto')]
+            if conflictos:
+                ConflictoReplicacion.registrar(cursor, [
+                    (tabla, operacion, log['id_registro'], log['nodo_origen'], *log['conflicto'], log['datos'])
+                    for log in conflictos
+                ])
+                for log in conflictos:
+                    print(f"Conflicto de replicación en {tabla} {log['id_registro']} de {log['nodo_origen']}: "
+                          f"{log['conflicto'][1]}")
+            resumen['conflictos'] += len(conflictos)
+            resumen['aplicados'] += len(grupo) - len(conflictos)
+
+        avances = [(maximo[o], o) for o in origenes if maximo[o] > aplicado[o]]
+        if avances:
+            cursor.executemany(
+                "UPDATE replicacion_aplicada SET ultimo_id_log = %s WHERE nodo_origen = %s",
+                avances
+            )
+
+    # Tras el commit, para que una lectura concurrente no vuelva a cachear datos viejos
+    if any(p['tabla'] == 'productos' for p in pendientes):
+        from models import Producto
+        Producto.invalidar_cache()
+
+    resumen['ultimo_id_log'] = maximo
+    return resumen
@@ -0,0 +1,140 @@
+import itertools
+import random
+import threading
+import time
+
+import requests
+from config import Config
+from utils.circuito import circuito
+from utils.cliente_nodos import NodoNoDisponible, cliente_nodos
+from utils.monitor_salud import monitor
+
+ROUND_ROBIN = 'round_robin'
+MENOS_PENDIENTES = 'menos_pendientes'
+LATENCIA = 'latencia'
+ESTRATEGIAS = (ROUND_ROBIN, MENOS_PENDIENTES, LATENCIA)
+
+# Métodos que se reintentan en otro nodo si el elegido no responde
+IDEMPOTENTES = ('GET', 'HEAD', 'OPTIONS')
+
+# Factor de suavizado de la latencia de las peticiones reenviadas (EWMA)
+ALFA_LATENCIA = 0.3
+
+
+class Balanceador:
+    """
+    Elige a qué nodo réplica enviar una petición.
+
+    Los candidatos son las réplicas activas según el monitor de salud cuyo
+    circuit breaker no las tenga expulsadas. Estrategias:
+    - round_robin: turno rotativo sobre los candidatos
+    - menos_pendientes: el nodo con menos peticiones en curso (empates por turno)
+    - latencia: aleatorio ponderado por 1 / latencia media (EWMA de las
+      peticiones reenviadas o, mientras no haya, del heartbeat)
+    """
+
+    def __init__(self, estrategia):
+        if estrategia not in ESTRATEGIAS:
+            raise ValueError(f"Estrategia de balanceo inválida: {estrategia}. Opciones: {', '.join(ESTRATEGIAS)}")
+        self.estrategia = estrategia
+        self._lock = threading.Lock()
+        self._turno = itertools.count()
+        self._azar = random.Random()
+        self._pendientes = {}  # url -> peticiones en curso
+        self._latencias = {}  # url -> ms (EWMA)
+        self.reenviadas = 0
+        self.errores = 0
+
+    def candidatos(self):
+        return [url for url in monitor.urls_activas() if circuito(url).disponible()]
+
+    def elegir(self, excluir=()):
+        """URL del nodo elegido, o None si no hay ninguno disponible"""
+        urls = [url for url in self.candidatos() if url not in excluir]
+        if not urls:
+            return None
+
+        turno = next(self._turno)
+        if self.estrategia == ROUND_ROBIN:
+            return urls[turno % len(urls)]
+
+        with self._lock:
+            if self.estrategia == MENOS_PENDIENTES:
+                rotados = urls[turno % len(urls):] + urls[:turno % len(urls)]
+                return min(rotados, key=lambda url: self._pendientes.get(url, 0))
+
+            latencias = {url: self._latencias.get(url) or monitor.latencia(url) for url in urls}
+        conocidas = [ms for ms in latencias.values() if ms]
+        # Un nodo sin medidas entra con la media de los demás
+        media = sum(conocidas) / len(conocidas) if conocidas else 1.0
+        pesos = [1 / max(latencias[url] or media, 0.1) for url in urls]
+        return self._azar.choices(urls, weights=pesos)[0]
+
+    def registrar(self, url, latencia_ms, exito):
+        """Resultado de una petición a url (el circuit breaker lo alimenta cliente_nodos)"""
+        with self._lock:
+            if latencia_ms is not None:
+                anterior = self._latencias.get(url)
+                self._latencias[url] = latencia_ms if anterior is None else (
+                    ALFA_LATENCIA * latencia_ms + (1 - ALFA_LATENCIA) * anterior
+                )
+            if not exito:
+                self.errores += 1
+
+    def _cambiar_pendientes(self, url, delta):
+        with self._lock:
+            self._pendientes[url] = self._pendientes.get(url, 0) + delta
+
+    def reenviar(self, metodo, ruta, **kwargs):
+        """
+        Envía metodo ruta al nodo elegido; retorna (url, response), o (None, None)
+        si no hay nodos. Los métodos idempotentes se reintentan en otro nodo si el
+        elegido no responde; un 5xx se devuelve tal cual pero cuenta como fallo.
+        Con stream=True la latencia registrada es hasta las cabeceras y quien
+        llama debe cerrar la respuesta al terminar de leerla.
+        """
+        intentados = []
+        while True:
+            url = self.elegir(excluir=intentados)
+            if url is None:
+                return None, None
+            intentados.append(url)
+
+            self._cambiar_pendientes(url, 1)
+            inicio = time.perf_counter()
+            try:
+                # La conmutación a otro nodo sustituye a los reintentos de cliente_nodos
+                response = cliente_nodos.peticion(
+                    metodo, url, ruta, reintentos=0, timeout=Config.PROXY_TIMEOUT, **kwargs
+                )
+            except requests.RequestException as e:
+                self.registrar(url, None, False)
+                # Expulsado por su circuito: la petición no llegó a salir
+                if metodo.upper() in IDEMPOTENTES or isinstance(e, NodoNoDisponible):
+                    continue
+                raise
+            finally:
+                self._cambiar_pendientes(url, -1)
+
+            self.registrar(url, (time.perf_counter() - inicio) * 1000, response.status_code < 500)
+            self.reenviadas += 1
+            return url, response
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'estrategia': self.estrategia,
+                'reenviadas': self.reenviadas,
+                'errores': self.errores,
+                'nodos': [
+                    {
+                        'url': url,
+                        'pendientes': self._pendientes.get(url, 0),
+                        'latencia_ms': round(self._latencias[url], 3) if url in self._latencias else None
+                    }
+                    for url in Config.NODOS_REPLICAS
+                ]
+            }
+
+
+balanceador = Balanceador(Config.BALANCEO_ESTRATEGIA)
@@ -0,0 +1,153 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+from config import Config
+from database import transaccion
+
+QUERY_INSERT_LOG = """
+    INSERT INTO log_replicacion
+    (tabla_afectada, operacion, id_registro, datos_json, nodo_origen)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Segundos que vaciar() espera a que el hilo escriba lo pendiente al terminar el proceso
+ESPERA_CIERRE = 10
+
+
+class BufferLogReplicacion:
+    """
+    Buffer de escritura diferida para log_replicacion.
+
+    Las filas se encolan en memoria y un hilo las escribe con INSERT multi-fila
+    cuando se juntan tam_lote filas o pasan intervalo segundos. La cola es
+    acotada: si está llena, quien registra espera hasta espera_max segundos y,
+    si sigue llena, escribe su fila directamente (contrapresión, nunca se descarta).
+    Las filas aún en memoria se pierden si el proceso muere sin pasar por atexit:
+    lo que no pueda perderse debe registrarse con el cursor de su transacción.
+    """
+
+    def __init__(self, tam_lote, intervalo, capacidad, espera_max):
+        self.tam_lote = tam_lote
+        self.intervalo = intervalo
+        self.espera_max = espera_max
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+        self._detener = threading.Event()
+
+        self.escritas = 0
+        self.lotes = 0
+        self.escrituras_directas = 0
+        self.errores = 0
+
+    def _asegurar_hilo(self):
+        # Tras un fork el hilo del padre no existe en el hijo: se crea uno nuevo
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._cola = queue.Queue(maxsize=self._cola.maxsize)
+                self._detener = threading.Event()
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._ejecutar, name='buffer-log-replicacion', daemon=True)
+            self._hilo.start()
+
+    def agregar(self, tabla, operacion, id_registro, datos_json, nodo_origen):
+        """Encola una fila de log; bloquea como máximo espera_max si la cola está llena"""
+        self._asegurar_hilo()
+        fila = (tabla, operacion, id_registro, datos_json, nodo_origen)
+        if self._detener.is_set():
+            # Ya se vació al terminar: el hilo no volverá a leer la cola
+            self.escrituras_directas += 1
+            self._escribir([fila])
+            return
+        try:
+            self._cola.put(fila, timeout=self.espera_max)
+        except queue.Full:
+            self.escrituras_directas += 1
+            self._escribir([fila])
+
+    def _escribir(self, filas):
+        with transaccion() as cursor:
+            cursor.executemany(QUERY_INSERT_LOG, filas)
+        self.escritas += len(filas)
+        self.lotes += 1
+
+    def _tomar_lote(self, bloquear=True):
+        try:
+            lote = [self._cola.get(timeout=self.intervalo) if bloquear else self._cola.get_nowait()]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tam_lote:
+            restante = limite - time.monotonic()
+            try:
+                if bloquear and restante > 0:
+                    lote.append(self._cola.get(timeout=restante))
+                else:
+                    lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _ejecutar(self):
+        detener = self._detener
+        while True:
+            # Con la señal de parada se sigue hasta dejar la cola vacía
+            lote = self._tomar_lote(bloquear=not detener.is_set())
+            if not lote:
+                if detener.is_set():
+                    return
+                continue
+            espera = 0.1
+            while True:
+                try:
+                    self._escribir(lote)
+                    break
+                except Exception as e:
+                    self.errores += 1
+                    print(f"Error escribiendo log de replicación: {str(e)}")
+                    if detener.is_set():
+                        print(f"Se descartan {len(lote)} filas del log de replicación al terminar")
+                        break
+                    # Se reintenta el mismo lote: la cola llena frena a los productores
+                    time.sleep(espera)
+                    espera = min(espera * 2, 5)
+
+    def vaciar(self):
+        """
+        Al terminar el proceso: pide al hilo que escriba lo que quede y lo espera.
+        Solo el hilo escribe, así que el lote que tenga en vuelo no se duplica ni se pierde.
+        """
+        if self._pid != os.getpid() or self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join(ESPERA_CIERRE)
+        if self._hilo.is_alive():
+            print(f"Log de replicación: quedaron {self._cola.qsize()} filas sin escribir al terminar")
+
+    def estadisticas(self):
+        return {
+            'pendientes': self._cola.qsize(),
+            'capacidad': self._cola.maxsize,
+            'escritas': self.escritas,
+            'lotes': self.lotes,
+            'escrituras_directas': self.escrituras_directas,
+            'errores': self.errores
+        }
+
+
+buffer_log = BufferLogReplicacion(
+    Config.LOG_BUFFER_LOTE,
+    Config.LOG_BUFFER_INTERVALO,
+    Config.LOG_BUFFER_CAPACIDAD,
+    Config.LOG_BUFFER_ESPERA
+)
+
+atexit.register(buffer_log.vaciar)
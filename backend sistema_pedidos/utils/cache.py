@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """
+    Cache en memoria thread-safe con expiración (ttl, en segundos) y
+    desalojo LRU al superar capacidad entradas.
+    """
+
+    def __init__(self, capacidad, ttl):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (valor, expira)
+        self._lock = threading.Lock()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.expirados = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave):
+        """Retorna el valor o None si no está o expiró"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                self.expirados += 1
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+
+    def invalidar(self, *claves):
+        with self._lock:
+            for clave in claves:
+                if self._datos.pop(clave, None) is not None:
+                    self.invalidaciones += 1
+
+    def invalidar_si(self, condicion):
+        """Invalida las entradas cuya clave cumple condicion(clave)"""
+        with self._lock:
+            for clave in [c for c in self._datos if condicion(c)]:
+                del self._datos[clave]
+                self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self.invalidaciones += len(self._datos)
+            self._datos.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._datos),
+                'capacidad': self.capacidad,
+                'ttl': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0,
+                'expirados': self.expirados,
+                'desalojos': self.desalojos,
+                'invalidaciones': self.invalidaciones
+            }
+
+
+class VersionCompartida:
+    """
+    Invalidación entre procesos de una cache en memoria. Cada proceso (worker de
+    gunicorn) tiene su propia CacheLRU; la versión vive en la tabla cache_versiones.
+    Quien escribe la incrementa y cada proceso la consulta como mucho cada
+    intervalo segundos antes de leer de su cache: si cambió, la vacía. Así un
+    dato viejo se sirve a lo sumo intervalo segundos en los demás procesos.
+    """
+
+    def __init__(self, nombre, cache, intervalo):
+        self.nombre = nombre
+        self.cache = cache
+        self.intervalo = intervalo
+        self._version = None
+        self._proxima = 0.0
+
+    def verificar(self):
+        from database import execute_query
+
+        ahora = time.monotonic()
+        if ahora < self._proxima:
+            return
+        self._proxima = ahora + self.intervalo
+        try:
+            fila = execute_query(
+                "SELECT version FROM cache_versiones WHERE nombre = %s", (self.nombre,), fetch_one=True
+            )
+        except Exception:
+            # Sin poder comparar versiones la cache dura como mucho un intervalo
+            self.cache.limpiar()
+            return
+        version = fila['version'] if fila else None
+        if version != self._version:
+            if self._version is not None:
+                self.cache.limpiar()
+            self._version = version
+
+    def incrementar(self):
+        """Tras el commit de una escritura: los demás procesos vaciarán su cache"""
+        from database import execute_query
+
+        try:
+            execute_query(
+                "INSERT INTO cache_versiones (nombre, version) VALUES (%s, 1) "
+                "ON DUPLICATE KEY UPDATE version = version + 1",
+                (self.nombre,)
+            )
+        except Exception as e:
+            print(f"No se pudo incrementar la versión de la cache {self.nombre}: {str(e)}")
@@ -0,0 +1,116 @@
+import threading
+import time
+
+from config import Config
+
+CERRADO = 'cerrado'
+ABIERTO = 'abierto'
+SEMIABIERTO = 'semiabierto'
+
+
+class Circuito:
+    """
+    Circuit breaker de un nodo réplica.
+
+    Tras fallos errores seguidos se abre y el nodo queda expulsado espera
+    segundos; cada expulsión seguida duplica la espera hasta espera_max.
+    Vencida la espera pasa a semiabierto y deja pasar una sola petición de
+    prueba: si sale bien se cierra y la espera vuelve a la inicial, si falla
+    se abre otra vez.
+    """
+
+    def __init__(self, nombre, fallos, espera, espera_max):
+        self.nombre = nombre
+        self.umbral = max(fallos, 1)
+        self.espera = espera
+        self.espera_max = espera_max
+        self._lock = threading.Lock()
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.expulsiones = 0  # aperturas seguidas sin un éxito, para el backoff
+        self.abierto_hasta = 0.0  # time.monotonic()
+        self._prueba_en_curso = False
+        self.aperturas = 0
+        self.rechazadas = 0
+
+    def disponible(self):
+        """True si el nodo aceptaría una petición ahora (no consume la prueba)"""
+        with self._lock:
+            if self.estado == CERRADO:
+                return True
+            if self.estado == ABIERTO:
+                return time.monotonic() >= self.abierto_hasta
+            return not self._prueba_en_curso
+
+    def permite(self):
+        """
+        True si se puede enviar una petición al nodo. En semiabierto solo la
+        primera llamada recibe True: quien la reciba debe reportar exito() o fallo().
+        """
+        with self._lock:
+            if self.estado == ABIERTO and time.monotonic() >= self.abierto_hasta:
+                self.estado = SEMIABIERTO
+                self._prueba_en_curso = False
+            if self.estado == CERRADO:
+                return True
+            if self.estado == SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            self.rechazadas += 1
+            return False
+
+    def exito(self):
+        with self._lock:
+            self.estado = CERRADO
+            self.fallos_consecutivos = 0
+            self.expulsiones = 0
+            self._prueba_en_curso = False
+
+    def fallo(self):
+        with self._lock:
+            self.fallos_consecutivos += 1
+            # Las peticiones que ya estaban en vuelo al abrirse no alargan la expulsión
+            if self.estado == ABIERTO:
+                return
+            if self.estado == SEMIABIERTO or self.fallos_consecutivos >= self.umbral:
+                espera = min(self.espera * 2 ** self.expulsiones, self.espera_max)
+                self.estado = ABIERTO
+                self.abierto_hasta = time.monotonic() + espera
+                self.expulsiones += 1
+                self.aperturas += 1
+                self._prueba_en_curso = False
+
+    def como_dict(self):
+        with self._lock:
+            return {
+                'nodo': self.nombre,
+                'estado': self.estado,
+                'fallos_consecutivos': self.fallos_consecutivos,
+                'expulsiones': self.expulsiones,
+                'segundos_para_reintentar': round(max(0.0, self.abierto_hasta - time.monotonic()), 3)
+                if self.estado == ABIERTO else 0,
+                'aperturas': self.aperturas,
+                'rechazadas': self.rechazadas
+            }
+
+
+_circuitos = {}
+_lock = threading.Lock()
+
+
+def circuito(nombre):
+    """Circuit breaker de un nodo, compartido por todo el proceso"""
+    actual = _circuitos.get(nombre)
+    if actual is None:
+        with _lock:
+            actual = _circuitos.get(nombre)
+            if actual is None:
+                actual = Circuito(
+                    nombre, Config.CIRCUITO_FALLOS, Config.CIRCUITO_ESPERA, Config.CIRCUITO_ESPERA_MAX
+                )
+                _circuitos[nombre] = actual
+    return actual
+
+
+def estadisticas():
+    return [c.como_dict() for c in list(_circuitos.values())]
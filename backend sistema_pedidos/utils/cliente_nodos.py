@@ -0,0 +1,174 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+from utils.circuito import circuito
+
+# Respuestas de un nodo sobrecargado o de un proxy intermedio: se reintentan
+ESTADOS_REINTENTABLES = (502, 503, 504)
+
+
+class NodoNoDisponible(requests.ConnectionError):
+    """El circuit breaker tiene expulsado al nodo: la llamada no se hizo"""
+
+
+class PresupuestoReintentos:
+    """
+    Limita los reintentos de todo el proceso para que una réplica caída no
+    multiplique el tráfico por (1 + MAX_RETRIES). Cubeta de fichas: cada
+    llamada deposita proporcion fichas, el tiempo deposita minimo por segundo
+    y cada reintento retira una.
+    """
+
+    def __init__(self, proporcion, minimo):
+        self.proporcion = proporcion
+        self.minimo = minimo
+        self.capacidad = max(minimo * 10, 10)
+        self._lock = threading.Lock()
+        self._fichas = self.capacidad
+        self._ultimo = time.monotonic()
+
+    def _reponer(self, fichas):
+        ahora = time.monotonic()
+        self._fichas = min(self.capacidad, self._fichas + fichas + (ahora - self._ultimo) * self.minimo)
+        self._ultimo = ahora
+
+    def depositar(self):
+        with self._lock:
+            self._reponer(self.proporcion)
+
+    def retirar(self):
+        """True si queda presupuesto para un reintento (y lo consume)"""
+        with self._lock:
+            self._reponer(0)
+            if self._fichas < 1:
+                return False
+            self._fichas -= 1
+            return True
+
+    def fichas(self):
+        with self._lock:
+            self._reponer(0)
+            return self._fichas
+
+
+class ClienteNodos:
+    """
+    Cliente HTTP para todas las llamadas entre nodos.
+
+    - Una requests.Session por proceso con conexiones keep-alive por nodo.
+    - Circuit breaker por nodo (utils/circuito.py): un nodo expulsado falla
+      al instante con NodoNoDisponible en vez de esperar el timeout.
+    - Reintentos ante errores de red y 502/503/504, hasta reintentos veces, con
+      backoff exponencial con jitter completo y sujetos al presupuesto global.
+    """
+
+    def __init__(self, reintentos, espera, espera_max, presupuesto, conexiones):
+        self.reintentos = reintentos
+        self.espera = espera
+        self.espera_max = espera_max
+        self.presupuesto = presupuesto
+        self.conexiones = conexiones
+        self._lock = threading.Lock()
+        self._sesion = None
+        self._pid = None
+        self.llamadas = 0
+        self.reintentos_hechos = 0
+        self.rechazadas = 0
+        self.sin_presupuesto = 0
+
+    def sesion(self):
+        # Las conexiones abiertas no se comparten entre procesos tras un fork
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    sesion = requests.Session()
+                    adaptador = HTTPAdapter(
+                        pool_connections=max(len(Config.NODOS_REPLICAS), 1),
+                        pool_maxsize=self.conexiones
+                    )
+                    sesion.mount('http://', adaptador)
+                    sesion.mount('https://', adaptador)
+                    self._sesion = sesion
+                    self._pid = os.getpid()
+        return self._sesion
+
+    def _espera_reintento(self, intento):
+        return random.uniform(0, min(self.espera_max, self.espera * 2 ** (intento - 1)))
+
+    def peticion(self, metodo, nodo_url, ruta, reintentos=None, usar_circuito=True, **kwargs):
+        """
+        Hace metodo nodo_url + ruta (kwargs van a requests, timeout incluido).
+        Retorna la última respuesta, sea cual sea su código, o lanza la última
+        excepción de requests. Solo deben reintentarse llamadas idempotentes:
+        reintentos=0 para las demás. Con usar_circuito=False no se consulta ni
+        alimenta el circuit breaker (heartbeats).
+        """
+        reintentos = self.reintentos if reintentos is None else reintentos
+        breaker = circuito(nodo_url) if usar_circuito else None
+        self.llamadas += 1
+        self.presupuesto.depositar()
+
+        intento = 0
+        while True:
+            if breaker is not None and not breaker.permite():
+                self.rechazadas += 1
+                raise NodoNoDisponible(f"{nodo_url} expulsado por su circuit breaker")
+
+            response = None
+            try:
+                response = self.sesion().request(metodo, f"{nodo_url}{ruta}", **kwargs)
+            except requests.RequestException as e:
+                error = e
+
+            if breaker is not None:
+                if response is None or response.status_code >= 500:
+                    breaker.fallo()
+                else:
+                    breaker.exito()
+
+            if response is not None and response.status_code not in ESTADOS_REINTENTABLES:
+                return response
+            if intento >= reintentos:
+                break
+            if not self.presupuesto.retirar():
+                self.sin_presupuesto += 1
+                break
+            intento += 1
+            self.reintentos_hechos += 1
+            if response is not None:
+                # Con stream=True la conexión sigue ocupada hasta cerrar la respuesta descartada
+                response.close()
+            time.sleep(self._espera_reintento(intento))
+
+        if response is None:
+            raise error
+        return response
+
+    def get(self, nodo_url, ruta, **kwargs):
+        return self.peticion('GET', nodo_url, ruta, **kwargs)
+
+    def post(self, nodo_url, ruta, **kwargs):
+        return self.peticion('POST', nodo_url, ruta, **kwargs)
+
+    def estadisticas(self):
+        return {
+            'llamadas': self.llamadas,
+            'reintentos': self.reintentos_hechos,
+            'rechazadas_circuito': self.rechazadas,
+            'sin_presupuesto': self.sin_presupuesto,
+            'presupuesto_fichas': round(self.presupuesto.fichas(), 2)
+        }
+
+
+cliente_nodos = ClienteNodos(
+    Config.MAX_RETRIES,
+    Config.REINTENTO_ESPERA,
+    Config.REINTENTO_ESPERA_MAX,
+    PresupuestoReintentos(Config.REINTENTOS_PROPORCION, Config.REINTENTOS_MINIMO),
+    Config.CONEXIONES_POR_NODO
+)
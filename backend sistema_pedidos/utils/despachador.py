@@ -0,0 +1,146 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from config import Config
+from utils.cliente_nodos import cliente_nodos
+from utils.metricas import observar_replicacion
+
+
+class _ColaNodo:
+    """Cola e hilo de envío de un nodo réplica"""
+
+    def __init__(self, nodo_url, capacidad):
+        self.nodo_url = nodo_url
+        self.cola = queue.Queue(maxsize=capacidad)
+        self.lock = threading.Lock()
+        self.sincronizacion = None  # Future de la sincronización encolada y aún no iniciada
+        self.descartados = 0
+        self.enviados = 0
+        self.errores = 0
+        self.hilo = threading.Thread(
+            target=self._ejecutar, name=f'replicacion-{nodo_url}', daemon=True
+        )
+        self.hilo.start()
+
+    def encolar_sincronizacion(self):
+        # Varias peticiones seguidas comparten una misma sincronización pendiente
+        with self.lock:
+            if self.sincronizacion is not None:
+                return self.sincronizacion
+            futuro = Future()
+            try:
+                self.cola.put_nowait(('sincronizar', None, futuro))
+            except queue.Full:
+                futuro.set_result({'nodo': self.nodo_url, 'status': 'error', 'error': 'Cola llena'})
+                return futuro
+            self.sincronizacion = futuro
+            return futuro
+
+    def encolar_logs(self, logs):
+        futuro = Future()
+        try:
+            self.cola.put_nowait(('logs', logs, futuro))
+        except queue.Full:
+            # Los logs persistidos se recuperan en la siguiente sincronización por cursor
+            self.descartados += len(logs)
+            futuro.set_result({'nodo': self.nodo_url, 'status': 'error', 'error': 'Cola llena'})
+        return futuro
+
+    def _ejecutar(self):
+        from utils.replicador import enviar_a_nodo, consolidar
+
+        while True:
+            tipo, logs, futuro = self.cola.get()
+            if tipo == 'sincronizar':
+                with self.lock:
+                    self.sincronizacion = None
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                if tipo == 'sincronizar':
+                    resultado = enviar_a_nodo(self.nodo_url)
+                    if resultado['status'] == 'success':
+                        consolidar()
+                else:
+                    inicio = time.perf_counter()
+                    try:
+                        response = cliente_nodos.post(
+                            self.nodo_url,
+                            '/api/replicacion/sincronizar',
+                            json={'logs': logs},
+                            timeout=Config.REPLICATION_TIMEOUT
+                        )
+                    except Exception:
+                        observar_replicacion(self.nodo_url, time.perf_counter() - inicio, False)
+                        raise
+                    observar_replicacion(
+                        self.nodo_url, time.perf_counter() - inicio, response.status_code == 200, len(logs)
+                    )
+                    resultado = {
+                        'nodo': self.nodo_url,
+                        'status': 'success' if response.status_code == 200 else 'error',
+                        'logs_enviados': len(logs) if response.status_code == 200 else 0
+                    }
+                    if response.status_code != 200:
+                        resultado['error'] = response.text
+                if resultado['status'] == 'success':
+                    self.enviados += resultado['logs_enviados']
+                else:
+                    self.errores += 1
+                futuro.set_result(resultado)
+            except Exception as e:
+                self.errores += 1
+                print(f"Error replicando a {self.nodo_url}: {str(e)}")
+                futuro.set_result({'nodo': self.nodo_url, 'status': 'error', 'error': str(e)})
+
+    def estadisticas(self):
+        return {
+            'nodo': self.nodo_url,
+            'en_cola': self.cola.qsize(),
+            'logs_enviados': self.enviados,
+            'logs_descartados': self.descartados,
+            'errores': self.errores
+        }
+
+
+class DespachadorReplicacion:
+    """
+    Envía la replicación a todos los nodos en paralelo, fuera del hilo de la petición.
+    Cada nodo tiene su propia cola e hilo, así un nodo lento o caído no frena a
+    los demás; las conexiones, reintentos y circuit breakers son los de utils/cliente_nodos.py.
+    """
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._nodos = {}
+        self._pid = None
+
+    def _colas(self):
+        # Los hilos no sobreviven a un fork: cada proceso crea los suyos
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._nodos = {
+                        nodo_url: _ColaNodo(nodo_url, self.capacidad)
+                        for nodo_url in Config.NODOS_REPLICAS
+                    }
+                    self._pid = os.getpid()
+        return self._nodos
+
+    def sincronizar(self):
+        """Encola una sincronización por cursor en cada nodo; retorna {nodo_url: Future}"""
+        return {nodo_url: cola.encolar_sincronizacion() for nodo_url, cola in self._colas().items()}
+
+    def enviar_logs(self, logs):
+        """Encola un lote de logs para cada nodo; retorna {nodo_url: Future}"""
+        return {nodo_url: cola.encolar_logs(logs) for nodo_url, cola in self._colas().items()}
+
+    def estadisticas(self):
+        return [cola.estadisticas() for cola in self._colas().values()]
+
+
+despachador = DespachadorReplicacion(Config.REPLICATION_COLA)
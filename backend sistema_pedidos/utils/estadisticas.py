@@ -0,0 +1,172 @@
+"""
+Estadísticas de pedidos materializadas en la tabla estadisticas_pedidos.
+
+Cada escritura de pedidos suma o resta sus deltas por estado y por nodo dentro
+de su propia transacción, así leer las estadísticas es leer unas pocas filas.
+Cada contador está repartido en ESTADISTICAS_SLOTS filas y cada transacción
+suma en una al azar: si todos los pedidos sumaran en la misma fila, su bloqueo
+(retenido hasta el COMMIT) serializaría la creación de pedidos del nodo.
+Las lecturas suman los slots.
+
+Uso (desde la carpeta del backend):
+    python -m utils.estadisticas reconciliar   compara con los pedidos reales
+    python -m utils.estadisticas reconstruir   recalcula desde los pedidos
+"""
+import random
+import sys
+from decimal import Decimal
+
+from config import Config
+from database import execute_query, transaccion
+
+QUERY_ACUMULAR = """
+    INSERT INTO estadisticas_pedidos (dimension, valor, slot, cantidad, total)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE cantidad = cantidad + VALUES(cantidad), total = total + VALUES(total)
+"""
+
+QUERY_CALCULAR = """
+    SELECT estado, COALESCE(nodo_procesado, '') AS nodo, COUNT(*) AS cantidad, COALESCE(SUM(total), 0) AS total
+    FROM pedidos
+    GROUP BY estado, nodo_procesado
+"""
+
+QUERY_LEER = """
+    SELECT dimension, valor, SUM(cantidad) AS cantidad, SUM(total) AS total
+    FROM estadisticas_pedidos
+    GROUP BY dimension, valor
+"""
+
+
+def _sumar(deltas, clave, cantidad, total):
+    actual = deltas.get(clave, (0, Decimal(0)))
+    deltas[clave] = (actual[0] + cantidad, actual[1] + Decimal(str(total)))
+
+
+def _guardar_deltas(cursor, deltas):
+    # Un solo slot por llamada y claves en orden fijo: dos transacciones
+    # concurrentes bloquean las filas en el mismo orden
+    slot = random.randrange(Config.ESTADISTICAS_SLOTS)
+    filas = [(d, v, slot, c, t) for (d, v), (c, t) in sorted(deltas.items()) if c or t]
+    if filas:
+        cursor.executemany(QUERY_ACUMULAR, filas)
+
+
+def acumular(cursor, cambios):
+    """
+    Suma deltas a los contadores en la transacción del cursor.
+    cambios: iterable de (estado, nodo, delta_cantidad, delta_total).
+    """
+    deltas = {}
+    for estado, nodo, cantidad, total in cambios:
+        _sumar(deltas, ('estado', estado), cantidad, total)
+        _sumar(deltas, ('nodo', nodo or ''), cantidad, total)
+    _guardar_deltas(cursor, deltas)
+
+
+def pedido_creado(cursor, estado, nodo, total):
+    acumular(cursor, [(estado, nodo, 1, total)])
+
+
+def descontar_pedidos(cursor, condicion, params):
+    """
+    Resta de los contadores los pedidos que cumplen condicion (sobre la tabla
+    pedidos) antes de borrarlos; los bloquea para que no cambien entretanto.
+    """
+    cursor.execute(f"""
+        SELECT estado, nodo_procesado, COUNT(*) AS cantidad, COALESCE(SUM(total), 0) AS total
+        FROM pedidos
+        WHERE {condicion}
+        GROUP BY estado, nodo_procesado
+        FOR UPDATE
+    """, params)
+    acumular(cursor, [
+        (f['estado'], f['nodo_procesado'], -f['cantidad'], -f['total']) for f in cursor.fetchall()
+    ])
+
+
+def cambiar_estados(cursor, nuevos_estados):
+    """
+    Mueve los contadores de los pedidos que cambian de estado.
+    nuevos_estados: {id_pedido: estado}. Debe llamarse antes del UPDATE.
+    """
+    if not nuevos_estados:
+        return
+    ids = sorted(nuevos_estados)
+    cursor.execute(f"""
+        SELECT id_pedido, estado, total FROM pedidos
+        WHERE id_pedido IN ({', '.join(['%s'] * len(ids))})
+        FOR UPDATE
+    """, ids)
+    # Solo cambia la dimensión estado: el nodo del pedido sigue siendo el mismo
+    deltas = {}
+    for fila in cursor.fetchall():
+        nuevo = nuevos_estados[fila['id_pedido']]
+        if nuevo != fila['estado']:
+            _sumar(deltas, ('estado', fila['estado']), -1, -fila['total'])
+            _sumar(deltas, ('estado', nuevo), 1, fila['total'])
+    _guardar_deltas(cursor, deltas)
+
+
+def leer():
+    """Retorna {'estado': {valor: (cantidad, total)}, 'nodo': {...}}"""
+    filas = execute_query(QUERY_LEER, fetch_all=True)
+    resultado = {'estado': {}, 'nodo': {}}
+    for fila in filas:
+        resultado[fila['dimension']][fila['valor']] = (int(fila['cantidad']), fila['total'])
+    return resultado
+
+
+def _calcular(cursor):
+    cursor.execute(QUERY_CALCULAR)
+    esperado = {}
+    for fila in cursor.fetchall():
+        for clave in (('estado', fila['estado']), ('nodo', fila['nodo'])):
+            cantidad, total = esperado.get(clave, (0, Decimal(0)))
+            esperado[clave] = (cantidad + fila['cantidad'], total + fila['total'])
+    return esperado
+
+
+def reconciliar():
+    """Diferencias entre los contadores y los pedidos reales: [(dimension, valor, guardado, real)]"""
+    with transaccion() as cursor:
+        esperado = _calcular(cursor)
+        cursor.execute(QUERY_LEER)
+        guardado = {(f['dimension'], f['valor']): (int(f['cantidad']), f['total']) for f in cursor.fetchall()}
+
+    diferencias = []
+    for clave in sorted(set(esperado) | set(guardado)):
+        real = esperado.get(clave, (0, Decimal(0)))
+        actual = guardado.get(clave, (0, Decimal(0)))
+        if real != actual:
+            diferencias.append((clave[0], clave[1], actual, real))
+    return diferencias
+
+
+def reconstruir():
+    """Recalcula todos los contadores desde la tabla pedidos en una transacción (en el slot 0)"""
+    with transaccion() as cursor:
+        cursor.execute("SELECT dimension FROM estadisticas_pedidos FOR UPDATE")
+        esperado = _calcular(cursor)
+        cursor.execute("DELETE FROM estadisticas_pedidos")
+        if esperado:
+            cursor.executemany(
+                "INSERT INTO estadisticas_pedidos (dimension, valor, cantidad, total) VALUES (%s, %s, %s, %s)",
+                [(d, v, c, t) for (d, v), (c, t) in sorted(esperado.items())]
+            )
+    return len(esperado)
+
+
+if __name__ == '__main__':
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'reconciliar'
+    if comando == 'reconstruir':
+        print(f'{reconstruir()} contadores recalculados')
+    elif comando == 'reconciliar':
+        diferencias = reconciliar()
+        for dimension, valor, guardado, real in diferencias:
+            print(f'{dimension}={valor}: guardado {guardado}, real {real}')
+        print(f'{len(diferencias)} diferencias')
+        sys.exit(1 if diferencias else 0)
+    else:
+        print(__doc__)
+        sys.exit(2)
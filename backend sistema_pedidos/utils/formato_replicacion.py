@@ -0,0 +1,86 @@
+import json
+import zlib
+
+from config import Config
+
+TIPO_COMPACTO = 'application/x-replicacion-lote'
+VERSION = 1
+
+
+def _indice(diccionario, valores, valor):
+    if valor not in diccionario:
+        diccionario[valor] = len(valores)
+        valores.append(valor)
+    return diccionario[valor]
+
+
+def codificar(logs):
+    """
+    Codifica un lote de logs en formato columnar comprimido con zlib.
+
+    tabla_afectada, operacion y nodo_origen se envían una vez en un diccionario
+    por lote y cada fila guarda solo su índice; datos_json viaja como objeto
+    (no como texto JSON dentro de JSON).
+    """
+    tablas, operaciones, nodos = [], [], []
+    idx_tablas, idx_operaciones, idx_nodos = {}, {}, {}
+    columnas = {'id_log': [], 'tabla': [], 'operacion': [], 'nodo': [], 'id_registro': [], 'datos': [], 'fecha': []}
+
+    for log in logs:
+        datos = log.get('datos_json')
+        if isinstance(datos, (str, bytes)):
+            datos = json.loads(datos) if datos else {}
+        fecha = log.get('fecha_operacion')
+        if hasattr(fecha, 'isoformat'):
+            fecha = fecha.isoformat()
+
+        columnas['id_log'].append(log.get('id_log'))
+        columnas['tabla'].append(_indice(idx_tablas, tablas, log['tabla_afectada']))
+        columnas['operacion'].append(_indice(idx_operaciones, operaciones, log['operacion']))
+        columnas['nodo'].append(_indice(idx_nodos, nodos, log['nodo_origen']))
+        columnas['id_registro'].append(log['id_registro'])
+        columnas['datos'].append(datos)
+        columnas['fecha'].append(fecha)
+
+    lote = {
+        'v': VERSION,
+        'n': len(logs),
+        'tablas': tablas,
+        'operaciones': operaciones,
+        'nodos': nodos,
+        'columnas': columnas
+    }
+    cuerpo = json.dumps(lote, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(cuerpo, Config.REPLICATION_COMPRESION)
+
+
+def decodificar(cuerpo):
+    """
+    Inverso de codificar: retorna la lista de logs (datos_json ya decodificado).
+    Se descomprime como mucho REPLICATION_MAX_DESCOMPRIMIDO bytes: el cuerpo
+    llega de la red y unos pocos KB comprimidos pueden expandirse a GB.
+    """
+    descompresor = zlib.decompressobj()
+    plano = descompresor.decompress(cuerpo, Config.REPLICATION_MAX_DESCOMPRIMIDO)
+    if descompresor.unconsumed_tail:
+        raise ValueError(f'Lote de replicación de más de {Config.REPLICATION_MAX_DESCOMPRIMIDO} bytes descomprimido')
+    if not descompresor.eof:
+        raise ValueError('Lote de replicación comprimido incompleto')
+    lote = json.loads(plano)
+    if lote.get('v') != VERSION:
+        raise ValueError(f"Versión de lote no soportada: {lote.get('v')}")
+
+    c = lote['columnas']
+    tablas, operaciones, nodos = lote['tablas'], lote['operaciones'], lote['nodos']
+    return [
+        {
+            'id_log': c['id_log'][i],
+            'tabla_afectada': tablas[c['tabla'][i]],
+            'operacion': operaciones[c['operacion'][i]],
+            'nodo_origen': nodos[c['nodo'][i]],
+            'id_registro': c['id_registro'][i],
+            'datos_json': c['datos'][i],
+            'fecha_operacion': c['fecha'][i]
+        }
+        for i in range(lote['n'])
+    ]
@@ -1,5 +1,5 @@
-import requests
 from config import Config
+from utils.despachador import despachador
 import json
 from datetime import datetime
 
@@ -19,29 +19,17 @@ def replicar_operacion(tabla, operacion, id_registro, datos):
         'fecha_operacion': datetime.now().isoformat()
     }
     
-    for nodo_url in Config.NODOS_REPLICAS:
-        try:
-            requests.post(
-                f"{nodo_url}/api/replicacion/sincronizar",
-                json={'logs': [log_data]},
-                timeout=Config.REPLICATION_TIMEOUT
-            )
-        except Exception as e:
-            print(f"Error replicando a {nodo_url}: {str(e)}")
+    # Se envía en segundo plano y en paralelo a todos los nodos
+    despachador.enviar_logs([log_data])
 
 
 def verificar_nodo_disponible(nodo_url):
     """
-    Verifica si un nodo está disponible
+    Verifica si un nodo está disponible según el último heartbeat
     """
-    try:
-        response = requests.get(
-            f"{nodo_url}/api/health/ping",
-            timeout=3
-        )
-        return response.status_code == 200
-    except:
-        return False
+    from utils.monitor_salud import monitor, ACTIVO
+    
+    return monitor.estado(nodo_url) == ACTIVO
 
 
 def obtener_nodo_disponible():
@@ -49,74 +37,38 @@ def obtener_nodo_disponible():
     Retorna el primer nodo disponible de las réplicas
     Si ninguno está disponible, retorna None
     """
-    for nodo_url in Config.NODOS_REPLICAS:
-        if verificar_nodo_disponible(nodo_url):
-            return nodo_url
-    return None
+    from utils.monitor_salud import monitor
+    
+    activos = monitor.urls_activas()
+    return activos[0] if activos else None
 
 
 def balancear_carga():
     """
-    Implementa un balanceo de carga simple (Round Robin)
-    Retorna la URL del nodo a usar
+    Retorna la URL del nodo a usar según BALANCEO_ESTRATEGIA (utils/balanceador.py)
+    o None si no hay ninguno disponible
     """
-    nodos_activos = []
+    from utils.balanceador import balanceador
     
-    for nodo_url in Config.NODOS_REPLICAS:
-        if verificar_nodo_disponible(nodo_url):
-            nodos_activos.append(nodo_url)
-    
-    if not nodos_activos:
-        return None
-    
-    # Simple round robin - en producción se usaría algo más sofisticado
-    import random
-    return random.choice(nodos_activos)
+    return balanceador.elegir()
 
 
 def sincronizar_base_datos():
     """
     Sincroniza la base de datos local con otros nodos
     """
-    from models import LogReplicacion
+    from utils.replicador import replicar_pendientes
     
     try:
-        logs = LogReplicacion.obtener_pendientes()
+        resultado = replicar_pendientes()
         
-        if not logs:
+        if not resultado['logs_replicados'] and all(r['status'] == 'success' for r in resultado['resultados']):
             return {'success': True, 'message': 'No hay logs pendientes'}
         
-        resultados = []
-        
-        for nodo_url in Config.NODOS_REPLICAS:
-            try:
-                response = requests.post(
-                    f"{nodo_url}/api/replicacion/sincronizar",
-                    json={'logs': logs},
-                    timeout=Config.REPLICATION_TIMEOUT
-                )
-                
-                if response.status_code == 200:
-                    resultados.append({
-                        'nodo': nodo_url,
-                        'status': 'success'
-                    })
-                    
-            except Exception as e:
-                resultados.append({
-                    'nodo': nodo_url,
-                    'status': 'error',
-                    'error': str(e)
-                })
-        
-        # Marcar como replicados
-        for log in logs:
-            LogReplicacion.marcar_replicado(log['id_log'])
-        
         return {
             'success': True,
-            'logs_procesados': len(logs),
-            'resultados': resultados
+            'logs_procesados': resultado['logs_replicados'],
+            'resultados': resultado['resultados']
         }
         
     except Exception as e:
@@ -130,40 +82,26 @@ def calcular_estadisticas_pedidos():
     """
     Calcula estadísticas básicas de pedidos
     """
-    from models import Pedido
-    from database import execute_query
+    from utils import estadisticas
     
     try:
-        # Total de pedidos
-        query_total = "SELECT COUNT(*) as total FROM pedidos"
-        total = execute_query(query_total, fetch_one=True)
-        
-        # Pedidos por estado
-        query_estados = """
-            SELECT estado, COUNT(*) as cantidad 
-            FROM pedidos 
-            GROUP BY estado
-        """
-        por_estado = execute_query(query_estados, fetch_all=True)
-        
-        # Total facturado
-        query_facturacion = "SELECT SUM(total) as total_facturado FROM pedidos"
-        facturacion = execute_query(query_facturacion, fetch_one=True)
-        
-        # Pedidos por nodo
-        query_nodos = """
-            SELECT nodo_procesado, COUNT(*) as cantidad 
-            FROM pedidos 
-            GROUP BY nodo_procesado
-        """
-        por_nodo = execute_query(query_nodos, fetch_all=True)
+        # Contadores materializados (utils/estadisticas.py): unas pocas filas
+        contadores = estadisticas.leer()
+        por_estado = contadores['estado']
+        por_nodo = contadores['nodo']
         
         return {
             'success': True,
-            'total_pedidos': total['total'],
-            'por_estado': por_estado,
-            'total_facturado': float(facturacion['total_facturado'] or 0),
-            'por_nodo': por_nodo
+            'total_pedidos': sum(cantidad for cantidad, _ in por_estado.values()),
+            'por_estado': [
+                {'estado': estado, 'cantidad': cantidad}
+                for estado, (cantidad, _) in por_estado.items() if cantidad
+            ],
+            'total_facturado': float(sum(total for _, total in por_estado.values())),
+            'por_nodo': [
+                {'nodo_procesado': nodo, 'cantidad': cantidad}
+                for nodo, (cantidad, _) in por_nodo.items() if cantidad
+            ]
         }
         
     except Exception as e:
@@ -179,8 +117,10 @@ def validar_stock_productos(detalles):
     """
     from models import Producto
     
+    productos = Producto.obtener_por_ids([d['id_producto'] for d in detalles])
+    
     for detalle in detalles:
-        producto = Producto.obtener_por_id(detalle['id_producto'])
+        producto = productos.get(detalle['id_producto'])
         
         if not producto:
             return {
@@ -201,10 +141,10 @@ def generar_reporte_nodo():
     """
     Genera un reporte del estado actual del nodo
     """
-    from models import HealthCheck
+    from utils.monitor_salud import monitor
     
     try:
-        nodos = HealthCheck.obtener_nodos_activos()
+        nodos = monitor.nodos_activos()
         estadisticas = calcular_estadisticas_pedidos()
         
         return {
@@ -0,0 +1,300 @@
+"""
+Claves de idempotencia (cabecera Idempotency-Key) para los POST que crean registros.
+
+La primera petición con una clave la reserva en la tabla idempotencia y
+guarda su respuesta; los reintentos con la misma clave reciben esa respuesta
+(con la cabecera Idempotent-Replayed) sin volver a ejecutar el endpoint. Una
+CacheLRU delante responde sin ir a la base los reintentos que llegan al mismo
+proceso. Una respuesta 5xx libera la clave para que el cliente pueda reintentar.
+
+Cuando el endpoint crea algo, la respuesta se guarda en la misma transacción
+que el registro (guardar_respuesta() como al_confirmar de Pedido.crear o
+Cliente.crear): si el COMMIT se hizo la clave ya figura completada aunque el
+proceso caiga justo después, y una reserva en_curso que vence es siempre la
+de una operación que no llegó a confirmarse. Si dos peticiones con la misma
+clave llegan a confirmar (la reserva de la primera venció mientras seguía en
+curso), la segunda se deshace y recibe la respuesta de la primera.
+
+Las claves completadas se replican en la misma transacción para cubrir el
+reintento contra otro nodo tras una conmutación, pero solo una vez que el log
+llegó a ese nodo: un reintento que lo alcanza antes (rezago de la
+replicación, nodo de origen caído) vuelve a ejecutar la operación allí.
+
+Uso (desde la carpeta del backend):
+    python -m utils.idempotencia purgar   borra las claves vencidas
+"""
+import hashlib
+import json
+import sys
+import time
+from functools import wraps
+
+from flask import Response, g, jsonify, make_response, request
+from config import Config
+from database import execute_query, transaccion
+from utils.cache import CacheLRU
+
+CABECERA = 'Idempotency-Key'
+LARGO_MAXIMO = 255
+EN_CURSO = 'en_curso'
+COMPLETADA = 'completada'
+
+AVISO_ENTRE_NODOS = (
+    'La clave solo se reconoce en otros nodos después de replicarse; '
+    'un reintento en otro nodo antes de eso se ejecuta de nuevo'
+)
+
+# (ruta, clave) -> (huella, codigo_http, respuesta), solo de claves completadas
+cache_idempotencia = CacheLRU(Config.IDEMPOTENCIA_CACHE, Config.IDEMPOTENCIA_TTL)
+_proxima_purga = 0.0
+
+
+def _huella():
+    """sha256 del cuerpo; el JSON se normaliza para que el orden de las claves no cuente"""
+    datos = request.get_json(silent=True)
+    if datos is not None:
+        cuerpo = json.dumps(datos, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    else:
+        cuerpo = request.get_data()
+    return hashlib.sha256(cuerpo).hexdigest()
+
+
+def _reservar(ruta, clave, huella):
+    """
+    Reserva la clave para esta petición. Retorna (True, None) si quedó
+    reservada o (False, fila) con la fila de la petición que ya la tiene.
+    """
+    with transaccion() as cursor:
+        # Una reserva de un proceso caído a mitad o una respuesta expirada no bloquean
+        cursor.execute(
+            "DELETE FROM idempotencia WHERE ruta = %s AND clave = %s AND expira < NOW()",
+            (ruta, clave)
+        )
+        cursor.execute("""
+            INSERT IGNORE INTO idempotencia (ruta, clave, huella, estado, nodo, expira)
+            VALUES (%s, %s, %s, %s, %s, DATE_ADD(NOW(), INTERVAL %s SECOND))
+        """, (ruta, clave, huella, EN_CURSO, Config.NODO_ID, Config.IDEMPOTENCIA_BLOQUEO))
+        if cursor.rowcount:
+            return True, None
+        cursor.execute("""
+            SELECT huella, estado, codigo_http, respuesta FROM idempotencia
+            WHERE ruta = %s AND clave = %s
+        """, (ruta, clave))
+        return False, cursor.fetchone()
+
+
+class ClaveCompletada(Exception):
+    """Otra petición con la misma clave ya confirmó la operación"""
+    pass
+
+
+def _bloquear_pendiente(cursor, ruta, clave):
+    """Bloquea la fila de la clave; lanza ClaveCompletada si otra petición ya la completó"""
+    cursor.execute(
+        "SELECT estado FROM idempotencia WHERE ruta = %s AND clave = %s FOR UPDATE",
+        (ruta, clave)
+    )
+    fila = cursor.fetchone()
+    if fila and fila['estado'] == COMPLETADA:
+        raise ClaveCompletada(f'La operación con esta {CABECERA} ya la completó otra petición')
+
+
+def _guardar_completada(cursor, ruta, clave, huella, codigo_http, respuesta):
+    from models import LogReplicacion
+
+    # Inserta si la reserva ya venció y se purgó mientras la petición seguía en curso
+    cursor.execute("""
+        INSERT INTO idempotencia (ruta, clave, huella, estado, codigo_http, respuesta, nodo, expira)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, DATE_ADD(NOW(), INTERVAL %s SECOND))
+        ON DUPLICATE KEY UPDATE estado = VALUES(estado), codigo_http = VALUES(codigo_http),
+            respuesta = VALUES(respuesta), expira = VALUES(expira)
+    """, (ruta, clave, huella, COMPLETADA, codigo_http, respuesta, Config.NODO_ID, Config.IDEMPOTENCIA_TTL))
+    LogReplicacion.registrar('idempotencia', 'INSERT', 0, {
+        'ruta': ruta, 'clave': clave, 'huella': huella, 'codigo_http': codigo_http, 'respuesta': respuesta
+    }, cursor)
+
+
+def guardar_respuesta(codigo_http, cuerpo):
+    """
+    Para el al_confirmar de un modelo: retorna una función (cursor, id_registro)
+    que guarda cuerpo(id_registro) como respuesta de la clave de la petición
+    actual dentro de la transacción del modelo. None si la petición no trae clave.
+    """
+    pendiente = g.get('idempotencia')
+    if pendiente is None:
+        return None
+
+    def al_confirmar(cursor, id_registro):
+        ruta, clave, huella = pendiente
+        try:
+            _bloquear_pendiente(cursor, ruta, clave)
+        except ClaveCompletada:
+            g.idempotencia_repetida = True
+            raise
+        respuesta = json.dumps(cuerpo(id_registro))
+        _guardar_completada(cursor, ruta, clave, huella, codigo_http, respuesta)
+        g.idempotencia_completada = (codigo_http, respuesta)
+    return al_confirmar
+
+
+def _completar(ruta, clave, huella, codigo_http, respuesta):
+    """Guarda la respuesta de un endpoint que no la guardó en su transacción (p. ej. un 4xx)"""
+    with transaccion() as cursor:
+        try:
+            _bloquear_pendiente(cursor, ruta, clave)
+        except ClaveCompletada:
+            return
+        _guardar_completada(cursor, ruta, clave, huella, codigo_http, respuesta)
+    cache_idempotencia.guardar((ruta, clave), (huella, codigo_http, respuesta))
+
+
+def _guardada(ruta, clave):
+    fila = execute_query(
+        "SELECT huella, codigo_http, respuesta FROM idempotencia WHERE ruta = %s AND clave = %s AND estado = %s",
+        (ruta, clave, COMPLETADA), fetch_one=True
+    )
+    return (fila['huella'], fila['codigo_http'], fila['respuesta']) if fila else None
+
+
+def _liberar(ruta, clave):
+    execute_query(
+        "DELETE FROM idempotencia WHERE ruta = %s AND clave = %s AND estado = %s",
+        (ruta, clave, EN_CURSO)
+    )
+
+
+def _repetir(guardada, huella):
+    huella_original, codigo_http, respuesta = guardada
+    if huella_original != huella:
+        return jsonify({
+            'success': False,
+            'error': f'{CABECERA} ya usada con otro cuerpo'
+        }), 422
+    repetida = Response(respuesta, status=codigo_http, mimetype='application/json')
+    repetida.headers['Idempotent-Replayed'] = 'true'
+    return repetida
+
+
+def _purgar_si_toca():
+    """Purga oportunista: como mucho una vez cada IDEMPOTENCIA_PURGA segundos por proceso"""
+    global _proxima_purga
+    ahora = time.monotonic()
+    if ahora < _proxima_purga:
+        return
+    _proxima_purga = ahora + Config.IDEMPOTENCIA_PURGA
+    try:
+        purgar()
+    except Exception as e:
+        print(f"Error purgando claves de idempotencia: {str(e)}")
+
+
+def idempotente(vista):
+    """Decorador de endpoint: si la petición trae Idempotency-Key, la ejecuta una sola vez"""
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        clave = request.headers.get(CABECERA)
+        if not clave:
+            return vista(*args, **kwargs)
+        if len(clave) > LARGO_MAXIMO:
+            return jsonify({
+                'success': False,
+                'error': f'{CABECERA} admite hasta {LARGO_MAXIMO} caracteres'
+            }), 400
+
+        ruta = request.endpoint
+        huella = _huella()
+
+        # Antes de cualquier consulta: un reintento al mismo proceso no toca la base
+        guardada = cache_idempotencia.obtener((ruta, clave))
+        if guardada is not None:
+            return _repetir(guardada, huella)
+
+        try:
+            _purgar_si_toca()
+            reservada, fila = _reservar(ruta, clave, huella)
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+
+        if not reservada:
+            if fila and fila['estado'] == COMPLETADA:
+                guardada = (fila['huella'], fila['codigo_http'], fila['respuesta'])
+                cache_idempotencia.guardar((ruta, clave), guardada)
+                return _repetir(guardada, huella)
+            if fila and fila['huella'] != huella:
+                return jsonify({
+                    'success': False,
+                    'error': f'{CABECERA} ya usada con otro cuerpo'
+                }), 422
+            respuesta = jsonify({
+                'success': False,
+                'error': f'Hay una petición en curso con la misma {CABECERA}',
+                'aviso': AVISO_ENTRE_NODOS
+            })
+            respuesta.status_code = 409
+            respuesta.headers['Retry-After'] = '1'
+            return respuesta
+
+        g.idempotencia = (ruta, clave, huella)
+        try:
+            respuesta = make_response(vista(*args, **kwargs))
+        except Exception:
+            _liberar(ruta, clave)
+            raise
+
+        try:
+            completada = g.pop('idempotencia_completada', None)
+            if g.pop('idempotencia_repetida', False):
+                # Otra petición con la clave confirmó primero: esta se deshizo
+                guardada = _guardada(ruta, clave)
+                if guardada is not None:
+                    cache_idempotencia.guardar((ruta, clave), guardada)
+                    return _repetir(guardada, huella)
+            elif completada is not None and completada[0] == respuesta.status_code:
+                # Guardada en la transacción del registro (si el COMMIT falló, el código es otro)
+                cache_idempotencia.guardar((ruta, clave), (huella,) + completada)
+            elif respuesta.status_code >= 500:
+                _liberar(ruta, clave)
+            else:
+                _completar(ruta, clave, huella, respuesta.status_code, respuesta.get_data(as_text=True))
+        except Exception as e:
+            # Sin operación confirmada: si la reserva queda en_curso, vence sola
+            print(f"Error guardando la clave de idempotencia {clave}: {str(e)}")
+        return respuesta
+    return envoltura
+
+
+def aplicar_replicadas(cursor, logs):
+    """Aplicador de replicación: claves completadas en otro nodo"""
+    cursor.executemany("""
+        INSERT IGNORE INTO idempotencia (ruta, clave, huella, estado, codigo_http, respuesta, nodo, expira)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, DATE_ADD(NOW(), INTERVAL %s SECOND))
+    """, [
+        (
+            log['datos']['ruta'], log['datos']['clave'], log['datos']['huella'], COMPLETADA,
+            log['datos']['codigo_http'], log['datos']['respuesta'], log['nodo_origen'], Config.IDEMPOTENCIA_TTL
+        )
+        for log in logs
+    ])
+
+
+def purgar(lote=1000):
+    """Borra las claves vencidas en lotes de lote filas; retorna cuántas borró"""
+    borradas = 0
+    while True:
+        with transaccion() as cursor:
+            cursor.execute("DELETE FROM idempotencia WHERE expira < NOW() LIMIT %s", (lote,))
+            borradas += cursor.rowcount
+            if cursor.rowcount < lote:
+                return borradas
+
+
+if __name__ == '__main__':
+    comando = sys.argv[1] if len(sys.argv) > 1 else ''
+    if comando == 'purgar':
+        print(f'Claves de idempotencia vencidas borradas: {purgar()}')
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,326 @@
+"""
+Cargas masivas para los endpoints POST /api/{clientes,productos,pedidos}/bulk.
+
+El cuerpo es un arreglo JSON (o {"<entidad>": [...]}) o un CSV con cabecera
+(Content-Type: text/csv). Solo el CSV se lee en streaming: el JSON se carga
+entero en memoria, así que es para cargas chicas (hasta IMPORTACION_JSON_MAX
+bytes) y las grandes deben enviarse en CSV. Las filas se procesan en lotes de
+IMPORTACION_LOTE:
+1. validar: tipos y obligatorios de cada fila, sin tocar la base
+2. comprobar: lo que depende de la base (emails repetidos, clientes y
+   productos existentes), con una query por lote
+3. insertar: el lote entero en una transacción con un INSERT multi-fila y
+   un solo log de replicación
+
+Si la transacción del lote falla (una restricción que la comprobación no vio,
+stock insuficiente) se reintenta fila a fila para aislar las filas con error.
+Una fila con error no detiene la carga: se informa con su número.
+
+CSV de pedidos: una línea por detalle con las columnas referencia, cliente_id,
+direccion_envio, fecha_pedido, estado, id_producto, cantidad y precio_unitario;
+las líneas seguidas con la misma referencia forman un pedido.
+"""
+import codecs
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from flask import jsonify
+from config import Config
+from database import execute_query
+
+
+def leer_filas(request, clave):
+    """Iterador de (número de fila, dict) del cuerpo JSON o CSV"""
+    if request.mimetype == 'text/csv':
+        lineas = codecs.iterdecode(request.stream, request.mimetype_params.get('charset', 'utf-8-sig'))
+        return enumerate(csv.DictReader(lineas), start=1)
+
+    # get_json() carga el cuerpo y el árbol de objetos enteros: se acota antes de leerlo
+    if request.content_length is None or request.content_length > Config.IMPORTACION_JSON_MAX:
+        raise ValueError(
+            f'Un cuerpo JSON debe traer Content-Length y admite hasta {Config.IMPORTACION_JSON_MAX} bytes; '
+            'para cargas mayores usar CSV (Content-Type: text/csv), que se lee en streaming'
+        )
+    datos = request.get_json(silent=True)
+    if isinstance(datos, dict):
+        datos = datos.get(clave)
+    if not isinstance(datos, list):
+        raise ValueError(f'Se esperaba un arreglo JSON (o {{"{clave}": [...]}}) o un CSV con Content-Type text/csv')
+    return enumerate(datos, start=1)
+
+
+def _texto(fila, campo, largo=None, requerido=False):
+    valor = fila.get(campo)
+    if valor is not None and not isinstance(valor, str):
+        valor = str(valor)
+    valor = valor.strip() if valor else None
+    if requerido and not valor:
+        raise ValueError(f'{campo} es obligatorio')
+    if valor and largo and len(valor) > largo:
+        raise ValueError(f'{campo} admite hasta {largo} caracteres')
+    return valor
+
+
+def _entero(fila, campo, defecto=None, minimo=None):
+    valor = fila.get(campo)
+    if valor is None or valor == '':
+        if defecto is None:
+            raise ValueError(f'{campo} es obligatorio')
+        return defecto
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'{campo} debe ser un entero')
+    if numero != float(valor):
+        raise ValueError(f'{campo} debe ser un entero')
+    if minimo is not None and numero < minimo:
+        raise ValueError(f'{campo} debe ser mayor o igual a {minimo}')
+    return numero
+
+
+def _precio(fila, campo, requerido=True):
+    valor = fila.get(campo)
+    if valor is None or valor == '':
+        if requerido:
+            raise ValueError(f'{campo} es obligatorio')
+        return None
+    try:
+        precio = Decimal(str(valor)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f'{campo} debe ser un número')
+    if precio < 0:
+        raise ValueError(f'{campo} debe ser mayor o igual a 0')
+    return precio
+
+
+def validar_cliente(fila):
+    email = _texto(fila, 'email', 100, requerido=True)
+    if '@' not in email:
+        raise ValueError('email no válido')
+    return {
+        'nombre': _texto(fila, 'nombre', 100, requerido=True),
+        'email': email,
+        'telefono': _texto(fila, 'telefono', 20),
+        'direccion': _texto(fila, 'direccion')
+    }
+
+
+def validar_producto(fila):
+    return {
+        'nombre': _texto(fila, 'nombre', 150, requerido=True),
+        'descripcion': _texto(fila, 'descripcion') or '',
+        'precio': _precio(fila, 'precio'),
+        'stock': _entero(fila, 'stock', defecto=0, minimo=0)
+    }
+
+
+def validar_pedido(fila):
+    from models import ESTADOS_PEDIDO
+
+    detalles = fila.get('detalles')
+    if not isinstance(detalles, list) or not detalles:
+        raise ValueError('detalles debe ser una lista no vacía')
+    validados = []
+    for linea, detalle in enumerate(detalles):
+        if not isinstance(detalle, dict):
+            raise ValueError(f'detalles[{linea}] debe ser un objeto')
+        try:
+            precio = _precio(detalle, 'precio_unitario', requerido=False)
+            validados.append({
+                'id_producto': _entero(detalle, 'id_producto'),
+                'cantidad': _entero(detalle, 'cantidad', minimo=1),
+                # Sin precio se toma el del catálogo en comprobar_pedidos
+                'precio_unitario': float(precio) if precio is not None else None
+            })
+        except ValueError as e:
+            raise ValueError(f'detalles[{linea}]: {e}')
+
+    estado = _texto(fila, 'estado') or 'pendiente'
+    if estado not in ESTADOS_PEDIDO:
+        raise ValueError(f"estado no válido. Opciones: {', '.join(ESTADOS_PEDIDO)}")
+    fecha = _texto(fila, 'fecha_pedido')
+    try:
+        fecha = datetime.fromisoformat(fecha).replace(microsecond=0) if fecha else datetime.now().replace(microsecond=0)
+    except ValueError:
+        raise ValueError('fecha_pedido debe tener formato ISO (AAAA-MM-DD[ HH:MM:SS])')
+
+    return {
+        'cliente_id': _entero(fila, 'cliente_id'),
+        'direccion_envio': _texto(fila, 'direccion_envio', requerido=True),
+        'detalles': validados,
+        'fecha_pedido': fecha,
+        'estado': estado
+    }
+
+
+def leer_ajustes(filas):
+    """
+    Ajustes de stock (id_producto, delta) para Producto.ajustar_stock_lote.
+    Se aplican todos o ninguno, así que se validan todos antes: retorna
+    (ajustes, errores) y el llamador no aplica nada si hay errores.
+    """
+    ajustes = []
+    errores = []
+    for numero, fila in filas:
+        if len(ajustes) + len(errores) >= Config.AJUSTES_STOCK_MAX:
+            raise ValueError(f'Se admiten hasta {Config.AJUSTES_STOCK_MAX} ajustes por petición')
+        try:
+            if not isinstance(fila, dict):
+                raise ValueError('Cada fila debe ser un objeto')
+            ajustes.append((_entero(fila, 'id_producto'), _entero(fila, 'delta')))
+        except ValueError as e:
+            if len(errores) < Config.IMPORTACION_MAX_ERRORES:
+                errores.append({'fila': numero, 'error': str(e)})
+    return ajustes, errores
+
+
+def _marcadores(n):
+    return ", ".join(["%s"] * n)
+
+
+def comprobar_clientes(lote):
+    """Emails repetidos en el lote o ya registrados; retorna {índice: error}"""
+    errores = {}
+    vistos = {}
+    for i, (_, cliente) in enumerate(lote):
+        email = cliente['email'].lower()
+        if email in vistos:
+            errores[i] = f"email repetido en la fila {lote[vistos[email]][0]}"
+        else:
+            vistos[email] = i
+    existentes = execute_query(
+        f"SELECT email FROM clientes WHERE email IN ({_marcadores(len(vistos))})",
+        list(vistos), fetch_all=True
+    ) if vistos else []
+    for fila in existentes:
+        i = vistos.get(fila['email'].lower())
+        if i is not None:
+            errores[i] = 'email ya registrado'
+    return errores
+
+
+def comprobar_pedidos(lote):
+    """
+    Clientes y productos inexistentes; completa precio_unitario con el precio
+    del catálogo donde no venga. Retorna {índice: error}.
+    """
+    from models import Producto
+
+    ids_clientes = sorted({pedido['cliente_id'] for _, pedido in lote})
+    clientes = {
+        fila['id_cliente'] for fila in execute_query(
+            f"SELECT id_cliente FROM clientes WHERE id_cliente IN ({_marcadores(len(ids_clientes))})",
+            ids_clientes, fetch_all=True
+        )
+    }
+    productos = Producto.obtener_por_ids([d['id_producto'] for _, pedido in lote for d in pedido['detalles']])
+
+    errores = {}
+    for i, (_, pedido) in enumerate(lote):
+        if pedido['cliente_id'] not in clientes:
+            errores[i] = f"Cliente {pedido['cliente_id']} no encontrado"
+            continue
+        for detalle in pedido['detalles']:
+            producto = productos.get(detalle['id_producto'])
+            if not producto:
+                errores[i] = f"Producto {detalle['id_producto']} no encontrado"
+                break
+            if detalle['precio_unitario'] is None:
+                detalle['precio_unitario'] = float(producto['precio'])
+    return errores
+
+
+def agrupar_lineas_pedido(filas):
+    """CSV de pedidos: agrupa las líneas seguidas con la misma referencia en un pedido"""
+    actual = None
+    for numero, linea in filas:
+        referencia = linea.get('referencia') or f'#{numero}'
+        if actual is None or referencia != actual[1]:
+            if actual is not None:
+                yield actual[0], actual[2]
+            pedido = {campo: linea.get(campo) for campo in ('cliente_id', 'direccion_envio', 'fecha_pedido', 'estado')}
+            pedido['detalles'] = []
+            actual = (numero, referencia, pedido)
+        actual[2]['detalles'].append({
+            campo: linea.get(campo) for campo in ('id_producto', 'cantidad', 'precio_unitario')
+        })
+    if actual is not None:
+        yield actual[0], actual[2]
+
+
+def importar(filas, validar, insertar, comprobar=None, tam_lote=None, incluir_ids=False):
+    """
+    Procesa filas (iterable de (número, dict)) por lotes de tam_lote.
+    validar(dict) -> valores o ValueError; comprobar([(número, valores)]) -> {índice: error};
+    insertar([valores]) -> ids, en una transacción.
+    Retorna {'recibidas', 'insertadas', 'errores', 'total_errores'}, más 'ids'
+    solo con incluir_ids (en cargas grandes la lista ocuparía memoria sin que nadie la pida).
+    """
+    tam_lote = tam_lote or Config.IMPORTACION_LOTE
+    resumen = {'recibidas': 0, 'insertadas': 0, 'errores': [], 'total_errores': 0}
+    if incluir_ids:
+        resumen['ids'] = []
+
+    def error(numero, mensaje):
+        resumen['total_errores'] += 1
+        if len(resumen['errores']) < Config.IMPORTACION_MAX_ERRORES:
+            resumen['errores'].append({'fila': numero, 'error': mensaje})
+
+    filas = iter(filas)
+    while True:
+        crudas = list(islice(filas, tam_lote))
+        if not crudas:
+            break
+        resumen['recibidas'] += len(crudas)
+
+        lote = []
+        for numero, fila in crudas:
+            if not isinstance(fila, dict):
+                error(numero, 'Cada fila debe ser un objeto')
+                continue
+            try:
+                lote.append((numero, validar(fila)))
+            except ValueError as e:
+                error(numero, str(e))
+
+        if lote and comprobar is not None:
+            errores = comprobar(lote)
+            for i in sorted(errores):
+                error(lote[i][0], errores[i])
+            lote = [item for i, item in enumerate(lote) if i not in errores]
+        if not lote:
+            continue
+
+        try:
+            ids = insertar([valores for _, valores in lote])
+        except Exception:
+            # Fila a fila para saber cuáles fallan; las demás se insertan igual
+            ids = []
+            for numero, valores in lote:
+                try:
+                    ids.extend(insertar([valores]))
+                except Exception as e:
+                    error(numero, str(e))
+        resumen['insertadas'] += len(ids)
+        if incluir_ids:
+            resumen['ids'].extend(ids)
+
+    resumen['errores'].sort(key=lambda e: e['fila'])
+    return resumen
+
+
+def responder(resumen):
+    """201 si se insertó todo, 207 si hubo filas con error y 400 si no se insertó ninguna"""
+    if not resumen['total_errores']:
+        codigo = 201
+    elif resumen['insertadas']:
+        codigo = 207
+    else:
+        codigo = 400
+    return jsonify(dict(
+        {'success': codigo != 400},
+        **resumen,
+        truncado=resumen['total_errores'] > len(resumen['errores'])
+    )), codigo
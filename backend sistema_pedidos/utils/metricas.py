@@ -0,0 +1,326 @@
+"""
+Métricas del nodo en memoria, expuestas en formato de texto de Prometheus.
+
+- Latencia de cada petición HTTP por ruta (la plantilla, p. ej. /api/pedidos/<int:pedido_id>),
+  método y código de estado, y cantidad de queries por petición.
+- Duración y cantidad de cada plantilla de query SQL, vía los observadores de database.
+- Duración de cada envío de replicación por nodo réplica.
+
+Cada proceso lleva sus valores. Con METRICAS_DIRECTORIO (gunicorn.conf.py lo
+fija para sus workers) cada worker publica su instantánea en ese directorio y
+/api/metrics suma las de todos, responda el worker que responda.
+"""
+import glob
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+
+from flask import request
+
+from config import Config
+from database import agregar_observador
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_SQL = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+# Plantillas de query distintas que se siguen por separado; el resto va a 'otras'
+MAX_PLANTILLAS = 500
+
+DESCRIPCIONES = {
+    'http_peticion_segundos': 'Duración de las peticiones HTTP',
+    'http_consultas_por_peticion': 'Queries SQL ejecutadas por petición',
+    'sql_consulta_segundos': 'Duración de las queries SQL por plantilla',
+    'replicacion_envio_segundos': 'Duración de cada envío de replicación por nodo',
+    'replicacion_envios_total': 'Envíos de replicación por nodo y resultado',
+    'replicacion_logs_enviados_total': 'Logs confirmados por cada nodo réplica',
+}
+
+
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class RegistroMetricas:
+    """Histogramas y contadores por (nombre, etiquetas), protegidos por un solo lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}  # (nombre, etiquetas) -> Histograma
+        self._contadores = {}  # (nombre, etiquetas) -> valor
+        self._series = {}  # nombre -> cantidad de histogramas con ese nombre
+
+    def observar(self, nombre, etiquetas, valor, buckets=BUCKETS_HTTP, limite=None, desborde=None):
+        """
+        Suma valor al histograma (nombre, etiquetas). Con limite, cuando ya hay
+        limite series de ese nombre las etiquetas nuevas se cambian por desborde.
+        """
+        with self._lock:
+            histograma = self._histogramas.get((nombre, etiquetas))
+            if histograma is None:
+                if limite is not None and self._series.get(nombre, 0) >= limite:
+                    etiquetas = desborde
+                    histograma = self._histogramas.get((nombre, etiquetas))
+                if histograma is None:
+                    histograma = self._histogramas[(nombre, etiquetas)] = Histograma(buckets)
+                    self._series[nombre] = self._series.get(nombre, 0) + 1
+            histograma.observar(valor)
+
+    def incrementar(self, nombre, etiquetas, cantidad=1):
+        clave = (nombre, etiquetas)
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + cantidad
+
+    def instantanea(self):
+        """Copia de los valores para exportarlos sin retener el lock"""
+        with self._lock:
+            histogramas = {
+                clave: (h.buckets, list(h.conteos), h.suma, h.total)
+                for clave, h in self._histogramas.items()
+            }
+            return histogramas, dict(self._contadores)
+
+    def limpiar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+            self._series.clear()
+
+
+def _a_json(histogramas, contadores):
+    return {
+        'histogramas': [
+            [nombre, etiquetas, buckets, conteos, suma, total]
+            for (nombre, etiquetas), (buckets, conteos, suma, total) in histogramas.items()
+        ],
+        'contadores': [[nombre, etiquetas, valor] for (nombre, etiquetas), valor in contadores.items()]
+    }
+
+
+def _desde_json(datos):
+    def clave(nombre, etiquetas):
+        return nombre, tuple(tuple(par) for par in etiquetas)
+
+    histogramas = {
+        clave(nombre, etiquetas): (tuple(buckets), conteos, suma, total)
+        for nombre, etiquetas, buckets, conteos, suma, total in datos['histogramas']
+    }
+    contadores = {clave(nombre, etiquetas): valor for nombre, etiquetas, valor in datos['contadores']}
+    return histogramas, contadores
+
+
+def _combinar(histogramas, contadores, otros_histogramas, otros_contadores):
+    """Suma a histogramas / contadores (de instantanea()) los de otro proceso"""
+    for clave, (buckets, conteos, suma, total) in otros_histogramas.items():
+        propio = histogramas.get(clave)
+        if propio is None:
+            histogramas[clave] = (buckets, list(conteos), suma, total)
+        elif propio[0] == buckets:
+            histogramas[clave] = (
+                buckets, [a + b for a, b in zip(propio[1], conteos)], propio[2] + suma, propio[3] + total
+            )
+    for clave, valor in otros_contadores.items():
+        contadores[clave] = contadores.get(clave, 0) + valor
+
+
+class PublicadorMetricas:
+    """
+    Publica cada intervalo segundos la instantánea del proceso en
+    directorio/metricas-<pid>.json para que los otros workers la sumen.
+    Los archivos de workers que ya terminaron se conservan (sus contadores no
+    deben retroceder); el master de gunicorn vacía el directorio al arrancar.
+    """
+
+    def __init__(self, registro, intervalo):
+        self.registro = registro
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+
+    def _archivo(self, pid):
+        return os.path.join(Config.METRICAS_DIRECTORIO, f'metricas-{pid}.json')
+
+    def asegurar(self):
+        # Tras un fork el hilo del padre no existe en el hijo: se crea uno nuevo
+        if not Config.METRICAS_DIRECTORIO or (self._hilo is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._ejecutar, name='publicador-metricas', daemon=True)
+            self._hilo.start()
+
+    def _ejecutar(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.publicar()
+            except Exception as e:
+                print(f"No se pudieron publicar las métricas: {e}")
+
+    def publicar(self):
+        """Escribe la instantánea del proceso (reemplazo atómico del archivo)"""
+        if not Config.METRICAS_DIRECTORIO:
+            return
+        os.makedirs(Config.METRICAS_DIRECTORIO, exist_ok=True)
+        archivo = self._archivo(os.getpid())
+        temporal = f'{archivo}.tmp'
+        with open(temporal, 'w') as salida:
+            json.dump(_a_json(*self.registro.instantanea()), salida)
+        os.replace(temporal, archivo)
+
+    def otros_procesos(self):
+        """Instantáneas publicadas por los demás procesos: [(histogramas, contadores)]"""
+        if not Config.METRICAS_DIRECTORIO:
+            return []
+        propio = self._archivo(os.getpid())
+        instantaneas = []
+        for archivo in glob.glob(self._archivo('*')):
+            if archivo == propio:
+                continue
+            try:
+                with open(archivo) as entrada:
+                    instantaneas.append(_desde_json(json.load(entrada)))
+            except (OSError, ValueError) as e:
+                print(f"Métricas ilegibles en {archivo}: {e}")
+        return instantaneas
+
+
+registro = RegistroMetricas()
+publicador = PublicadorMetricas(registro, Config.METRICAS_PUBLICAR)
+_local = threading.local()
+
+
+@lru_cache(maxsize=2048)
+def plantilla_sql(query):
+    """Normaliza una query para agruparla: espacios, listas IN (...) y filas VALUES"""
+    texto = ' '.join(query.split())
+    texto = re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', texto, flags=re.IGNORECASE)
+    texto = re.sub(r'(?:\s*WHEN %s THEN %s)+', ' WHEN ... THEN ...', texto)
+    return texto[:200]
+
+
+def _observar_query(query, params, duracion):
+    if hasattr(_local, 'consultas'):
+        _local.consultas += 1
+    registro.observar(
+        'sql_consulta_segundos', (('consulta', plantilla_sql(query)),), duracion, BUCKETS_SQL,
+        limite=MAX_PLANTILLAS, desborde=(('consulta', 'otras'),)
+    )
+
+
+def observar_replicacion(nodo_url, duracion, exito, logs=0):
+    """Registra un envío HTTP de replicación a nodo_url"""
+    publicador.asegurar()
+    registro.observar('replicacion_envio_segundos', (('nodo', nodo_url),), duracion)
+    registro.incrementar('replicacion_envios_total', (('nodo', nodo_url), ('resultado', 'ok' if exito else 'error')))
+    if exito and logs:
+        registro.incrementar('replicacion_logs_enviados_total', (('nodo', nodo_url),), logs)
+
+
+def instalar(app):
+    """Registra los hooks de Flask y el observador de queries"""
+    if not Config.METRICAS_HABILITADAS:
+        return
+
+    agregar_observador(_observar_query)
+
+    @app.before_request
+    def _iniciar_medicion():
+        publicador.asegurar()
+        _local.inicio = time.perf_counter()
+        _local.consultas = 0
+
+    @app.after_request
+    def _registrar_medicion(response):
+        inicio = getattr(_local, 'inicio', None)
+        if inicio is None:
+            return response
+        duracion = time.perf_counter() - inicio
+        ruta = request.url_rule.rule if request.url_rule is not None else 'sin_ruta'
+        registro.observar('http_peticion_segundos', (
+            ('ruta', ruta), ('metodo', request.method), ('estado', str(response.status_code))
+        ), duracion)
+        registro.observar('http_consultas_por_peticion', (('ruta', ruta),), _local.consultas, BUCKETS_CONSULTAS)
+        del _local.inicio
+        del _local.consultas
+        return response
+
+
+def _etiquetas(etiquetas, extra=()):
+    pares = tuple(etiquetas) + tuple(extra)
+    if not pares:
+        return ''
+    valores = []
+    for nombre, valor in pares:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        valores.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(valores) + '}'
+
+
+def _numero(valor):
+    if isinstance(valor, bool):
+        return '1' if valor else '0'
+    if isinstance(valor, float):
+        return repr(valor)
+    return str(valor)
+
+
+def exportar(medidores=()):
+    """
+    Texto en formato de exposición de Prometheus con todas las métricas,
+    sumadas las que publicaron los otros workers.
+    medidores: [(nombre, descripcion, [(etiquetas, valor)])] con valores
+    instantáneos (pool, cache, colas) que se leen en el momento.
+    """
+    histogramas, contadores = registro.instantanea()
+    for otros_histogramas, otros_contadores in publicador.otros_procesos():
+        _combinar(histogramas, contadores, otros_histogramas, otros_contadores)
+    lineas = []
+
+    por_nombre = {}
+    for (nombre, etiquetas), valor in histogramas.items():
+        por_nombre.setdefault(nombre, []).append((etiquetas, valor))
+    for nombre in sorted(por_nombre):
+        lineas.append(f'# HELP {nombre} {DESCRIPCIONES.get(nombre, nombre)}')
+        lineas.append(f'# TYPE {nombre} histogram')
+        for etiquetas, (buckets, conteos, suma, total) in sorted(por_nombre[nombre]):
+            acumulado = 0
+            for limite, conteo in zip(buckets, conteos):
+                acumulado += conteo
+                lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas, (("le", limite),))} {acumulado}')
+            lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas, (("le", "+Inf"),))} {total}')
+            lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(suma)}')
+            lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {total}')
+
+    por_nombre = {}
+    for (nombre, etiquetas), valor in contadores.items():
+        por_nombre.setdefault(nombre, []).append((etiquetas, valor))
+    for nombre in sorted(por_nombre):
+        lineas.append(f'# HELP {nombre} {DESCRIPCIONES.get(nombre, nombre)}')
+        lineas.append(f'# TYPE {nombre} counter')
+        for etiquetas, valor in sorted(por_nombre[nombre]):
+            lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+
+    for nombre, descripcion, valores in medidores:
+        lineas.append(f'# HELP {nombre} {descripcion}')
+        lineas.append(f'# TYPE {nombre} gauge')
+        for etiquetas, valor in valores:
+            lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,313 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: el nodo corre en un solo proceso (python app.py)
+    fcntl = None
+
+from config import Config
+from utils.cliente_nodos import cliente_nodos
+
+ACTIVO = 'activo'
+SOSPECHOSO = 'sospechoso'
+INACTIVO = 'inactivo'
+DESCONOCIDO = 'desconocido'
+
+# Factor de suavizado de la latencia media (EWMA)
+ALFA_LATENCIA = 0.3
+
+# Compartidos por los workers de gunicorn del mismo nodo
+RUTA_BASE = os.path.join(tempfile.gettempdir(), f'sistema_pedidos-{Config.NODO_ID}-{Config.NODO_PORT}')
+RUTA_LOCK = f'{RUTA_BASE}-monitor.lock'
+RUTA_VISTA = f'{RUTA_BASE}-monitor.json'
+
+
+class _EstadoNodo:
+    def __init__(self, url):
+        self.url = url
+        self.nodo = None  # NODO_ID que reporta el propio nodo en /ping
+        self.estado = DESCONOCIDO
+        self.fallos_consecutivos = 0
+        self.latencia_ms = None  # EWMA
+        self.ultima_respuesta = None  # datetime del último ping correcto
+        self.ultimo_cambio = None
+        self.ultimo_error = None
+        self.persistido = None  # último estado escrito en health_check
+
+    def como_dict(self):
+        return {
+            'url': self.url,
+            'nodo': self.nodo or 'desconocido',
+            'estado': self.estado,
+            'fallos_consecutivos': self.fallos_consecutivos,
+            'latencia_ms': round(self.latencia_ms, 3) if self.latencia_ms is not None else None,
+            'ultima_respuesta': self.ultima_respuesta.isoformat(sep=' ', timespec='seconds') if self.ultima_respuesta else None,
+            'ultimo_cambio': self.ultimo_cambio.isoformat(sep=' ', timespec='seconds') if self.ultimo_cambio else None,
+            'error': self.ultimo_error
+        }
+
+
+class MonitorSalud:
+    """
+    Heartbeat en segundo plano contra los nodos réplica.
+
+    Cada intervalo segundos hace ping a todos los nodos en paralelo y mantiene
+    en memoria la tabla de miembros del cluster. Detección de fallos por
+    heartbeats perdidos: un ping fallido deja al nodo 'sospechoso' y
+    fallos_caida seguidos lo marcan 'inactivo'; un ping correcto lo vuelve
+    'activo'.
+
+    Con varios workers de gunicorn solo uno hace los pings: el que tiene el
+    lock de RUTA_LOCK (los demás esperan en él y uno lo toma si el líder
+    muere). El líder publica la vista en RUTA_VISTA tras cada ronda y los
+    demás workers la leen de ahí. En health_check escribe solo las réplicas
+    que pasaron a activo o inactivo, y cada refresco rondas reescribe este
+    nodo y las réplicas activas, así ultima_verificacion solo envejece si el
+    nodo deja de monitorear.
+    """
+
+    def __init__(self, intervalo, timeout, fallos_caida, refresco):
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self.fallos_caida = max(fallos_caida, 1)
+        self.refresco = max(refresco, 1)
+        self._lock = threading.Lock()
+        self._nodos = {}
+        self._hilo = None
+        self._pid = None
+        self._ciclo = threading.Event()  # se marca tras cada ronda de pings
+        self._archivo_lock = None
+        self._publicada = (None, None)  # (mtime, vista) leída de RUTA_VISTA
+        self.lider = False
+        self.rondas = 0
+        self.cambios = 0
+
+    def iniciar(self):
+        # Tras un fork el hilo del padre no existe en el hijo: se crea uno nuevo
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._nodos = {url: _EstadoNodo(url) for url in Config.NODOS_REPLICAS}
+            self._ciclo = threading.Event()
+            self.lider = False
+            self._hilo = threading.Thread(target=self._ejecutar, name='monitor-salud', daemon=True)
+            self._hilo.start()
+
+    def _tomar_liderazgo(self):
+        """Bloquea hasta que este proceso sea el único monitor del nodo"""
+        if fcntl is None:
+            return
+        self._archivo_lock = open(RUTA_LOCK, 'a')
+        fcntl.flock(self._archivo_lock, fcntl.LOCK_EX)
+
+    def _ejecutar(self):
+        try:
+            self._tomar_liderazgo()
+        except OSError as e:
+            print(f"Monitor de salud: no se pudo tomar {RUTA_LOCK}, se monitorea desde este proceso: {str(e)}")
+        self.lider = True
+
+        with ThreadPoolExecutor(max_workers=max(len(self._nodos), 1), thread_name_prefix='heartbeat') as ejecutor:
+            urls = list(self._nodos)
+            while True:
+                inicio = time.monotonic()
+                for url, resultado in zip(urls, ejecutor.map(self._sondear, urls)):
+                    self._registrar(url, *resultado)
+                self._guardar_ronda()
+                self._publicar()
+                self.rondas += 1
+                self._ciclo.set()
+                time.sleep(max(0, self.intervalo - (time.monotonic() - inicio)))
+
+    def _sondear(self, url):
+        """Retorna (ok, latencia_ms, nodo, error)"""
+        inicio = time.perf_counter()
+        try:
+            # Sin reintentos ni circuit breaker: el heartbeat es el detector independiente
+            response = cliente_nodos.get(
+                url, '/api/health/ping', reintentos=0, usar_circuito=False, timeout=self.timeout
+            )
+            latencia = (time.perf_counter() - inicio) * 1000
+            if response.status_code != 200:
+                return False, latencia, None, f'HTTP {response.status_code}'
+            datos = response.json()
+            error = None
+            if datos.get('secuencia_ids') == [Config.DB_AUTO_INCREMENT_INCREMENT, Config.DB_AUTO_INCREMENT_OFFSET]:
+                # Responde, pero la replicación con él chocaría en los ids
+                error = 'misma secuencia de ids que este nodo (DB_AUTO_INCREMENT_OFFSET)'
+            return True, latencia, datos.get('nodo'), error
+        except Exception as e:
+            return False, None, None, str(e)
+
+    def _registrar(self, url, ok, latencia_ms, nodo, error):
+        """Actualiza el estado de url con el resultado del ping"""
+        ahora = datetime.now()
+        with self._lock:
+            estado = self._nodos[url]
+            anterior = estado.estado
+            if ok:
+                if error and error != estado.ultimo_error:
+                    print(f"Monitor de salud: {url} tiene la {error}")
+                estado.fallos_consecutivos = 0
+                estado.ultima_respuesta = ahora
+                estado.ultimo_error = error
+                estado.nodo = nodo or estado.nodo
+                estado.latencia_ms = latencia_ms if estado.latencia_ms is None else (
+                    ALFA_LATENCIA * latencia_ms + (1 - ALFA_LATENCIA) * estado.latencia_ms
+                )
+                estado.estado = ACTIVO
+            else:
+                estado.fallos_consecutivos += 1
+                estado.ultimo_error = error
+                # Un nodo que nunca respondió o ya estaba caído no pasa por sospechoso
+                if estado.fallos_consecutivos >= self.fallos_caida or anterior in (INACTIVO, DESCONOCIDO):
+                    estado.estado = INACTIVO
+                else:
+                    estado.estado = SOSPECHOSO
+            if estado.estado != anterior:
+                estado.ultimo_cambio = ahora
+
+    def _guardar_ronda(self):
+        """
+        Escribe en health_check las réplicas cuyo estado (activo o inactivo)
+        difiere del último guardado. Cada refresco rondas escribe además este
+        nodo y las réplicas activas para renovar su ultima_verificacion.
+        """
+        from models import HealthCheck
+
+        refrescar = self.rondas % self.refresco == 0
+        with self._lock:
+            pendientes = {
+                url: estado.estado for url, estado in self._nodos.items()
+                if estado.estado in (ACTIVO, INACTIVO)
+                and (estado.estado != estado.persistido or (refrescar and estado.estado == ACTIVO))
+            }
+            estados = [(self._nodos[url].nodo or url, valor) for url, valor in pendientes.items()]
+        if refrescar:
+            estados.append((Config.NODO_ID, ACTIVO))
+        if not estados:
+            return
+        try:
+            HealthCheck.actualizar_estados(estados)
+        except Exception as e:
+            # Los cambios quedan pendientes y se reintentan en la ronda siguiente
+            print(f"Monitor de salud: no se pudo guardar el estado de los nodos: {str(e)}")
+            return
+        with self._lock:
+            for url, valor in pendientes.items():
+                if self._nodos[url].persistido != valor:
+                    self._nodos[url].persistido = valor
+                    self.cambios += 1
+
+    def _publicar(self):
+        """Deja la vista en RUTA_VISTA para los demás workers (reemplazo atómico)"""
+        try:
+            temporal = f'{RUTA_VISTA}.{os.getpid()}.tmp'
+            with open(temporal, 'w') as salida:
+                json.dump(self._vista_propia(), salida)
+            os.replace(temporal, RUTA_VISTA)
+        except OSError as e:
+            print(f"Monitor de salud: no se pudo publicar la vista: {str(e)}")
+
+    def _vista_propia(self):
+        with self._lock:
+            return [estado.como_dict() for estado in self._nodos.values()]
+
+    def _vista_publicada(self):
+        """Vista del líder; None si no hay una o es de hace más de fallos_caida rondas"""
+        try:
+            mtime = os.path.getmtime(RUTA_VISTA)
+        except OSError:
+            return None
+        if time.time() - mtime > self.intervalo * (self.fallos_caida + 1):
+            return None
+        publicada_mtime, vista = self._publicada
+        if mtime != publicada_mtime:
+            try:
+                with open(RUTA_VISTA) as entrada:
+                    vista = json.load(entrada)
+            except (OSError, ValueError):
+                return vista
+            self._publicada = (mtime, vista)
+        return vista
+
+    def esperar_ronda(self, timeout=None):
+        """Espera a que termine la primera ronda de pings (útil al arrancar)"""
+        self.iniciar()
+        limite = None if timeout is None else time.monotonic() + timeout
+        while not self._ciclo.is_set() and self._vista_publicada() is None:
+            if limite is not None and time.monotonic() >= limite:
+                return False
+            self._ciclo.wait(0.1)
+        return True
+
+    def vista(self):
+        """Estado de cada nodo réplica, de memoria o publicado por el worker líder"""
+        self.iniciar()
+        if self.lider:
+            return self._vista_propia()
+        return self._vista_publicada() or [
+            {'url': url, 'nodo': 'desconocido', 'estado': DESCONOCIDO} for url in Config.NODOS_REPLICAS
+        ]
+
+    def estado(self, url):
+        for nodo in self.vista():
+            if nodo['url'] == url:
+                return nodo['estado']
+        return DESCONOCIDO
+
+    def latencia(self, url):
+        """Latencia media del ping en ms (None si nunca respondió)"""
+        for nodo in self.vista():
+            if nodo['url'] == url:
+                return nodo.get('latencia_ms')
+        return None
+
+    def urls_activas(self):
+        return [nodo['url'] for nodo in self.vista() if nodo['estado'] == ACTIVO]
+
+    def nodos_activos(self):
+        """Este nodo y las réplicas activas, con la forma de las filas de health_check"""
+        activos = [{
+            'nodo': Config.NODO_ID,
+            'url': None,
+            'estado': ACTIVO,
+            'ultima_verificacion': datetime.now().isoformat(sep=' ', timespec='seconds')
+        }]
+        for nodo in self.vista():
+            if nodo['estado'] == ACTIVO:
+                activos.append({
+                    'nodo': nodo['nodo'],
+                    'url': nodo['url'],
+                    'estado': ACTIVO,
+                    'ultima_verificacion': nodo['ultima_respuesta']
+                })
+        return activos
+
+    def estadisticas(self):
+        return {
+            'intervalo': self.intervalo,
+            'timeout': self.timeout,
+            'fallos_caida': self.fallos_caida,
+            'refresco': self.refresco,
+            'lider': self.lider,
+            'rondas': self.rondas,
+            'cambios_persistidos': self.cambios
+        }
+
+
+monitor = MonitorSalud(
+    Config.HEALTH_CHECK_INTERVAL,
+    Config.HEALTH_CHECK_TIMEOUT,
+    Config.HEALTH_CHECK_FALLOS,
+    Config.HEALTH_CHECK_REFRESCO
+)
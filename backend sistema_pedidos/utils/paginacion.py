@@ -0,0 +1,84 @@
+from datetime import datetime
+
+from config import Config
+from database import execute_query
+
+
+def leer_parametros(args, campos_validos):
+    """
+    Lee limit, after y fields de los query params.
+    Retorna (limit, after, campos); lanza ValueError si algún valor no es válido.
+    - after: cursor '<valor>,<id>' devuelto como next_cursor en la página anterior.
+    - fields: columnas separadas por comas, dentro de campos_validos.
+    """
+    limit = args.get('limit', Config.PAGINA_LIMITE, type=int)
+    limit = max(1, min(limit, Config.PAGINA_LIMITE_MAX))
+
+    after = args.get('after')
+    if after:
+        valor, separador, ultimo_id = after.rpartition(',')
+        if not separador or not ultimo_id.isdigit():
+            raise ValueError('Cursor "after" no válido; se espera <valor>,<id>')
+        after = (valor, int(ultimo_id))
+
+    campos = None
+    if args.get('fields'):
+        campos = [c.strip() for c in args['fields'].split(',') if c.strip()]
+        invalidos = [c for c in campos if c not in campos_validos]
+        if invalidos:
+            raise ValueError(f'Campos no válidos: {", ".join(invalidos)}')
+
+    return limit, after, campos
+
+
+def codificar_cursor(valor, ultimo_id):
+    if isinstance(valor, datetime):
+        valor = valor.strftime('%Y-%m-%d %H:%M:%S.%f' if valor.microsecond else '%Y-%m-%d %H:%M:%S')
+    return f'{valor},{ultimo_id}'
+
+
+def consultar_pagina(columnas, desde, orden, id_col, limit, after=None,
+                     where=None, params=None, descendente=True):
+    """
+    Ejecuta una consulta paginada por keyset (sin OFFSET).
+
+    columnas: lista de expresiones del SELECT; debe incluir orden e id_col.
+    orden / id_col: (expresión SQL, clave en la fila) de la columna de orden y
+    del id que desempata. Retorna (filas, next_cursor); next_cursor es None en
+    la última página.
+    """
+    condiciones = list(where or [])
+    params = list(params or [])
+    comparador = '<' if descendente else '>'
+    direccion = 'DESC' if descendente else 'ASC'
+
+    if after:
+        valor, ultimo_id = after
+        condiciones.append(
+            f"({orden[0]} {comparador} %s OR ({orden[0]} = %s AND {id_col[0]} {comparador} %s))"
+        )
+        params.extend((valor, valor, ultimo_id))
+
+    query = f"SELECT {', '.join(columnas)} FROM {desde}"
+    if condiciones:
+        query += " WHERE " + " AND ".join(condiciones)
+    query += f" ORDER BY {orden[0]} {direccion}, {id_col[0]} {direccion} LIMIT %s"
+    params.append(limit + 1)
+
+    filas = execute_query(query, params, fetch_all=True)
+    if len(filas) <= limit:
+        return filas, None
+
+    filas = filas[:limit]
+    ultima = filas[-1]
+    return filas, codificar_cursor(ultima[orden[1]], ultima[id_col[1]])
+
+
+def proyectar(campos, expresiones, obligatorios):
+    """
+    Columnas del SELECT para los campos pedidos (todos si campos es None).
+    expresiones: {campo: expresión SQL}. Los obligatorios (orden y desempate
+    del cursor) se incluyen siempre.
+    """
+    elegidos = list(obligatorios) + [c for c in (campos or expresiones) if c not in obligatorios]
+    return [expresiones[c] for c in elegidos]
@@ -0,0 +1,135 @@
+"""
+Perfilador de queries por petición (modo depuración, PERFILADOR_HABILITADO=true).
+
+Guarda cada sentencia SQL ejecutada durante una petición con su duración y
+marca dos patrones:
+- n+1: la misma plantilla de query repetida PERFILADOR_REPETICIONES veces o más.
+- lenta: una sentencia que tarda PERFILADOR_LENTA_MS milisegundos o más.
+
+El resumen va en las cabeceras X-Perfil-* de la respuesta y el detalle en un
+buffer circular de las últimas PERFILADOR_HISTORIAL peticiones (/api/debug/consultas).
+"""
+import itertools
+import threading
+import time
+from collections import deque
+
+from flask import request
+
+from config import Config
+from database import agregar_observador
+from utils.metricas import plantilla_sql
+
+_local = threading.local()
+_historial = deque(maxlen=Config.PERFILADOR_HISTORIAL)
+_historial_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+def _observar(query, params, duracion):
+    consultas = getattr(_local, 'consultas', None)
+    if consultas is None:
+        return
+    consultas.append({
+        'plantilla': plantilla_sql(query),
+        'parametros': repr(params)[:200] if params is not None else None,
+        'inicio_ms': round((time.perf_counter() - _local.inicio - duracion) * 1000, 3),
+        'duracion_ms': round(duracion * 1000, 3)
+    })
+
+
+def analizar(consultas):
+    """Retorna la lista de alertas (n+1 y lentas) de las consultas de una petición"""
+    alertas = []
+
+    por_plantilla = {}
+    for consulta in consultas:
+        por_plantilla.setdefault(consulta['plantilla'], []).append(consulta['duracion_ms'])
+    for plantilla, duraciones in por_plantilla.items():
+        if len(duraciones) >= Config.PERFILADOR_REPETICIONES:
+            alertas.append({
+                'tipo': 'n+1',
+                'plantilla': plantilla,
+                'repeticiones': len(duraciones),
+                'tiempo_total_ms': round(sum(duraciones), 3)
+            })
+
+    for consulta in consultas:
+        if consulta['duracion_ms'] >= Config.PERFILADOR_LENTA_MS:
+            alertas.append({
+                'tipo': 'lenta',
+                'plantilla': consulta['plantilla'],
+                'duracion_ms': consulta['duracion_ms']
+            })
+    return alertas
+
+
+def historial(solo_alertas=False, limit=None):
+    """Peticiones perfiladas, las más recientes primero"""
+    with _historial_lock:
+        entradas = list(_historial)
+    entradas.reverse()
+    if solo_alertas:
+        entradas = [e for e in entradas if e['alertas']]
+    return entradas[:limit] if limit else entradas
+
+
+def obtener(id_perfil):
+    with _historial_lock:
+        return next((e for e in _historial if e['id'] == id_perfil), None)
+
+
+def limpiar():
+    with _historial_lock:
+        _historial.clear()
+
+
+def instalar(app):
+    """
+    Registra los hooks de Flask, el observador de queries y /api/debug si el
+    perfilador está habilitado. Deshabilitado no se expone /api/debug: el
+    historial guarda los parámetros de las queries (datos de clientes).
+    """
+    if not Config.PERFILADOR_HABILITADO:
+        return
+
+    from routes.debug import debug_bp
+    app.register_blueprint(debug_bp, url_prefix='/api/debug')
+    agregar_observador(_observar)
+
+    @app.before_request
+    def _iniciar_perfil():
+        _local.inicio = time.perf_counter()
+        _local.consultas = []
+
+    @app.after_request
+    def _cerrar_perfil(response):
+        consultas = getattr(_local, 'consultas', None)
+        if consultas is None:
+            return response
+        _local.consultas = None
+        duracion_ms = round((time.perf_counter() - _local.inicio) * 1000, 3)
+
+        alertas = analizar(consultas)
+        entrada = {
+            'id': next(_ids),
+            'metodo': request.method,
+            'ruta': request.full_path.rstrip('?'),
+            'estado': response.status_code,
+            'duracion_ms': duracion_ms,
+            'total_consultas': len(consultas),
+            'tiempo_sql_ms': round(sum(c['duracion_ms'] for c in consultas), 3),
+            'alertas': alertas,
+            'consultas': consultas
+        }
+        with _historial_lock:
+            _historial.append(entrada)
+
+        response.headers['X-Perfil-Id'] = str(entrada['id'])
+        response.headers['X-Perfil-Consultas'] = f"{entrada['total_consultas']}; sql={entrada['tiempo_sql_ms']}ms"
+        if alertas:
+            n_mas_1 = sum(1 for a in alertas if a['tipo'] == 'n+1')
+            lentas = len(alertas) - n_mas_1
+            response.headers['X-Perfil-Alertas'] = f'n+1={n_mas_1}; lentas={lentas}'
+            print(f"Perfilador: {request.method} {entrada['ruta']} con {n_mas_1} n+1 y {lentas} lentas (perfil {entrada['id']})")
+        return response
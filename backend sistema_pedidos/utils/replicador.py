@@ -0,0 +1,140 @@
+import time
+from concurrent.futures import wait
+
+from config import Config
+from utils.cliente_nodos import cliente_nodos
+from utils.formato_replicacion import TIPO_COMPACTO, codificar
+from utils.metricas import observar_replicacion
+
+# Nodos que respondieron 415 al formato compacto: se les envía JSON
+_nodos_solo_json = set()
+
+
+def _serializable(log):
+    """Copia del log apta para JSON (fecha_operacion llega como datetime)"""
+    log = dict(log)
+    if hasattr(log.get('fecha_operacion'), 'isoformat'):
+        log['fecha_operacion'] = log['fecha_operacion'].isoformat()
+    return log
+
+
+def _enviar_lote(nodo_url, logs):
+    """
+    Envía un lote en formato compacto si el nodo lo acepta; si responde 415
+    (versión sin soporte) se reintenta en JSON y se recuerda para ese nodo.
+    Aplicar un lote es idempotente, así que cliente_nodos puede reintentarlo.
+    """
+    ruta = '/api/replicacion/sincronizar'
+
+    if Config.REPLICATION_FORMATO == 'compacto' and nodo_url not in _nodos_solo_json:
+        response = cliente_nodos.post(
+            nodo_url,
+            ruta,
+            data=codificar(logs),
+            headers={'Content-Type': TIPO_COMPACTO},
+            timeout=Config.REPLICATION_TIMEOUT
+        )
+        if response.status_code != 415:
+            return response
+        _nodos_solo_json.add(nodo_url)
+
+    return cliente_nodos.post(
+        nodo_url,
+        ruta,
+        json={'logs': [_serializable(log) for log in logs]},
+        timeout=Config.REPLICATION_TIMEOUT
+    )
+
+
+def enviar_a_nodo(nodo_url):
+    """
+    Envía a un nodo los logs posteriores a su cursor, en lotes de REPLICATION_CHUNK.
+    El cursor solo avanza cuando el nodo confirma el lote; ante el primer error
+    se detiene y el siguiente intento continúa desde el último lote confirmado.
+    """
+    from models import LogReplicacion, CursorReplicacion
+
+    ultimo = CursorReplicacion.obtener(nodo_url)
+    enviados = 0
+
+    while True:
+        logs = LogReplicacion.obtener_desde(ultimo, Config.REPLICATION_CHUNK)
+        if not logs:
+            break
+
+        inicio = time.perf_counter()
+        try:
+            response = _enviar_lote(nodo_url, logs)
+            confirmado = response.status_code == 200 and response.json().get('success')
+            error = None if confirmado else response.text
+        except Exception as e:
+            confirmado = False
+            error = str(e)
+        observar_replicacion(nodo_url, time.perf_counter() - inicio, confirmado, len(logs))
+
+        if not confirmado:
+            return {
+                'nodo': nodo_url,
+                'status': 'error',
+                'error': error,
+                'logs_enviados': enviados,
+                'ultimo_id_log': ultimo
+            }
+
+        ultimo = logs[-1]['id_log']
+        CursorReplicacion.avanzar(nodo_url, ultimo)
+        enviados += len(logs)
+
+        if len(logs) < Config.REPLICATION_CHUNK:
+            break
+
+    return {
+        'nodo': nodo_url,
+        'status': 'success',
+        'logs_enviados': enviados,
+        'ultimo_id_log': ultimo
+    }
+
+
+def consolidar():
+    """
+    Marca como replicados, con un solo UPDATE por rango, los logs que ya
+    confirmaron todos los nodos; con REPLICATION_PURGE además los elimina.
+    """
+    from models import LogReplicacion, CursorReplicacion
+
+    cursores = CursorReplicacion.obtener_todos()
+    if not cursores:
+        return 0
+
+    minimo = min(cursores.values())
+    if minimo:
+        LogReplicacion.marcar_replicado_hasta(minimo)
+        if Config.REPLICATION_PURGE:
+            LogReplicacion.purgar_hasta(minimo)
+    return minimo
+
+
+def replicar_pendientes(esperar=None):
+    """
+    Pide al despachador una sincronización en paralelo con todos los nodos y
+    espera como máximo esperar segundos (REPLICATION_TIMEOUT por defecto).
+    Los nodos que no terminaron a tiempo siguen en segundo plano y se
+    reportan con status 'en_curso'.
+    """
+    from utils.despachador import despachador
+
+    futuros = despachador.sincronizar()
+    wait(list(futuros.values()), timeout=Config.REPLICATION_TIMEOUT if esperar is None else esperar)
+
+    resultados = []
+    for nodo_url, futuro in futuros.items():
+        if futuro.done():
+            resultados.append(futuro.result())
+        else:
+            resultados.append({'nodo': nodo_url, 'status': 'en_curso', 'logs_enviados': 0})
+
+    return {
+        'logs_replicados': sum(r.get('logs_enviados', 0) for r in resultados),
+        'resultados': resultados
+    }
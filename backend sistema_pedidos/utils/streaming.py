@@ -0,0 +1,54 @@
+from flask import Response, current_app, stream_with_context
+
+TIPO_NDJSON = 'application/x-ndjson'
+
+
+def formato_stream(request):
+    """'ndjson', 'json' o None según ?stream= o la cabecera Accept"""
+    formato = request.args.get('stream')
+    if formato in ('ndjson', 'json'):
+        return formato
+    if request.accept_mimetypes.best == TIPO_NDJSON:
+        return 'ndjson'
+    return None
+
+
+def respuesta_stream(filas, formato, clave, tam_tanda=500):
+    """
+    Respuesta HTTP chunked a partir de un generador de filas.
+    - ndjson: un objeto JSON por línea.
+    - json: {"success": true, "<clave>": [ ... ]} emitido por partes.
+    Las filas se agrupan en tandas de tam_tanda para no escribir fila a fila.
+    Si falla a mitad, el error se agrega al final (el status ya se envió).
+    """
+    dumps = current_app.json.dumps
+
+    def generar():
+        tanda = []
+        primera = True
+        if formato == 'json':
+            yield f'{{"success": true, "{clave}": ['
+        try:
+            for fila in filas:
+                texto = dumps(fila)
+                if formato == 'json':
+                    texto = texto if primera else ',' + texto
+                    primera = False
+                else:
+                    texto += '\n'
+                tanda.append(texto)
+                if len(tanda) >= tam_tanda:
+                    yield ''.join(tanda)
+                    tanda = []
+            yield ''.join(tanda)
+            if formato == 'json':
+                yield ']}'
+        except Exception as e:
+            yield ''.join(tanda)
+            if formato == 'json':
+                yield '], "error": ' + dumps(str(e)) + '}'
+            else:
+                yield dumps({'error': str(e)}) + '\n'
+
+    mimetype = TIPO_NDJSON if formato == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generar()), mimetype=mimetype)
@@ -0,0 +1,194 @@
+"""
+Rollups de ventas por hora, día y mes en ventas_resumen (por nodo) y
+ventas_producto (por producto y nodo).
+
+Cada pedido creado, replicado o borrado suma o resta sus deltas en la misma
+transacción que lo escribe; los informes leen solo los periodos del rango.
+Un pedido cuenta en el periodo de su fecha_pedido, sea cual sea su estado.
+Cada fila del rollup está repartida en VENTAS_SLOTS slots y cada transacción
+suma en uno al azar, así los pedidos concurrentes no hacen cola en la fila de
+la hora en curso (o de un producto popular) hasta el COMMIT.
+
+Uso (desde la carpeta del backend):
+    python -m utils.ventas reconstruir   recalcula los rollups desde los pedidos
+"""
+import random
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+from config import Config
+from database import execute_query, transaccion
+
+GRANULARIDADES = ('hora', 'dia', 'mes')
+AGRUPACIONES = ('nodo', 'producto')
+
+QUERY_ACUMULAR_RESUMEN = """
+    INSERT INTO ventas_resumen (granularidad, periodo, nodo, slot, pedidos, unidades, ingresos)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE pedidos = pedidos + VALUES(pedidos),
+        unidades = unidades + VALUES(unidades), ingresos = ingresos + VALUES(ingresos)
+"""
+
+QUERY_ACUMULAR_PRODUCTO = """
+    INSERT INTO ventas_producto (granularidad, periodo, id_producto, nodo, slot, pedidos, unidades, ingresos)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE pedidos = pedidos + VALUES(pedidos),
+        unidades = unidades + VALUES(unidades), ingresos = ingresos + VALUES(ingresos)
+"""
+
+
+def periodo(fecha, granularidad):
+    """Inicio del periodo (hora, día o mes) que contiene fecha"""
+    if granularidad == 'hora':
+        return fecha.replace(minute=0, second=0, microsecond=0)
+    if granularidad == 'dia':
+        return fecha.replace(hour=0, minute=0, second=0, microsecond=0)
+    return fecha.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def leer_fecha(valor):
+    """Fecha de un pedido tal como viaja en el log (ISO) o como la devuelve la BD"""
+    if isinstance(valor, datetime):
+        return valor
+    return datetime.fromisoformat(valor)
+
+
+def _sumar(deltas, clave, pedidos, unidades, ingresos):
+    actual = deltas.get(clave, (0, 0, Decimal(0)))
+    deltas[clave] = (actual[0] + pedidos, actual[1] + unidades, actual[2] + Decimal(str(ingresos)))
+
+
+def acumular(cursor, pedidos, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) pedidos a los rollups en la transacción del cursor.
+    pedidos: iterable de (fecha, nodo, total, detalles), con detalles como
+    [(id_producto, cantidad, subtotal)].
+    """
+    resumen = {}
+    por_producto = {}
+    for fecha, nodo, total, detalles in pedidos:
+        nodo = nodo or ''
+        unidades = sum(d[1] for d in detalles)
+        # Un pedido con varias líneas del mismo producto cuenta una vez para ese producto
+        lineas = {}
+        for id_producto, cantidad, subtotal in detalles:
+            cantidad_actual, subtotal_actual = lineas.get(id_producto, (0, Decimal(0)))
+            lineas[id_producto] = (cantidad_actual + cantidad, subtotal_actual + Decimal(str(subtotal)))
+        for granularidad in GRANULARIDADES:
+            inicio = periodo(fecha, granularidad)
+            _sumar(resumen, (granularidad, inicio, nodo), signo, signo * unidades, signo * Decimal(str(total)))
+            for id_producto, (cantidad, subtotal) in lineas.items():
+                _sumar(por_producto, (granularidad, inicio, id_producto, nodo), signo, signo * cantidad, signo * subtotal)
+
+    # Un solo slot por llamada y orden fijo de claves: dos transacciones
+    # concurrentes bloquean las filas en el mismo orden
+    slot = random.randrange(Config.VENTAS_SLOTS)
+    if resumen:
+        cursor.executemany(QUERY_ACUMULAR_RESUMEN, [
+            clave + (slot,) + valores for clave, valores in sorted(resumen.items())
+        ])
+    if por_producto:
+        cursor.executemany(QUERY_ACUMULAR_PRODUCTO, [
+            clave + (slot,) + valores for clave, valores in sorted(por_producto.items())
+        ])
+
+
+def pedido_creado(cursor, fecha, nodo, total, detalles):
+    """detalles: la lista de dicts de Pedido.crear (id_producto, cantidad, precio_unitario)"""
+    acumular(cursor, [(fecha, nodo, total, [
+        (d['id_producto'], d['cantidad'], d['cantidad'] * d['precio_unitario']) for d in detalles
+    ])])
+
+
+def _agrupar(filas):
+    """Filas pedido x detalle (LEFT JOIN) -> [(fecha, nodo, total, detalles)]"""
+    pedidos = {}
+    for fila in filas:
+        pedido = pedidos.setdefault(
+            fila['id_pedido'], (fila['fecha_pedido'], fila['nodo_procesado'], fila['total'], [])
+        )
+        if fila['id_producto'] is not None:
+            pedido[3].append((fila['id_producto'], fila['cantidad'], fila['subtotal']))
+    return list(pedidos.values())
+
+
+def descontar_pedidos(cursor, condicion, params):
+    """
+    Resta de los rollups los pedidos que cumplen condicion (sobre pedidos p)
+    antes de borrarlos; debe llamarse antes del DELETE.
+    """
+    cursor.execute(f"""
+        SELECT p.id_pedido, p.fecha_pedido, p.nodo_procesado, p.total,
+               d.id_producto, d.cantidad, d.subtotal
+        FROM pedidos p
+        LEFT JOIN detalle_pedidos d ON d.id_pedido = p.id_pedido
+        WHERE {condicion}
+    """, params)
+    acumular(cursor, _agrupar(cursor.fetchall()), signo=-1)
+
+
+def consultar(granularidad, desde, hasta, por=None, id_producto=None, nodo=None):
+    """
+    Series de ventas entre desde y hasta (inclusive) para la granularidad dada.
+    por: None (totales del periodo), 'nodo' o 'producto'. id_producto y nodo filtran.
+    Retorna lista de {'periodo', ['nodo' | 'id_producto'], 'pedidos', 'unidades', 'ingresos'}.
+    """
+    inicio = periodo(desde, granularidad)
+    condiciones = ["granularidad = %s", "periodo BETWEEN %s AND %s"]
+    params = [granularidad, inicio, hasta]
+
+    if por == 'producto' or id_producto is not None:
+        tabla = 'ventas_producto'
+        if id_producto is not None:
+            condiciones.append("id_producto = %s")
+            params.append(id_producto)
+    else:
+        tabla = 'ventas_resumen'
+    if nodo is not None:
+        condiciones.append("nodo = %s")
+        params.append(nodo)
+
+    grupo = {'nodo': ', nodo', 'producto': ', id_producto'}.get(por, '')
+    filas = execute_query(f"""
+        SELECT periodo{grupo}, SUM(pedidos) AS pedidos, SUM(unidades) AS unidades, SUM(ingresos) AS ingresos
+        FROM {tabla}
+        WHERE {' AND '.join(condiciones)}
+        GROUP BY periodo{grupo}
+        ORDER BY periodo{grupo}
+    """, params, fetch_all=True)
+
+    for fila in filas:
+        fila['periodo'] = fila['periodo'].isoformat(sep=' ')
+        fila['pedidos'] = int(fila['pedidos'])
+        fila['unidades'] = int(fila['unidades'])
+        fila['ingresos'] = float(fila['ingresos'])
+    return filas
+
+
+def reconstruir():
+    """Recalcula los rollups desde pedidos y detalle_pedidos en una transacción"""
+    with transaccion() as cursor:
+        cursor.execute("SELECT granularidad FROM ventas_resumen FOR UPDATE")
+        cursor.execute("SELECT granularidad FROM ventas_producto FOR UPDATE")
+        cursor.execute("DELETE FROM ventas_resumen")
+        cursor.execute("DELETE FROM ventas_producto")
+        cursor.execute("""
+            SELECT p.id_pedido, p.fecha_pedido, p.nodo_procesado, p.total,
+                   d.id_producto, d.cantidad, d.subtotal
+            FROM pedidos p
+            LEFT JOIN detalle_pedidos d ON d.id_pedido = p.id_pedido
+            ORDER BY p.id_pedido
+        """)
+        pedidos = _agrupar(cursor.fetchall())
+        acumular(cursor, pedidos)
+    return len(pedidos)
+
+
+if __name__ == '__main__':
+    comando = sys.argv[1] if len(sys.argv) > 1 else ''
+    if comando == 'reconstruir':
+        print(f'Rollups recalculados a partir de {reconstruir()} pedidos')
+    else:
+        print(__doc__)
+        sys.exit(2)
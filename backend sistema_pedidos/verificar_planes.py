@@ -0,0 +1,178 @@
+"""
+Verificación de planes de ejecución (regresiones de índices).
+
+Ejecuta EXPLAIN sobre:
+- cada query literal (SELECT/UPDATE/DELETE) de models.py y utils/helpers.py, y
+- las queries dinámicas (paginación, IN (...)) que generan los métodos de
+  lectura, capturadas al ejecutarlos contra la base local.
+
+Falla (código de salida 1) si alguna query recorre una tabla completa,
+necesita filesort o una tabla temporal, o si el optimizador elige para una
+tabla otro índice que el esperado en INDICES_ESPERADOS (una query que deja de
+usar su índice aunque siga figurando en possible_keys).
+Conviene correrlo sobre una base con datos representativos y con las
+migraciones aplicadas: con tablas casi vacías el optimizador puede preferir
+un recorrido completo aunque exista el índice.
+
+Uso:
+    python verificar_planes.py [-v]
+"""
+import ast
+import os
+import re
+import sys
+from datetime import datetime
+
+from database import get_db_connection, agregar_observador, quitar_observador
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+ARCHIVOS = ['models.py', os.path.join('utils', 'helpers.py')]
+
+# Tablas de pocas filas (una por nodo) en las que un recorrido completo es lo esperado
+TABLAS_PEQUENAS = {
+    'health_check', 'replicacion_cursor', 'replicacion_aplicada', 'schema_migraciones', 'cache_versiones',
+    'innodb_trx'
+}
+
+# Índice que debe usar cada tabla (nombre o alias del EXPLAIN) de las queries que
+# cumplen el patrón; para cada tabla vale el primer patrón que coincide
+INDICES_ESPERADOS = [
+    (r'FROM clientes\b.* ORDER BY fecha_registro', 'clientes', 'idx_clientes_fecha'),
+    (r'(FROM|UPDATE) clientes\b.* WHERE id_cliente =', 'clientes', 'PRIMARY'),
+    (r"FROM productos WHERE .*estado = 'activo'", 'productos', 'idx_productos_estado_nombre'),
+    (r'(FROM|UPDATE) productos\b.* WHERE id_producto (=|IN)', 'productos', 'PRIMARY'),
+    (r'FROM pedidos p\b.* WHERE p\.id_pedido =', 'p', 'PRIMARY'),
+    (r'FROM pedidos p\b.* p\.id_cliente = %s', 'p', 'idx_pedidos_cliente_fecha'),
+    (r'FROM pedidos p\b.* ORDER BY p\.fecha_pedido', 'p', 'idx_pedidos_fecha'),
+    (r'(FROM|UPDATE) pedidos\b.* WHERE id_pedido =', 'pedidos', 'PRIMARY'),
+    (r'JOIN clientes c ON p\.id_cliente = c\.id_cliente', 'c', 'PRIMARY'),
+    (r'FROM detalle_pedidos dp\b.* WHERE dp\.id_pedido =', 'dp', 'idx_detalle_pedido'),
+    (r'JOIN productos pr ON dp\.id_producto = pr\.id_producto', 'pr', 'PRIMARY'),
+    (r'log_replicacion\b.* replicado = FALSE', 'log_replicacion', 'idx_log_origen_replicado'),
+    (r'log_replicacion\b.* WHERE nodo_origen = %s AND id_log', 'log_replicacion', 'idx_log_origen_id'),
+    (r'FROM replicacion_conflictos ORDER BY id_conflicto', 'replicacion_conflictos', 'PRIMARY'),
+    (r'FROM ventas_producto WHERE .*id_producto = %s', 'ventas_producto', 'idx_ventas_producto'),
+    (r'FROM ventas_producto\b', 'ventas_producto', 'PRIMARY'),
+    (r'FROM ventas_resumen\b', 'ventas_resumen', 'PRIMARY'),
+]
+
+# Fragmentos de queries que recorren la tabla a propósito
+PERMITIDAS = []
+
+
+def queries_literales():
+    """Strings SQL constantes de los archivos analizados: [(origen, query, None)]"""
+    encontradas = []
+    for archivo in ARCHIVOS:
+        with open(os.path.join(BASE, archivo), encoding='utf-8') as f:
+            arbol = ast.parse(f.read())
+        # Los trozos de f-strings se cubren con queries_dinamicas
+        en_fstrings = {id(v) for n in ast.walk(arbol) if isinstance(n, ast.JoinedStr) for v in n.values}
+        for nodo in ast.walk(arbol):
+            if isinstance(nodo, ast.Constant) and isinstance(nodo.value, str) and id(nodo) not in en_fstrings:
+                texto = ' '.join(nodo.value.split())
+                if re.match(r'^(SELECT|UPDATE|DELETE)\s', texto, re.IGNORECASE):
+                    encontradas.append((f'{archivo}:{nodo.lineno}', texto, None))
+    return encontradas
+
+
+def queries_dinamicas():
+    """Ejecuta los métodos de lectura y captura las queries que generan"""
+    from models import Cliente, Producto, Pedido, LogReplicacion
+    from utils import ventas
+
+    capturadas = []
+
+    def capturar(query, params, duracion):
+        if re.match(r'^\s*SELECT\s', query, re.IGNORECASE):
+            capturadas.append(('dinámica', ' '.join(query.split()), params))
+
+    agregar_observador(capturar)
+    try:
+        Cliente.obtener_todos(10)
+        Cliente.obtener_todos(10, ('2000-01-01 00:00:00', 1), ['nombre', 'email'])
+        Producto.obtener_todos(10, ('m', 1), ['nombre', 'precio'])
+        Producto.obtener_por_ids([1, 2, 3])
+        Pedido.obtener_todos(10)
+        Pedido.obtener_todos(10, ('2000-01-01 00:00:00', 1), ['total'])
+        Pedido.obtener_por_cliente(1, 10, ('2000-01-01 00:00:00', 1))
+        LogReplicacion.obtener_desde(0, 10)
+        desde, hasta = datetime(2000, 1, 1), datetime.now()
+        ventas.consultar('dia', desde, hasta)
+        ventas.consultar('hora', desde, hasta, por='nodo')
+        ventas.consultar('mes', desde, hasta, por='producto', id_producto=1)
+    finally:
+        quitar_observador(capturar)
+    return capturadas
+
+
+def _con_valores(cursor, query, params):
+    """Sustituye los %s; sin params reales se usa '1' (o 1 tras LIMIT/INTERVAL)"""
+    if params is not None:
+        return cursor.mogrify(query, params)
+    query = re.sub(r'(LIMIT|INTERVAL)\s+%s', r'\1 1', query, flags=re.IGNORECASE)
+    return query.replace('%s', "'1'")
+
+
+def indices_esperados(query):
+    """{tabla o alias: índice} según INDICES_ESPERADOS"""
+    esperados = {}
+    for patron, tabla, indice in INDICES_ESPERADOS:
+        if tabla not in esperados and re.search(patron, query):
+            esperados[tabla] = indice
+    return esperados
+
+
+def problemas_plan(filas, esperados=None):
+    problemas = []
+    for fila in filas:
+        tabla = fila.get('table') or ''
+        if tabla in TABLAS_PEQUENAS:
+            continue
+        extra = fila.get('Extra') or ''
+        if fila.get('type') == 'ALL':
+            if fila.get('possible_keys'):
+                problemas.append(f"recorrido completo de {tabla} aunque podría usar {fila['possible_keys']}")
+            else:
+                problemas.append(f'recorrido completo de {tabla} sin índice utilizable')
+        esperado = (esperados or {}).get(tabla)
+        if esperado and fila.get('key') != esperado:
+            problemas.append(f"{tabla} usa {fila.get('key') or 'ningún índice'} en vez de {esperado}")
+        if 'Using filesort' in extra:
+            problemas.append(f'filesort sobre {tabla}')
+        if 'Using temporary' in extra:
+            problemas.append(f'tabla temporal para {tabla}')
+    return problemas
+
+
+def verificar(detallado=False):
+    queries = queries_literales() + queries_dinamicas()
+    fallidas = 0
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            for origen, query, params in queries:
+                if any(fragmento in query for fragmento in PERMITIDAS):
+                    continue
+                sql = _con_valores(cursor, query, params)
+                try:
+                    cursor.execute('EXPLAIN ' + sql)
+                    filas = cursor.fetchall()
+                except Exception as e:
+                    print(f'OMITIDA {origen}: {e}\n    {query[:120]}')
+                    continue
+                problemas = problemas_plan(filas, indices_esperados(query))
+                if problemas:
+                    fallidas += 1
+                    print(f'FALLA   {origen}: {"; ".join(problemas)}\n    {query[:160]}')
+                elif detallado:
+                    print(f'OK      {origen}: {query[:100]}')
+    finally:
+        connection.close()
+
+    print(f'{len(queries)} queries analizadas, {fallidas} con regresiones')
+    return fallidas == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if verificar('-v' in sys.argv) else 1)
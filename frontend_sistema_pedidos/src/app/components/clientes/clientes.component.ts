@@ -16,6 +16,9 @@ export class ClientesComponent implements OnInit {
 
   clientes: Cliente[] = [];
   loading = false;
+  // Cursor de la página siguiente (null si no hay más)
+  nextCursor: string | null = null;
+  cargandoMas = false;
   mostrarModal = false;
   modoEdicion = false;
   clienteEditando: Cliente | null = null;
@@ -40,6 +43,7 @@ export class ClientesComponent implements OnInit {
       next: (data) => {
         if (data.success) {
           this.clientes = data.clientes;
+          this.nextCursor = data.next_cursor || null;
         }
         this.loading = false;
       },
@@ -51,6 +55,27 @@ export class ClientesComponent implements OnInit {
     });
   }
 
+  cargarMasClientes(): void {
+    if (!this.nextCursor || this.cargandoMas) {
+      return;
+    }
+    this.cargandoMas = true;
+    this.apiService.getClientes(this.nextCursor).subscribe({
+      next: (data) => {
+        if (data.success) {
+          this.clientes.push(...data.clientes);
+          this.nextCursor = data.next_cursor || null;
+        }
+        this.cargandoMas = false;
+      },
+      error: (err) => {
+        console.error('Error al cargar clientes:', err);
+        this.mostrarError('Error al cargar clientes');
+        this.cargandoMas = false;
+      }
+    });
+  }
+
   abrirModalNuevoCliente(): void {
     this.modoEdicion = false;
     this.clienteEditando = null;
@@ -25,6 +25,9 @@ export class MainComponent implements OnInit, OnDestroy {
   totalPedidos = 0;
   totalClientes = 0;
   totalProductos = 0;
+  // Los listados llegan paginados: solo se cuenta la primera página
+  hayMasClientes = false;
+  hayMasProductos = false;
   nodosActivos = 1;
 
   activeTab = 'pedidos';
@@ -57,6 +60,7 @@ export class MainComponent implements OnInit, OnDestroy {
       next: (data: any) => {
         if (data.success && data.clientes) {
           this.totalClientes = data.clientes.length;
+          this.hayMasClientes = !!data.next_cursor;
         }
       },
       error: (err) => console.error('Error al cargar clientes:', err)
@@ -66,6 +70,7 @@ export class MainComponent implements OnInit, OnDestroy {
       next: (data: any) => {
         if (data.success && data.productos) {
           this.totalProductos = data.productos.length;
+          this.hayMasProductos = !!data.next_cursor;
         }
       },
       error: (err) => console.error('Error al cargar productos:', err)
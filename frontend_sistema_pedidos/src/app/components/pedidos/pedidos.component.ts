@@ -19,6 +19,9 @@ export class PedidosComponent implements OnInit {
   pedidos: Pedido[] = [];
   clientes: Cliente[] = [];
   productos: Producto[] = [];
+  // Cursores de la página siguiente de clientes y productos (null si no hay más)
+  nextCursorClientes: string | null = null;
+  nextCursorProductos: string | null = null;
   loading = false;
   mostrarModal = false;
   mostrarModalDetalle = false;
@@ -79,11 +82,12 @@ export class PedidosComponent implements OnInit {
     });
   }
 
-  cargarClientes(): void {
-    this.apiService.getClientes().subscribe({
+  cargarClientes(after: string | null = null): void {
+    this.apiService.getClientes(after).subscribe({
       next: (data) => {
         if (data.success) {
-          this.clientes = data.clientes;
+          this.clientes = after ? [...this.clientes, ...data.clientes] : data.clientes;
+          this.nextCursorClientes = data.next_cursor || null;
         }
       },
       error: (err) => {
@@ -92,11 +96,12 @@ export class PedidosComponent implements OnInit {
     });
   }
 
-  cargarProductos(): void {
-    this.apiService.getProductos().subscribe({
+  cargarProductos(after: string | null = null): void {
+    this.apiService.getProductos(after).subscribe({
       next: (data) => {
         if (data.success) {
-          this.productos = data.productos;
+          this.productos = after ? [...this.productos, ...data.productos] : data.productos;
+          this.nextCursorProductos = data.next_cursor || null;
         }
       },
       error: (err) => {
@@ -16,6 +16,9 @@ export class ProductosComponent implements OnInit {
 
   productos: Producto[] = [];
   loading = false;
+  // Cursor de la página siguiente (null si no hay más)
+  nextCursor: string | null = null;
+  cargandoMas = false;
   mostrarModal = false;
   modoEdicion = false;
   productoEditando: Producto | null = null;
@@ -40,6 +43,7 @@ export class ProductosComponent implements OnInit {
       next: (data) => {
         if (data.success) {
           this.productos = data.productos;
+          this.nextCursor = data.next_cursor || null;
         }
         this.loading = false;
       },
@@ -51,6 +55,27 @@ export class ProductosComponent implements OnInit {
     });
   }
 
+  cargarMasProductos(): void {
+    if (!this.nextCursor || this.cargandoMas) {
+      return;
+    }
+    this.cargandoMas = true;
+    this.apiService.getProductos(this.nextCursor).subscribe({
+      next: (data) => {
+        if (data.success) {
+          this.productos.push(...data.productos);
+          this.nextCursor = data.next_cursor || null;
+        }
+        this.cargandoMas = false;
+      },
+      error: (err) => {
+        console.error('Error al cargar productos:', err);
+        this.mostrarError('Error al cargar productos');
+        this.cargandoMas = false;
+      }
+    });
+  }
+
   abrirModalNuevoProducto(): void {
     this.modoEdicion = false;
     this.productoEditando = null;
@@ -1,5 +1,5 @@
 import { Injectable } from '@angular/core';
-import { HttpClient, HttpHeaders } from '@angular/common/http';
+import { HttpClient, HttpHeaders, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
 import { Cliente, ClienteCreate } from '../models/cliente.model';
 import { Producto, ProductoCreate } from '../models/producto.model';
@@ -20,12 +20,22 @@ export class ApiService {
 
   constructor(private http: HttpClient) { }
 
+  // Los listados se paginan por cursor: cada llamada trae una página y la
+  // respuesta incluye next_cursor (null en la última) para pedir la siguiente
+  private getPagina(ruta: string, after: string | null): Observable<any> {
+    let params = new HttpParams();
+    if (after) {
+      params = params.set('after', after);
+    }
+    return this.http.get(`${this.apiUrl}/${ruta}`, { params });
+  }
+
   // ============================================
   // CLIENTES
   // ============================================
 
-  getClientes(): Observable<any> {
-    return this.http.get(`${this.apiUrl}/clientes`);
+  getClientes(after: string | null = null): Observable<any> {
+    return this.getPagina('clientes', after);
   }
 
   getCliente(id: number): Observable<any> {
@@ -48,8 +58,8 @@ export class ApiService {
   // PRODUCTOS
   // ============================================
 
-  getProductos(): Observable<any> {
-    return this.http.get(`${this.apiUrl}/productos`);
+  getProductos(after: string | null = null): Observable<any> {
+    return this.getPagina('productos', after);
   }
 
   getProducto(id: number): Observable<any> {
@@ -76,8 +86,8 @@ export class ApiService {
     return this.http.get(`${this.apiUrl}/pedidos/${id}`);
   }
 
-  getPedidosPorCliente(clienteId: number): Observable<any> {
-    return this.http.get(`${this.apiUrl}/pedidos/cliente/${clienteId}`);
+  getPedidosPorCliente(clienteId: number, after: string | null = null): Observable<any> {
+    return this.getPagina(`pedidos/cliente/${clienteId}`, after);
   }
 
   createPedido(pedido: PedidoCreate): Observable<any> {
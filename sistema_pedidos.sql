@@ -66,4 +66,19 @@ CREATE TABLE IF NOT EXISTS health_check (
     estado ENUM('activo', 'inactivo', 'error') DEFAULT 'activo',
     ultima_verificacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE KEY (nodo)
+);
+
+-- TABLA: replicacion_aplicada (Último log aplicado de cada nodo origen)
+CREATE TABLE IF NOT EXISTS replicacion_aplicada (
+    nodo_origen VARCHAR(50) PRIMARY KEY,
+    ultimo_id_log INT NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+
+-- TABLA: replicacion_cursor (Último log confirmado por cada nodo réplica)
+CREATE TABLE IF NOT EXISTS replicacion_cursor (
+    nodo_destino VARCHAR(255) PRIMARY KEY,
+    ultimo_id_log INT NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
\ No newline at end of file